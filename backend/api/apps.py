@@ -1,6 +1,26 @@
+import os
+import sys
+
 from django.apps import AppConfig
 
+MANAGEMENT_ENTRY_POINTS = ("manage.py", "django-admin", "django-admin.py", "__main__.py")
+
+
+def _serving() -> bool:
+    """False for management commands other than runserver: migrate, check, ... never serve forecasts."""
+    if os.path.basename(sys.argv[0] if sys.argv else "") in MANAGEMENT_ENTRY_POINTS:
+        return len(sys.argv) > 1 and sys.argv[1] == "runserver"
+    return True
+
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.conf import settings
+        from . import signals  # noqa: F401  (connect cache invalidation)
+        from .services.model_registry import registry
+
+        if getattr(settings, "FORECAST_PRELOAD_MODELS", True) and _serving():
+            registry.preload()
@@ -0,0 +1,44 @@
+# backend/api/management/commands/build_surfaces.py
+"""
+Build the slider response surfaces for the current data and model version.
+
+    python manage.py build_surfaces [--department NAME ...]
+
+Surfaces are only used with FORECAST_SURFACE_ENABLED on. Servers then build missing
+surfaces in the background on first use; run this after loading data or deploying
+models to have them ready up front. Surfaces are stored
+in the "forecast" cache, so this only helps servers that share that cache
+(FileBasedCache / DatabaseCache).
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Department
+from api.services import response_surface
+from api.services.model_registry import get_bundle
+
+
+class Command(BaseCommand):
+    help = "Precompute slider response surfaces for all (or some) departments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--department", action="append", default=[],
+                            help="Department name (repeatable); default: all departments.")
+
+    def handle(self, *args, **opts):
+        ids = dict(Department.objects.order_by("name").values_list("name", "id"))
+        if opts["department"]:
+            missing = sorted(set(opts["department"]) - set(ids))
+            if missing:
+                raise CommandError(f"Unknown department(s): {', '.join(missing)}")
+            ids = {name: ids[name] for name in opts["department"]}
+        try:
+            bundle = get_bundle()
+        except Exception as e:
+            raise CommandError(f"Model load failed: {e}")
+
+        built = 0
+        for name, pk in ids.items():
+            stamp = response_surface.current_stamp(bundle, pk)
+            if response_surface.build_and_store(bundle, name, stamp) is not None:
+                built += 1
+        self.stdout.write(f"Built {built} response surface(s) for model {bundle.version}.")
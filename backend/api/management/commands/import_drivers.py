@@ -0,0 +1,40 @@
+# backend/api/management/commands/import_drivers.py
+"""
+Bulk-load DriversMonthly rows from a CSV or JSON file.
+
+    python manage.py import_drivers drivers.csv [--format csv|json] [--chunk-size 1000]
+
+Rows are upserted on (department, month) like POST /api/drivers/bulk/; stored
+features and the forecast cache are refreshed once for the whole file.
+"""
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.ingest import CHUNK_SIZE, IngestError, read_rows, upsert_drivers
+
+
+class Command(BaseCommand):
+    help = "Upsert DriversMonthly rows from a CSV or JSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSON file (a list of rows or {\"rows\": [...]}).")
+        parser.add_argument("--format", choices=["csv", "json"], default=None,
+                            help="File format; default: from the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                            help=f"Rows per INSERT statement (default {CHUNK_SIZE}).")
+
+    def handle(self, *args, **opts):
+        path = Path(opts["path"])
+        if not path.exists():
+            raise CommandError(f"No such file: {path}")
+        fmt = opts["format"] or ("json" if path.suffix.lower() == ".json" else "csv")
+        try:
+            df = read_rows(path.read_bytes(), fmt)
+            result = upsert_drivers(df, chunk_size=opts["chunk_size"])
+        except IngestError as e:
+            details = "".join(f"\n  row {err['row']}: {err['error']}" for err in e.errors[:20])
+            raise CommandError(f"{e}{details}")
+        except ValueError as e:
+            raise CommandError(f"Unreadable file: {e}")
+        self.stdout.write(f"Upserted {result['rows']} row(s) across {result['departments']} department(s).")
@@ -0,0 +1,130 @@
+# backend/api/management/commands/precompute_forecasts.py
+"""
+Precompute forecasts for every department: the baseline plus each active Scenario.
+
+    python manage.py precompute_forecasts [--workers N] [--skip-baseline] [--scenario CODE ...]
+
+History is loaded once; each scenario is one batched rollout over all departments.
+Scenarios run inline by default; with ``--workers N`` they are spread across a
+process pool whose workers set Django up and take the boosters from the model
+registry once (services/rollout_pool.py). Results are written with bulk inserts as
+one ForecastRun per scenario.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Sum
+
+from api.models import Department, Scenario, ScenarioDeptFactor, ScenarioTxnFactor, RequestForPayment
+from api.services.forecast_store import PRECOMPUTE, save_forecast_run
+from api.services.model_registry import get_bundle
+from api.services.history import horizon_targets, horizon_macro, load_batch_state
+from api.services.rollout import ScenarioError, parse_scenario, forecast_rows
+from api.services.rollout_pool import init_worker, rollout_job
+
+
+def _txn_shares(departments: list[str]) -> dict:
+    """{department name: {transactionType_id: share of RFP netTotal}} from one GROUP BY."""
+    rows = (RequestForPayment.objects
+            .filter(department__name__in=departments, transactionType__isnull=False)
+            .values("department__name", "transactionType_id")
+            .annotate(total=Sum("netTotal")))
+    totals, shares = {}, {}
+    for r in rows:
+        totals[r["department__name"]] = totals.get(r["department__name"], 0) + float(r["total"] or 0)
+    for r in rows:
+        tot = totals[r["department__name"]]
+        if tot:
+            shares.setdefault(r["department__name"], {})[r["transactionType_id"]] = float(r["total"] or 0) / tot
+    return shares
+
+
+class Command(BaseCommand):
+    help = "Precompute forecasts for all departments x active scenarios and store them as ForecastRuns."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Worker processes (default 1 = run inline).")
+        parser.add_argument("--skip-baseline", action="store_true",
+                            help="Only run active scenarios, not the no-scenario baseline.")
+        parser.add_argument("--scenario", action="append", default=[],
+                            help="Limit to these scenario codes (repeatable).")
+
+    def handle(self, *args, **opts):
+        try:
+            bundle = get_bundle()
+        except Exception as e:
+            raise CommandError(f"Model load failed: {e}")
+        schema, elas = bundle.schema, bundle.elas
+
+        depts = {d.name: d for d in Department.objects.all()}
+        state, drivers_base = load_batch_state({d.pk: name for name, d in depts.items()})
+        if state is None:
+            raise CommandError("No DriversMonthly history to forecast from.")
+
+        scenarios = Scenario.objects.filter(isActive=True).order_by("scenarioCode")
+        if opts["scenario"]:
+            scenarios = scenarios.filter(scenarioCode__in=opts["scenario"])
+        scenarios = list(scenarios)
+        plans = ([] if opts["skip_baseline"] else [None]) + scenarios
+
+        # Scenario factors in two queries; RFP transaction-type mix in one GROUP BY
+        dept_factors, txn_factors = {}, {}
+        for f in ScenarioDeptFactor.objects.filter(scenario__in=scenarios).values("scenario_id", "department__name", "pct"):
+            dept_factors.setdefault(f["scenario_id"], {})[f["department__name"]] = float(f["pct"]) / 100.0
+        for f in ScenarioTxnFactor.objects.filter(scenario__in=scenarios).values("scenario_id", "transactionType_id", "pct"):
+            txn_factors.setdefault(f["scenario_id"], {})[f["transactionType_id"]] = float(f["pct"]) / 100.0
+        shares = _txn_shares(state.keys) if txn_factors else {}
+
+        jobs = []
+        for scn in plans:
+            assumptions = scn.assumptions if scn is not None else {}
+            try:
+                params = parse_scenario(assumptions, assumptions)
+            except ScenarioError as e:
+                raise CommandError(f"Scenario {scn.scenarioCode}: {e}")
+            horizon = scn.horizonMonths if scn is not None else 12
+            targets = horizon_targets(horizon)
+
+            # Department uplift: slider pct x department factor x RFP-weighted transaction-type factor
+            dept_pct = np.full(state.size, 1.0 + params["dept_pct"])
+            if scn is not None:
+                dfac = dept_factors.get(scn.pk, {})
+                tfac = txn_factors.get(scn.pk, {})
+                for i, name in enumerate(state.keys):
+                    txn = sum(share * tfac.get(t, 0.0) for t, share in shares.get(name, {}).items())
+                    dept_pct[i] *= (1.0 + dfac.get(name, 0.0)) * (1.0 + txn)
+            jobs.append((scn, assumptions, targets, {
+                "state": state, "targets": targets, "schema": schema,
+                "macro": horizon_macro(targets),
+                "exog_delta": [params["fx_delta"], params["inf_delta"], params["wage_delta"]],
+                "drivers_base": drivers_base,
+                "drivers_delta": [params["enrolled_delta"], params["programs_delta"]],
+                "dept_pct": dept_pct - 1.0,
+                "elas": elas,
+            }))
+
+        workers = max(1, min(opts["workers"], len(jobs)))
+        if workers == 1:
+            init_worker()
+            outputs = map(rollout_job, [j[3] for j in jobs])
+        else:
+            connections.close_all()  # don't share DB sockets with forked workers
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+            outputs = pool.map(rollout_job, [j[3] for j in jobs])
+
+        try:
+            for (scn, assumptions, targets, _), quantiles in zip(jobs, outputs):
+                forecasts = {key: forecast_rows(targets, quantiles[i]) for i, key in enumerate(state.keys)}
+                run = save_forecast_run(forecasts, horizon=len(targets), scenario=scn,
+                                        assumptions=assumptions, departments=depts, version=bundle.version,
+                                        source=PRECOMPUTE)
+                label = scn.scenarioCode if scn is not None else "baseline"
+                self.stdout.write(f"{label}: run #{run.pk}, {len(forecasts)} departments x {len(targets)} months")
+        finally:
+            if workers > 1:
+                pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f"Precomputed {len(jobs)} forecast run(s)."))
@@ -0,0 +1,32 @@
+# backend/api/management/commands/rebuild_features.py
+"""
+Recompute the materialized DriversFeatures table.
+
+    python manage.py rebuild_features [--department NAME ...]
+
+Normal writes keep the table current through the DriversMonthly signals; run this
+after loading history with bulk operations or after changing the feature definitions.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Department
+from api.services import feature_store
+
+
+class Command(BaseCommand):
+    help = "Recompute stored engineered features for all (or some) departments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--department", action="append", default=[],
+                            help="Department name (repeatable); default: all departments.")
+
+    def handle(self, *args, **opts):
+        ids = None
+        if opts["department"]:
+            found = dict(Department.objects.filter(name__in=opts["department"]).values_list("name", "id"))
+            missing = sorted(set(opts["department"]) - set(found))
+            if missing:
+                raise CommandError(f"Unknown department(s): {', '.join(missing)}")
+            ids = list(found.values())
+        written = feature_store.rebuild(ids)
+        self.stdout.write(f"Stored features for {written} department-month(s).")
@@ -0,0 +1,21 @@
+# backend/api/management/commands/rebuild_spend_rollup.py
+"""
+Recompute the SpendRollup table behind /api/analytics/spend/.
+
+    python manage.py rebuild_spend_rollup
+
+RFP writes keep each rollup bucket current through the signal handlers; run this
+after bulk-loading RFPs or deleting dimension rows (their RFPs are re-pointed to
+NULL without signals).
+"""
+from django.core.management.base import BaseCommand
+
+from api.services import spend_rollup
+
+
+class Command(BaseCommand):
+    help = "Re-aggregate the RFP spend rollup with one GROUP BY."
+
+    def handle(self, *args, **opts):
+        written = spend_rollup.rebuild()
+        self.stdout.write(f"Stored {written} spend bucket(s).")
@@ -0,0 +1,34 @@
+# backend/api/management/commands/rebuild_totals.py
+"""
+Recompute DriversMonthly.totalNet from RequestForPayment.netTotal.
+
+    python manage.py rebuild_totals [--department NAME ...]
+
+With FORECAST_TOTALNET_FROM_RFPS on, RFP writes keep each closed (department,
+month) bucket current through the signal handlers, and the first RFP write of a
+month stores the month before it. Run this after bulk-loading RFPs or when turning
+the setting on for an existing database.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Department
+from api.services import rfp_totals
+
+
+class Command(BaseCommand):
+    help = "Re-aggregate monthly department totals from request-for-payment records."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--department", action="append", default=[],
+                            help="Department name (repeatable); default: all departments.")
+
+    def handle(self, *args, **opts):
+        ids = None
+        if opts["department"]:
+            found = dict(Department.objects.filter(name__in=opts["department"]).values_list("name", "id"))
+            missing = sorted(set(opts["department"]) - set(found))
+            if missing:
+                raise CommandError(f"Unknown department(s): {', '.join(missing)}")
+            ids = list(found.values())
+        written = rfp_totals.rebuild(ids)
+        self.stdout.write(f"Stored totals for {written} department-month(s).")
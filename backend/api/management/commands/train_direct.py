@@ -0,0 +1,38 @@
+# backend/api/management/commands/train_direct.py
+"""
+Train the direct multi-horizon quantile models from the DriversMonthly panel.
+
+    python manage.py train_direct [--horizons 12] [--num-boost-round 400] [--artifact-dir DIR]
+
+The boosters go to ``<artifact dir>/direct/``; the running servers pick them up on
+their next artifact check and then accept ``"mode": "direct"`` forecast requests.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.direct import HORIZONS, save_direct, train_direct
+from api.services.feature_store import feature_panel
+from api.services.model_registry import registry
+
+
+class Command(BaseCommand):
+    help = "Train the direct (one matrix for all horizons) quantile models."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--horizons", type=int, default=HORIZONS,
+                            help="Longest horizon in months (default 12).")
+        parser.add_argument("--num-boost-round", type=int, default=400)
+        parser.add_argument("--artifact-dir", default=None,
+                            help="Artifact directory (default: FORECAST_ARTIFACT_DIR).")
+
+    def handle(self, *args, **opts):
+        if opts["horizons"] < 1:
+            raise CommandError("--horizons must be at least 1.")
+        panel = feature_panel()
+        if panel.empty:
+            raise CommandError("No DriversMonthly rows to train on.")
+        try:
+            models = train_direct(panel, opts["horizons"], opts["num_boost_round"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        out = save_direct(models, opts["artifact_dir"] or registry.artifact_dir)
+        self.stdout.write(f"Trained direct models on {panel['Department'].nunique()} department(s) -> {out}")
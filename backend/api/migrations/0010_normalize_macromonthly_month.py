@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def normalize_month(apps, schema_editor):
+    MacroMonthly = apps.get_model('api', 'MacroMonthly')
+    for row in MacroMonthly.objects.exclude(month__day=1).only('id', 'month'):
+        row.month = row.month.replace(day=1)
+        row.save(update_fields=['month'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_rename_requestby_requestforpayment_requestedby_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_month, migrations.RunPython.noop),
+    ]
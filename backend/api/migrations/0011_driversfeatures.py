@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_normalize_macromonthly_month'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriversFeatures',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_idx', models.PositiveIntegerField()),
+                ('month', models.DateField()),
+                ('lag1', models.FloatField(blank=True, null=True)),
+                ('lag3', models.FloatField(blank=True, null=True)),
+                ('lag12', models.FloatField(blank=True, null=True)),
+                ('roll3_mean', models.FloatField(blank=True, null=True)),
+                ('roll3_std', models.FloatField(blank=True, null=True)),
+                ('roll6_mean', models.FloatField(blank=True, null=True)),
+                ('roll6_std', models.FloatField(blank=True, null=True)),
+                ('roll12_mean', models.FloatField(blank=True, null=True)),
+                ('roll12_std', models.FloatField(blank=True, null=True)),
+                ('yoy', models.FloatField(blank=True, null=True)),
+                ('level_shift12', models.PositiveSmallIntegerField(default=0)),
+                ('t', models.IntegerField()),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='features', to='api.department')),
+            ],
+            options={
+                'ordering': ['department', 'month_idx'],
+                'unique_together': {('department', 'month_idx')},
+            },
+        ),
+    ]
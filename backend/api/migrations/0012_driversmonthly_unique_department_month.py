@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def dedupe_months(apps, schema_editor):
+    """First-of-month dates and one row per (department, month): the latest write wins."""
+    DriversMonthly = apps.get_model('api', 'DriversMonthly')
+    for row in DriversMonthly.objects.exclude(month__day=1).only('id', 'month'):
+        row.month = row.month.replace(day=1)
+        row.save(update_fields=['month'])
+    keep = (DriversMonthly.objects
+            .values('department_id', 'month')
+            .annotate(last=Max('id'))
+            .values_list('last', flat=True))
+    DriversMonthly.objects.exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_driversfeatures'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_months, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='driversmonthly',
+            constraint=models.UniqueConstraint(fields=('department', 'month'), name='uniq_drivers_department_month'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def dedupe_months(apps, schema_editor):
+    """One row per month: the latest write wins; drivers linked to a dropped row follow it."""
+    MacroMonthly = apps.get_model('api', 'MacroMonthly')
+    DriversMonthly = apps.get_model('api', 'DriversMonthly')
+    for row in MacroMonthly.objects.exclude(month__day=1).only('id', 'month'):
+        row.month = row.month.replace(day=1)
+        row.save(update_fields=['month'])
+    keep = dict(MacroMonthly.objects.values('month').annotate(last=Max('id')).values_list('month', 'last'))
+    stale = MacroMonthly.objects.exclude(id__in=list(keep.values()))
+    for old_id, month in stale.values_list('id', 'month'):
+        DriversMonthly.objects.filter(macro_id=old_id).update(macro_id=keep[month])
+    stale.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_driversmonthly_unique_department_month'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_months, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='macromonthly',
+            name='api_macromo_month_eba22c_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='macromonthly',
+            constraint=models.UniqueConstraint(fields=('month',), name='uniq_macro_month'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_macromonthly_unique_month'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='requestforpayment',
+            index=models.Index(fields=['department', 'dateRequested'], name='api_request_departm_d9c281_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_requestforpayment_department_daterequested_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='requestforpayment',
+            name='api_request_departm_d9c281_idx',
+        ),
+        migrations.AddIndex(
+            model_name='requestforpayment',
+            index=models.Index(fields=['dateRequested', 'id'], name='api_request_dateReq_c509c2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestforpayment',
+            index=models.Index(fields=['netTotal', 'id'], name='api_request_netTota_44d33c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestforpayment',
+            index=models.Index(fields=['department', 'dateRequested', 'id'], name='api_request_departm_d46792_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestforpayment',
+            index=models.Index(fields=['currency', 'dateRequested', 'id'], name='api_request_currenc_74b741_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Same document expression as api/services/rfp_search.py (DOC_SQL): the planner only
+# uses these indexes when the query repeats the expression exactly.
+SEARCH_FIELDS = ["payableTo", "description", "requestedBy", "accountName", "pr", "po", "rr"]
+DOC_SQL = " || ' ' || ".join(f"coalesce(\"{f}\", '')" for f in SEARCH_FIELDS)
+
+
+def create_search_indexes(apps, schema_editor):
+    """GIN full-text + trigram indexes; PostgreSQL only (other backends search in process)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS rfp_search_fts_idx ON api_requestforpayment "
+        f"USING gin (to_tsvector('simple', {DOC_SQL}))"
+    )
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS rfp_search_trgm_idx ON api_requestforpayment "
+        f"USING gin (({DOC_SQL}) gin_trgm_ops)"
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS rfp_search_fts_idx")
+    schema_editor.execute("DROP INDEX IF EXISTS rfp_search_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_requestforpayment_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
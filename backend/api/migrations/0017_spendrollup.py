@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:46
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def populate(apps, schema_editor):
+    """Aggregate the existing RFPs (later writes are maintained by the signal handlers)."""
+    RequestForPayment = apps.get_model('api', 'RequestForPayment')
+    SpendRollup = apps.get_model('api', 'SpendRollup')
+    dims = ['department_id', 'transactionType_id', 'sourceOfFund_id', 'modeOfPayment_id']
+    rows = (RequestForPayment.objects
+            .annotate(bucket=TruncMonth('dateRequested'))
+            .values('bucket', *dims, 'currency')
+            .annotate(total=Sum('netTotal'), n=Count('id'))
+            .order_by())
+    SpendRollup.objects.bulk_create([
+        SpendRollup(month=r['bucket'], currency=r['currency'], netTotal=r['total'], count=r['n'],
+                    **{d: r[d] or 0 for d in dims})
+        for r in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_requestforpayment_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('department_id', models.PositiveIntegerField(default=0)),
+                ('transactionType_id', models.PositiveIntegerField(default=0)),
+                ('sourceOfFund_id', models.PositiveIntegerField(default=0)),
+                ('modeOfPayment_id', models.PositiveIntegerField(default=0)),
+                ('currency', models.CharField(max_length=10)),
+                ('netTotal', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('count', models.PositiveIntegerField()),
+            ],
+            options={
+                'ordering': ['month'],
+                'constraints': [models.UniqueConstraint(fields=('month', 'department_id', 'transactionType_id', 'sourceOfFund_id', 'modeOfPayment_id', 'currency'), name='uniq_spend_rollup_grain')],
+            },
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
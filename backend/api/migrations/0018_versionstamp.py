@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_spendrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionStamp',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('value', models.BigIntegerField()),
+            ],
+        ),
+    ]
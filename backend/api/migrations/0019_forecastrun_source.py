@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:10
+
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def mark_precomputed(apps, schema_editor):
+    """precompute_forecasts runs: every Scenario run, and baselines (stored with empty assumptions)."""
+    ForecastRun = apps.get_model('api', 'ForecastRun')
+    ForecastRun.objects.filter(Q(scenario__isnull=False) | Q(notes='{}')).update(source='precompute')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_versionstamp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastrun',
+            name='source',
+            field=models.CharField(default='request', max_length=20),
+        ),
+        migrations.RunPython(mark_precomputed, migrations.RunPython.noop),
+    ]
@@ -65,10 +65,48 @@ class RequestForPayment(models.Model):
     modeOfPayment = models.ForeignKey('ModeOfPayment', on_delete=models.SET_NULL, null=True, related_name='rfps')
     taxRegistration = models.ForeignKey('TaxRegistration', on_delete=models.SET_NULL, null=True, related_name='rfps')
 
+    class Meta:
+        # keyset pages of /api/rfps/ (ordering, id) and the monthly spend buckets
+        indexes = [
+            models.Index(fields=['dateRequested', 'id']),
+            models.Index(fields=['netTotal', 'id']),
+            models.Index(fields=['department', 'dateRequested', 'id']),
+            models.Index(fields=['currency', 'dateRequested', 'id']),
+        ]
+
     def __str__(self):
         return str(self.id)
 
 
+class SpendRollup(models.Model):
+    """
+    Net spend of RFPs per (month, department, transaction type, source of fund, mode of
+    payment, currency), maintained by services/spend_rollup.py. Dimension ids are plain
+    integers with 0 for "unassigned" so the grain stays one unique key.
+    """
+    month = models.DateField()  # first of month of dateRequested
+    department_id = models.PositiveIntegerField(default=0)
+    transactionType_id = models.PositiveIntegerField(default=0)
+    sourceOfFund_id = models.PositiveIntegerField(default=0)
+    modeOfPayment_id = models.PositiveIntegerField(default=0)
+    currency = models.CharField(max_length=10)
+
+    netTotal = models.DecimalField(max_digits=16, decimal_places=2)
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['month', 'department_id', 'transactionType_id', 'sourceOfFund_id', 'modeOfPayment_id', 'currency'],
+                name='uniq_spend_rollup_grain',
+            ),
+        ]
+        ordering = ['month']
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} | {self.department_id} | {self.currency}"
+
+
 # ==============================
 # Reference / Dimension Tables
 # ==============================
@@ -140,6 +178,9 @@ class DriversMonthly(models.Model):
             models.Index(fields=['department', 'month']),
             models.Index(fields=['month_idx']),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=['department', 'month'], name='uniq_drivers_department_month'),
+        ]
         ordering = ['department', 'month']
 
     def save(self, *args, **kwargs):
@@ -155,6 +196,33 @@ class DriversMonthly(models.Model):
         return f"{self.department.name} | {self.month:%Y-%m-01}"
 
 
+class DriversFeatures(models.Model):
+    """Engineered features of one DriversMonthly row, maintained by services/feature_store.py."""
+    department = models.ForeignKey('Department', on_delete=models.CASCADE, related_name='features')
+    month_idx = models.PositiveIntegerField()
+    month = models.DateField()
+
+    lag1 = models.FloatField(null=True, blank=True)
+    lag3 = models.FloatField(null=True, blank=True)
+    lag12 = models.FloatField(null=True, blank=True)
+    roll3_mean = models.FloatField(null=True, blank=True)
+    roll3_std = models.FloatField(null=True, blank=True)
+    roll6_mean = models.FloatField(null=True, blank=True)
+    roll6_std = models.FloatField(null=True, blank=True)
+    roll12_mean = models.FloatField(null=True, blank=True)
+    roll12_std = models.FloatField(null=True, blank=True)
+    yoy = models.FloatField(null=True, blank=True)
+    level_shift12 = models.PositiveSmallIntegerField(default=0)
+    t = models.IntegerField()
+
+    class Meta:
+        unique_together = ('department', 'month_idx')
+        ordering = ['department', 'month_idx']
+
+    def __str__(self):
+        return f"{self.department_id} | {self.month:%Y-%m}"
+
+
 # ==============================
 # Macro Indicators
 # ==============================
@@ -166,7 +234,15 @@ class MacroMonthly(models.Model):
 
     class Meta:
         ordering = ['month']
-        indexes = [models.Index(fields=['month'])]
+        constraints = [
+            models.UniqueConstraint(fields=['month'], name='uniq_macro_month'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # normalize to first of month (same convention as DriversMonthly)
+        if self.month:
+            self.month = self.month.replace(day=1)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.month:%Y-%m}"
@@ -181,6 +257,7 @@ class ForecastRun(models.Model):
     horizon_months = models.IntegerField()
     scenario = models.ForeignKey('Scenario', on_delete=models.SET_NULL, null=True, blank=True)
     notes = models.TextField(blank=True, null=True)
+    source = models.CharField(max_length=20, default="request")  # "precompute" | "request" (persisted API call)
 
     def __str__(self):
         return f"Run #{self.pk} - {self.model_version} ({self.run_at:%Y-%m-%d})"
@@ -208,6 +285,15 @@ class ForecastResult(models.Model):
         unique_together = ('run', 'month', 'department', 'transactionType')
 
 
+class VersionStamp(models.Model):
+    """Named invalidation counter shared by every process (see services/forecast_cache.py)."""
+    key = models.CharField(max_length=64, unique=True)
+    value = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.key}={self.value}"
+
+
 # ==============================
 # Scenario Management
 # ==============================
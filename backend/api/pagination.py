@@ -0,0 +1,97 @@
+# backend/api/pagination.py
+"""
+Keyset (seek) pagination.
+
+Pages are ordered by ``(sort field, id)`` and the cursor is the last row's
+``(value, id)``, so the next page is ``WHERE (field, id) > (value, id) ORDER BY
+field, id LIMIT n``: an index range scan whatever the page depth, with no OFFSET
+and no COUNT(*). Rows inserted or deleted between requests never shift a page.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    ``?ordering=<field>|-<field>`` picks one of ``sort_fields`` (ties broken by id in the
+    same direction), ``?page_size=`` caps at ``max_page_size`` and ``?cursor=`` is the
+    opaque token from the previous page's ``next``.
+    """
+    sort_fields = ("dateRequested",)
+    default_ordering = "dateRequested"
+    page_size = 50
+    max_page_size = 500
+
+    def ordering(self, request) -> tuple[str, bool]:
+        raw = request.query_params.get("ordering") or self.default_ordering
+        field, desc = raw.lstrip("-"), raw.startswith("-")
+        if field not in self.sort_fields:
+            raise ValidationError({"ordering": f"Sort by one of: {', '.join(self.sort_fields)}."})
+        return field, desc
+
+    def _page_size(self, request) -> int:
+        try:
+            size = int(request.query_params.get("page_size", self.page_size))
+        except ValueError:
+            raise ValidationError({"page_size": "Must be an integer."})
+        return max(1, min(size, self.max_page_size))
+
+    @staticmethod
+    def encode_cursor(field: str, desc: bool, value, pk: int) -> str:
+        token = json.dumps({"o": f"{'-' if desc else ''}{field}", "v": str(value), "id": pk})
+        return base64.urlsafe_b64encode(token.encode()).decode().rstrip("=")
+
+    def _decode_cursor(self, raw: str, field: str, desc: bool, model):
+        try:
+            data = json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+            if data["o"] != f"{'-' if desc else ''}{field}":
+                raise ValueError("cursor belongs to another ordering")
+            return model._meta.get_field(field).to_python(data["v"]), int(data["id"])
+        except (ValueError, KeyError, TypeError, DjangoValidationError):
+            raise ValidationError({"cursor": "Invalid cursor."})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        field, desc = self.ordering(request)
+        size = self._page_size(request)
+        qs = queryset.order_by(f"-{field}" if desc else field, "-id" if desc else "id")
+
+        raw = request.query_params.get("cursor")
+        if raw:
+            value, pk = self._decode_cursor(raw, field, desc, queryset.model)
+            op = "lt" if desc else "gt"
+            # (field, id) > (value, id), with field >= value as the index range bound
+            qs = qs.filter(Q(**{f"{field}__{op}e": value}),
+                           Q(**{f"{field}__{op}": value}) | Q(**{f"id__{op}": pk}))
+
+        rows = list(qs[:size + 1])   # one extra row tells whether there is a next page
+        self.request = request
+        self.next_cursor = None
+        if len(rows) > size:
+            rows = rows[:size]
+            last = rows[-1]
+            self.next_cursor = self.encode_cursor(field, desc, getattr(last, field), last.pk)
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), "cursor", self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
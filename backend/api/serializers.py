@@ -37,11 +37,29 @@ class RequestForPaymentSerializer(serializers.ModelSerializer):
         validated_data['netTotal'] = amt + svc - ewt
         return super().create(validated_data)
         
-class RequestForPaymentsSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """``fields=[...]`` (e.g. from ``?fields=id,netTotal``) keeps only those declared fields."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class RequestForPaymentsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = RequestForPayment
         fields = ['id', 'requestedBy', 'description', 'dateRequested','currency', 'netTotal', ]
 
+class RequestForPaymentSearchSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    score = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = RequestForPayment
+        fields = ['id', 'requestedBy', 'payableTo', 'accountName', 'description', 'pr', 'po', 'rr',
+                  'dateRequested', 'currency', 'netTotal', 'score']
+
 class DepartmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Department
@@ -78,9 +96,11 @@ class ForecastRunSerializer(serializers.ModelSerializer):
         fields = ['run_at','model_version','horizon_months','scenario','notes']
 
 class ForecastResultSerializer(serializers.ModelSerializer):
+    department_name = serializers.CharField(source="department.name", read_only=True, default=None)
+
     class Meta:
         model = ForecastResult
-        fields = ['run','month','department','transactionType','p10','p50','p90','mean','reconciled','level']
+        fields = ['run','month','department','department_name','transactionType','p10','p50','p90','mean','reconciled','level']
 
 class DriversMonthlySerializer(serializers.ModelSerializer):
     department_name = serializers.CharField(source="department.name", read_only=True)
@@ -106,8 +126,7 @@ class MacroMonthlySerializer(serializers.ModelSerializer):
     class Meta:
         model = MacroMonthly
         fields = [
-            "month", "fxRate_PHP_USD", "inflationPct", "wageIndex",
-            "source", "release_version"
+            "id", "month", "fxRate_PHP_USD", "inflationPct", "wageIndex",
         ]
 
 class ScenarioSerializer(serializers.ModelSerializer):
@@ -0,0 +1,215 @@
+# backend/api/services/direct.py
+"""
+Direct multi-horizon forecasting.
+
+The recursive rollout (rollout.py) scores one month at a time and feeds each p50
+back before the next month's features exist, so the 12 steps are sequential and
+their errors compound. The direct models are ONE quantile set trained on every
+(origin, horizon) pair of the DriversMonthly panel with ``horizon`` (1..12) as a
+feature: the row ``h`` months after an origin gets the origin's lags / rollings
+(features.horizon_features) and drivers, plus the target month's macro, trend and
+calendar. Serving builds one (B·H x width) matrix from the last observed month and
+scores every horizon and quantile in a single call; nothing is fed back.
+
+Because nothing is fed back, a direct forecast splits EXACTLY into a model path
+(``DirectPath``: raw quantiles and overlay ratios, fixed by history, exog and driver
+deltas) and post-processing (rollout.postprocess: overlay, department uplift, sort).
+Requests that differ only in ``dept_pct`` reuse a cached path. This reuse is for
+direct mode only: the recursive rollout feeds back the p50 taken after
+post-processing, so its model inputs depend on every slider and no such split exists.
+
+Horizons are positional like the rollout's steps: horizon 1 is the first forecast
+month after the last stored month. The artifacts live in ``artifacts/direct/`` with
+the recursive set's file names (model_registry loads them into the bundle).
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .features import KEY, TARGET, LAGS, WINDOWS, MACRO_COLS, horizon_features, tail_features
+from .forecast_cache import forecast_key
+from .forecasting_service import FILENAMES, predict_quantiles
+from .model_registry import DIRECT_DIR, TRAIN_COLS_FILE
+from .rollout import ALPHAS, overlay_ratios, postprocess, run_rollout
+
+HORIZONS = 12
+MODES = ("recursive", "direct")
+DRIVER_COLS = ["enrolled_FTE_dept", "programLaunches_dept"]   # taken at the origin month
+
+DIRECT_COLS = [
+    KEY, "horizon", *MACRO_COLS, *DRIVER_COLS, "year",
+    *(f"m_{m}" for m in range(1, 13)), *(f"q_{q}" for q in range(1, 5)),
+    *(f"lag{L}" for L in LAGS),
+    *(f"roll{w}_{s}" for w in WINDOWS for s in ("mean", "std")),
+    "t",
+]
+
+PARAMS = {
+    "learning_rate": 0.05,
+    "num_leaves": 31,
+    "min_data_in_leaf": 20,
+    "feature_fraction": 0.9,
+    "bagging_fraction": 0.9,
+    "bagging_freq": 1,
+    "seed": 42,              # fixes bagging / feature sampling: same data -> same boosters and version
+    "deterministic": True,
+    "force_row_wise": True,
+    "verbose": -1,
+}
+
+
+# --------------------------
+# Training
+# --------------------------
+def training_frame(panel: pd.DataFrame, horizons: int = HORIZONS) -> pd.DataFrame:
+    """
+    Stacked (origin, horizon) training rows of ``panel`` (KEY, Date, y, macro and driver
+    columns, e.g. feature_store.feature_panel()) with exactly DIRECT_COLS + TARGET.
+    Rows without a target or without the origin's own y (lag1) are dropped.
+    """
+    parts = []
+    for h in range(1, horizons + 1):
+        df = horizon_features(panel, h)
+        g = df.groupby(KEY, sort=False)
+        for c in DRIVER_COLS:
+            df[c] = g[c].shift(h) if c in df.columns else 0
+        df["horizon"] = h
+        parts.append(df.dropna(subset=[TARGET, "lag1"]))
+    df = pd.concat(parts, ignore_index=True)
+    out = df.reindex(columns=DIRECT_COLS, fill_value=0)
+    out[KEY] = pd.Categorical(out[KEY], categories=sorted(out[KEY].unique()))
+    out[TARGET] = df[TARGET].to_numpy(dtype=float)
+    return out
+
+
+def train_direct(panel: pd.DataFrame, horizons: int = HORIZONS, num_boost_round: int = 400,
+                 params: dict | None = None) -> dict:
+    """One LightGBM quantile booster per alpha over the stacked horizons; returns {alpha: Booster}."""
+    import lightgbm as lgb
+
+    df = training_frame(panel, horizons)
+    if df.empty:
+        raise ValueError("No training rows: every department needs history past its first month.")
+    X, y = df[DIRECT_COLS], df[TARGET]
+    models = {}
+    for alpha in FILENAMES:
+        data = lgb.Dataset(X, label=y, categorical_feature=[KEY], free_raw_data=False)
+        models[alpha] = lgb.train({**PARAMS, **(params or {}), "objective": "quantile", "alpha": alpha},
+                                  data, num_boost_round=num_boost_round)
+    return models
+
+
+def save_direct(models: dict, artifact_dir: Path | str) -> Path:
+    """Write the boosters and their train_columns.json under ``artifact_dir/direct``."""
+    base = Path(artifact_dir) / DIRECT_DIR
+    base.mkdir(parents=True, exist_ok=True)
+    for alpha, fname in FILENAMES.items():
+        models[alpha].save_model(str(base / fname))
+    # columns last: the registry only picks up a direct set once its train_columns.json exists
+    (base / TRAIN_COLS_FILE).write_text(json.dumps(DIRECT_COLS, indent=2))
+    return base
+
+
+# --------------------------
+# Serving
+# --------------------------
+def carry_forward(macro: np.ndarray, last: np.ndarray) -> np.ndarray:
+    """(B, H, 3) macro with NaN months filled by the last known value (``last`` (B, 3) before month 0)."""
+    out = np.array(macro, dtype=float)
+    prev = np.asarray(last, dtype=float)
+    for h in range(out.shape[1]):
+        out[:, h] = np.where(np.isnan(out[:, h]), prev, out[:, h])
+        prev = out[:, h]
+    return out
+
+
+class DirectPath:
+    """
+    The model part of a direct forecast for B series x H horizons: raw quantiles and
+    overlay ratios (rows horizon-major, see direct_path) plus the exog vectors behind them.
+    """
+
+    def __init__(self, B: int, H: int, raw: np.ndarray, ratios, base_exog: np.ndarray, scen_exog: np.ndarray):
+        self.B, self.H = B, H
+        self.raw = raw
+        self.ratios = ratios
+        self.base_exog = base_exog
+        self.scen_exog = scen_exog
+
+    def finish(self, dept_pct=0.0):
+        """``(quantiles (B, H, 3), last_step)`` after overlay, uplift and the non-crossing sort."""
+        B, H = self.B, self.H
+        scale = np.tile(1.0 + np.broadcast_to(np.asarray(dept_pct, dtype=float), (B,)), H)
+        p = postprocess(self.raw, self.ratios, scale)
+        last = slice((H - 1) * B, H * B)
+        last_step = {"base_exog": self.base_exog[last], "scen_exog": self.scen_exog[last],
+                     "ratios": self.ratios[last] if self.ratios is not None else None}
+        return p.reshape(H, B, len(ALPHAS)).transpose(1, 0, 2), last_step
+
+
+def direct_path(state, targets, models, schema, macro,
+                exog_delta=0.0, drivers_base=0.0, drivers_delta=0.0, elas=None) -> DirectPath:
+    """Model part (before post-processing) of every horizon of every series, in one predict call."""
+    B, H = state.size, len(targets)
+    macro = np.asarray(macro, dtype=float)
+    if macro.ndim == 2:
+        macro = np.broadcast_to(macro, (B,) + macro.shape)
+    exog_delta = np.broadcast_to(np.asarray(exog_delta, dtype=float), (B, len(MACRO_COLS)))
+    drivers_base = np.broadcast_to(np.asarray(drivers_base, dtype=float), (B, 2))
+    drivers_eff = drivers_base + np.broadcast_to(np.asarray(drivers_delta, dtype=float), (B, 2))
+
+    base = carry_forward(macro[:, :H], state.last_macro)      # (B, H, 3)
+    eff = base + exog_delta[:, None, :]
+
+    # rows are horizon-major: row h*B + i is series i at horizon h + 1
+    tail = state._ordered()
+    X = np.tile(schema.matrix(state.keys), (H, 1))
+    for h, tgt in enumerate(targets):
+        feats = tail_features(tail, state.first_year, pd.Timestamp(tgt).to_period("M").to_timestamp())
+        feats["horizon"] = h + 1
+        for j, c in enumerate(MACRO_COLS):
+            feats[c] = eff[:, h, j]
+        feats["enrolled_FTE_dept"] = drivers_eff[:, 0]
+        feats["programLaunches_dept"] = drivers_eff[:, 1]
+        schema.fill(X[h * B:(h + 1) * B], feats)
+
+    raw = predict_quantiles(models, X, ALPHAS)
+    base_exog = np.column_stack([base.transpose(1, 0, 2).reshape(H * B, -1), np.tile(drivers_base, (H, 1))])
+    scen_exog = np.column_stack([eff.transpose(1, 0, 2).reshape(H * B, -1), np.tile(drivers_eff, (H, 1))])
+    ratios = overlay_ratios(elas, base_exog, scen_exog) if elas else None
+    return DirectPath(B, H, raw, ratios, base_exog, scen_exog)
+
+
+def direct_forecast(state, targets, models, schema, macro,
+                    exog_delta=0.0, drivers_base=0.0, drivers_delta=0.0, dept_pct=0.0, elas=None):
+    """
+    Every horizon of every series in ``state`` from the direct models, in one predict call.
+
+    Arguments are run_rollout's. Returns ``(quantiles (B, H, 3), last_step)`` shaped like
+    run_rollout's: overlay, uplift and the non-crossing sort are applied per row.
+    """
+    path = direct_path(state, targets, models, schema, macro, exog_delta, drivers_base, drivers_delta, elas)
+    return path.finish(dept_pct)
+
+
+def path_key(department: str, scenario: dict, horizon_start, model_version: str) -> str:
+    """Cache key of a department's DirectPath: the forecast key without the post-processing slider."""
+    scen = {k: v for k, v in scenario.items() if k != "dept_pct"}
+    return forecast_key(department, {**scen, "stage": "direct_path"}, horizon_start, model_version)
+
+
+def run_forecast(bundle, mode: str, state, targets, macro, **scenario):
+    """
+    ``run_rollout`` (mode "recursive") or ``direct_forecast`` (mode "direct") with the
+    bundle's models; ``scenario`` holds the exog / driver / uplift arguments.
+    """
+    if mode == "direct":
+        if not bundle.has_direct:
+            raise ValueError("No direct models are loaded; run `manage.py train_direct` first.")
+        return direct_forecast(state, targets, bundle.direct_models, bundle.direct_schema, macro,
+                               elas=bundle.elas, **scenario)
+    if mode != "recursive":
+        raise ValueError(f"mode must be one of: {', '.join(MODES)}")
+    return run_rollout(state, targets, bundle.models, bundle.schema, macro, elas=bundle.elas, **scenario)
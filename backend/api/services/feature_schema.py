@@ -0,0 +1,66 @@
+# backend/api/services/feature_schema.py
+"""
+Compiled feature schema of one model version.
+
+``train_columns.json`` fixes the column order the boosters were trained on and the
+booster's ``pandas_categorical`` fixes how ``Department`` was encoded. Both are
+resolved ONCE per ModelBundle into a name -> column index map and a key -> code
+map, so inference fills a preallocated float matrix directly (the same matrix
+``Booster.predict`` builds internally from a DataFrame) instead of aligning,
+re-ordering and re-casting pandas frames at every horizon step.
+"""
+import numpy as np
+import pandas as pd
+
+KEY = "Department"
+
+
+class FeatureSchema:
+    """Column layout + categorical encoding of the training matrix."""
+
+    def __init__(self, train_cols: list[str], pandas_categorical: list | None = None):
+        self.columns = list(train_cols)
+        self.index = {c: j for j, c in enumerate(self.columns)}
+        if len(self.index) != len(self.columns):
+            raise ValueError("Duplicate names in train_columns.json.")
+
+        # The only categorical the models are trained with is the department key.
+        cat_cols = [KEY] if KEY in self.index else []
+        if cat_cols and len(cat_cols) != len(pandas_categorical or []):
+            raise ValueError("Categorical columns do not match the trained model.")
+        self.categories = list(pandas_categorical[0]) if cat_cols else []
+        self.codes = {c: float(i) for i, c in enumerate(self.categories)}
+
+    @classmethod
+    def for_models(cls, train_cols: list[str], models: dict) -> "FeatureSchema":
+        return cls(train_cols, next(iter(models.values())).pandas_categorical)
+
+    @property
+    def width(self) -> int:
+        return len(self.columns)
+
+    def encode_keys(self, keys) -> np.ndarray:
+        """Department codes as the boosters saw them in training; unknown keys -> NaN."""
+        return np.array([self.codes.get(k, np.nan) for k in keys], dtype=np.float64)
+
+    def matrix(self, keys) -> np.ndarray:
+        """Zeroed (len(keys) x width) matrix with the key column already encoded."""
+        X = np.zeros((len(keys), self.width))
+        if KEY in self.index:
+            X[:, self.index[KEY]] = self.encode_keys(keys)
+        return X
+
+    def fill(self, X: np.ndarray, feats: dict) -> np.ndarray:
+        """Write every feature the model knows into its column; the rest are ignored."""
+        for name, values in feats.items():
+            j = self.index.get(name)
+            if j is not None and name != KEY:
+                X[:, j] = values
+        return X
+
+    def align(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Frame with exactly the training columns (missing ones 0), e.g. for ad-hoc scoring or export."""
+        out = df.reindex(columns=self.columns, fill_value=0)
+        if KEY in self.index:
+            out[KEY] = pd.Categorical(out[KEY], categories=self.categories or None)
+        return out
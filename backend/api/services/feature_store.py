@@ -0,0 +1,131 @@
+# backend/api/services/feature_store.py
+"""
+Materialized engineered features (DriversFeatures), keyed by (department, month_idx).
+
+Lags, rollings, yoy and level_shift12 of a DriversMonthly row depend only on that
+department's previous 12 rows, so a write changes at most the written row and the
+12 rows after it. ``refresh_window`` recomputes just those rows (the whole
+department when its first month, and with it the trend origin of ``t``, may have
+moved); ``rebuild`` recomputes everything, e.g. after bulk loads that bypass the
+model signals. Values come from ``features.panel_features``, the same definitions
+inference uses, and ``feature_panel`` serves them back as a training / backtesting
+frame without rebuilding the panel.
+"""
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+
+from api.models import Department, DriversFeatures, DriversMonthly
+from .features import KEY, TARGET, LAGS, WINDOWS, HIST_LEN, MACRO_COLS, DRIVER_COLS, panel_features, calendar_features
+from .macro_store import get_macro_store, months_index
+
+FEATURE_FIELDS = (
+    [f"lag{L}" for L in LAGS]
+    + [f"roll{w}_{s}" for w in WINDOWS for s in ("mean", "std")]
+    + ["yoy", "level_shift12", "t"]
+)
+
+
+def _series(department_id: int):
+    """(months as Timestamps, y) of one department, oldest first."""
+    rows = list(DriversMonthly.objects
+                .filter(department_id=department_id)
+                .order_by("month", "id")
+                .values_list("month", Cast("totalNet", FloatField())))
+    months = pd.DatetimeIndex([r[0] for r in rows]).to_period("M").to_timestamp()
+    y = np.array([r[1] for r in rows], dtype=float)
+    return months, y
+
+
+def _rows(department_id: int, months: pd.DatetimeIndex, y: np.ndarray, lo: int, hi: int) -> list:
+    """DriversFeatures for positions lo..hi-1 of a department's series."""
+    a = max(0, lo - HIST_LEN)  # the 12 rows before ``lo`` feed its lags / rollings
+    panel = pd.DataFrame({KEY: department_id, "Date": months[a:hi], TARGET: y[a:hi]})
+    feats = panel_features(panel).iloc[lo - a:]
+    # t counts from the department's first year, not the slice's
+    feats["t"] = (feats["Date"].dt.year - months[0].year) * 12 + feats["Date"].dt.month
+
+    out = {}
+    month_idx = months_index(feats["Date"])
+    for m, rec in zip(month_idx, feats[["Date", *FEATURE_FIELDS]].itertuples(index=False)):
+        vals = {f: (None if pd.isna(v) else float(v)) for f, v in zip(FEATURE_FIELDS, rec[1:])}
+        vals["level_shift12"], vals["t"] = int(vals["level_shift12"]), int(vals["t"])
+        # duplicate rows for one month: the later row wins
+        out[m] = DriversFeatures(department_id=department_id, month_idx=int(m), month=rec[0].date(), **vals)
+    return list(out.values())
+
+
+def _upsert(objs: list) -> None:
+    DriversFeatures.objects.bulk_create(
+        objs, batch_size=1000, update_conflicts=True,
+        unique_fields=["department", "month_idx"], update_fields=["month", *FEATURE_FIELDS],
+    )
+
+
+def _rebuild_department(department_id: int, months: pd.DatetimeIndex, y: np.ndarray) -> int:
+    objs = _rows(department_id, months, y, 0, len(y)) if len(y) else []
+    stale = DriversFeatures.objects.filter(department_id=department_id)
+    if objs:
+        stale = stale.exclude(month_idx__in=[o.month_idx for o in objs])
+    stale.delete()
+    _upsert(objs)
+    return len(objs)
+
+
+def refresh_window(department_id: int, month) -> int:
+    """Recompute the features a write to (department, month) can change; returns rows written."""
+    months, y = _series(department_id)
+    m = int(months_index([month])[0])
+    idx = months_index(months)
+    with transaction.atomic():
+        k = int(np.searchsorted(idx, m))     # first row at / after the written month
+        if k == 0:
+            return _rebuild_department(department_id, months, y)
+        if m not in idx:
+            DriversFeatures.objects.filter(department_id=department_id, month_idx=m).delete()
+        objs = _rows(department_id, months, y, k, min(len(y), k + HIST_LEN + 1))
+        _upsert(objs)
+        return len(objs)
+
+
+def rebuild(department_ids=None) -> int:
+    """Recompute every stored feature row (optionally for some departments only)."""
+    ids = department_ids if department_ids is not None else list(Department.objects.values_list("id", flat=True))
+    written = 0
+    with transaction.atomic():
+        for dept_id in ids:
+            written += _rebuild_department(dept_id, *_series(dept_id))
+    return written
+
+
+def feature_panel(department_ids=None) -> pd.DataFrame:
+    """
+    Whole-panel training / backtesting frame from the stored features: KEY, Date, y,
+    macro, driver, calendar and engineered columns (select with FeatureSchema.align).
+    """
+    drivers = DriversMonthly.objects.order_by("department__name", "month", "id")
+    feats = DriversFeatures.objects.all()
+    if department_ids is not None:
+        drivers = drivers.filter(department_id__in=department_ids)
+        feats = feats.filter(department_id__in=department_ids)
+
+    df = pd.DataFrame(list(drivers.values("department_id", "department__name", "month", "totalNet", *DRIVER_COLS)))
+    if df.empty:
+        return df
+    df = df.rename(columns={"department__name": KEY, "totalNet": TARGET})
+    df["Date"] = pd.to_datetime(df["month"]).dt.to_period("M").dt.to_timestamp()
+    df = df.drop_duplicates(subset=["department_id", "Date"], keep="last")
+    for c in [TARGET, *DRIVER_COLS]:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    df["_month_idx"] = months_index(df["Date"])
+    df[MACRO_COLS] = get_macro_store().lookup(df["_month_idx"].to_numpy())
+    for c, v in calendar_features(df["Date"]).items():
+        df[c] = v
+
+    stored = pd.DataFrame(list(feats.values("department_id", "month_idx", *FEATURE_FIELDS)),
+                          columns=["department_id", "month_idx", *FEATURE_FIELDS])
+    stored = stored.rename(columns={"month_idx": "_month_idx"})
+    df = df.merge(stored, on=["department_id", "_month_idx"], how="left")
+    return df.drop(columns=["month", "department_id", "_month_idx"]).reset_index(drop=True)
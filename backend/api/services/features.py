@@ -1,33 +1,185 @@
 # backend/api/services/features.py
-import json
-from pathlib import Path
+"""
+Feature pipeline shared by training, batch jobs and the forecast endpoints.
+
+One set of definitions, three modes:
+
+- ``panel_features(panel)``: whole-panel mode. Every (Department, month) row of a
+  multi-department panel gets its lags / rollings / yoy / regime / trend / calendar
+  features with vectorized groupby ops (training and backtesting).
+- ``tail_features(tail, first_year, tgt_ts)``: last-row mode. Features of the row
+  that FOLLOWS each series' history, computed from its last 12 targets only
+  (inference; ``rollout.RolloutState`` keeps that tail up to date per step).
+- ``horizon_features(panel, h)``: whole-panel mode for the direct models: every row
+  gets the features last-row mode would give it from the history ``h`` rows earlier
+  (training the horizon-``h`` part of services/direct.py).
+
+For the month after a series' history both modes give the same values: the target's
+own y is unknown, so yoy is NaN and level_shift12 is 0. Select the model's columns
+with ``FeatureSchema.align`` / ``FeatureSchema.fill``; absent columns are 0.
+"""
 import pandas as pd
 import numpy as np
-from django.db.models import F
-from api.models import DriversMonthly, MacroMonthly, Department
+from api.models import Department
+from .macro_store import get_macro_store
+from .model_registry import get_bundle
 
-ARTIFACT_DIR = Path(__file__).resolve().parents[2] / "artifacts"
-TRAIN_COLS_PATH = ARTIFACT_DIR / "train_columns.json"
 KEY = "Department"
 TARGET = "y"
 
+LAGS = [1, 3, 12]
+WINDOWS = [3, 6, 12]
+HIST_LEN = 12                                 # longest lag / rolling window
+MACRO_COLS = ["fxRate", "inflationPct", "wageIndex"]
+LEVEL_SHIFT = 0.35                            # |12-month change| that flags a regime shift
+DRIVER_COLS = ["month_idx", "enrolled_FTE_dept", "programLaunches_dept", "activeProg_lab_dept",
+               "capexBudget", "approvalLeadTimeDays", "govFundShare", "isEmergency", "mopBankTransferPct"]
+
+
 def _month_idx(dt):
     return (dt.year - 2015) * 12 + (dt.month - 1) + 1
 
-def _ensure_train_cols(df: pd.DataFrame) -> pd.DataFrame:
-    cols = json.loads(TRAIN_COLS_PATH.read_text())
-    # add any missing columns as 0 / NaN as appropriate (0 works for one-hot, rollings, trend)
-    for c in cols:
-        if c not in df.columns:
-            df[c] = 0
-    # drop anything the model doesn’t know
-    return df[cols]
+
+# --------------------------
+# Whole-panel mode
+# --------------------------
+def calendar_features(dates) -> dict:
+    """year, m_1..m_12 and q_1..q_4 one-hots for an array of month timestamps."""
+    dates = pd.DatetimeIndex(dates)
+    feats = {"year": dates.year.to_numpy()}
+    month, qtr = dates.month.to_numpy(), dates.quarter.to_numpy()
+    for m in range(1, 13):
+        feats[f"m_{m}"] = (month == m).astype(int)
+    for q in range(1, 5):
+        feats[f"q_{q}"] = (qtr == q).astype(int)
+    return feats
+
+
+def panel_features(panel: pd.DataFrame) -> pd.DataFrame:
+    """
+    Whole-panel mode: ``panel`` has one row per (KEY, Date month) with TARGET and any
+    exogenous columns; returns it sorted by KEY, Date with every feature column added.
+    Lags are positional within each department (rows are consecutive months).
+    """
+    df = panel.sort_values([KEY, "Date"], kind="stable").reset_index(drop=True)
+    df["Date"] = pd.to_datetime(df["Date"]).dt.to_period("M").dt.to_timestamp()
+    y = pd.to_numeric(df[TARGET], errors="coerce").astype(float)
+    df[TARGET] = y
+    g = y.groupby(df[KEY], sort=False)
+
+    for L in LAGS:
+        df[f"lag{L}"] = g.shift(L)
+    # prev is NaN on each department's first row, so a plain rolling window that
+    # reaches back into the previous department is NaN too: no per-group rolling needed
+    prev = g.shift(1)
+    for w in WINDOWS:
+        roll = prev.rolling(w)
+        df[f"roll{w}_mean"] = roll.mean()
+        df[f"roll{w}_std"] = roll.std()
+    df["yoy"] = y / g.shift(12) - 1.0
+    df["level_shift12"] = (df["yoy"].abs() > LEVEL_SHIFT).astype(int)
+
+    first_year = df.groupby(KEY, sort=False)["Date"].transform("min").dt.year
+    df["t"] = (df["Date"].dt.year - first_year) * 12 + df["Date"].dt.month
+    for c, v in calendar_features(df["Date"]).items():
+        df[c] = v
+    return df
+
+
+def horizon_features(panel: pd.DataFrame, horizon: int) -> pd.DataFrame:
+    """
+    Whole-panel mode as seen ``horizon`` rows before each target row: lags and rollings
+    end at the origin row ``horizon`` positions earlier, trend / calendar are the target
+    row's. yoy is NaN and level_shift12 0, as in last-row mode (the target's y is unknown),
+    so ``horizon_features(panel, h)`` matches ``tail_features`` from that origin.
+    """
+    df = panel.sort_values([KEY, "Date"], kind="stable").reset_index(drop=True)
+    df["Date"] = pd.to_datetime(df["Date"]).dt.to_period("M").dt.to_timestamp()
+    y = pd.to_numeric(df[TARGET], errors="coerce").astype(float)
+    df[TARGET] = y
+    g = y.groupby(df[KEY], sort=False)
+
+    for L in LAGS:
+        df[f"lag{L}"] = g.shift(L + horizon - 1)
+    # origin is NaN on each department's first ``horizon`` rows: no per-group rolling needed
+    origin = g.shift(horizon)
+    for w in WINDOWS:
+        roll = origin.rolling(w)
+        df[f"roll{w}_mean"] = roll.mean()
+        df[f"roll{w}_std"] = roll.std()
+    df["yoy"] = np.nan
+    df["level_shift12"] = 0
+
+    first_year = df.groupby(KEY, sort=False)["Date"].transform("min").dt.year
+    df["t"] = (df["Date"].dt.year - first_year) * 12 + df["Date"].dt.month
+    for c, v in calendar_features(df["Date"]).items():
+        df[c] = v
+    return df
+
+
+# --------------------------
+# Last-row mode
+# --------------------------
+def panel_tails(panel: pd.DataFrame):
+    """
+    Reduce a panel sorted by KEY, Date to what last-row mode needs per department:
+    ``(keys, tail (B, 12) oldest -> newest NaN-padded, first_year (B,), last_macro (B, 3) | None)``.
+    Departments keep the order in which they first appear.
+    """
+    codes, keys = pd.factorize(panel[KEY], sort=False)
+    g = panel.groupby(codes, sort=True)
+    pos = g.cumcount(ascending=False).to_numpy()       # 0 = latest month of each series
+    keep = pos < HIST_LEN
+    tail = np.full((len(keys), HIST_LEN), np.nan)
+    tail[codes[keep], HIST_LEN - 1 - pos[keep]] = pd.to_numeric(panel[TARGET], errors="coerce").to_numpy(dtype=float)[keep]
+
+    first_year = pd.to_datetime(g["Date"].min()).dt.year.to_numpy()
+    last_macro = None
+    if all(c in panel.columns for c in MACRO_COLS):
+        last_macro = g[MACRO_COLS].last().to_numpy(dtype=float)  # last non-NaN per column
+    return list(keys), tail, first_year, last_macro
+
+
+def tail_features(tail: np.ndarray, first_year, tgt_ts: pd.Timestamp) -> dict:
+    """
+    Last-row mode: recursive + calendar features of month ``tgt_ts`` for each series,
+    given its last 12 targets ``tail`` (B, 12), oldest -> newest, NaN-padded.
+    Only the active month / quarter one-hot is returned (the others are 0).
+    """
+    n = tail.shape[0]
+    feats = {}
+    for L in LAGS:
+        feats[f"lag{L}"] = tail[:, HIST_LEN - L]
+    for w in WINDOWS:
+        win = tail[:, HIST_LEN - w:]
+        # rolling(w) needs w observations: any NaN in the window -> NaN
+        feats[f"roll{w}_mean"] = win.mean(axis=1)
+        feats[f"roll{w}_std"] = win.std(axis=1, ddof=1)
+    # the target row's own y is unknown, so yoy is NaN and the 12m level shift never fires
+    feats["yoy"] = np.full(n, np.nan)
+    feats["level_shift12"] = np.zeros(n, dtype=int)
+    feats["t"] = (tgt_ts.year - np.asarray(first_year)) * 12 + tgt_ts.month
+
+    feats["year"] = np.full(n, tgt_ts.year)
+    feats[f"m_{tgt_ts.month}"] = np.ones(n, dtype=int)
+    feats[f"q_{tgt_ts.quarter}"] = np.ones(n, dtype=int)
+    return feats
+
+
+# --------------------------
+# Single inference row from the DB
+# --------------------------
 
 def build_features_for_forecast_from_db(department: str, target_date: str) -> pd.DataFrame:
     """
     Build ONE inference row for Department+Date from DriversMonthly + MacroMonthly.
 
-    Returns a DataFrame with the SAME columns (order) as artifacts/train_columns.json.
+    Recursive features come from the history BEFORE the target month (last-row mode);
+    drivers / macro come from the target month's row, or the latest row with the
+    target month's macro when the month isn't recorded yet.
+
+    Returns a DataFrame with the SAME columns (order) as the current model's
+    FeatureSchema (artifacts/train_columns.json).
     Raises ValueError if not enough history for required lags.
     """
     # Resolve department
@@ -36,128 +188,43 @@ def build_features_for_forecast_from_db(department: str, target_date: str) -> pd
     except Department.DoesNotExist:
         raise ValueError(f"Unknown department: {department}")
 
-    # Pull historical monthly rows (need at least 13 months for lag12 features)
-    qs = (
-        DriversMonthly.objects
-        .filter(department=dept_obj)
-        .select_related("macro")
-        .order_by("month")
-        .values(
-            "month",
-            "totalNet",
-            "enrolled_FTE_dept",
-            "activeProg_lab_dept",
-            "programLaunches_dept",
-            "capexBudget",
-            "approvalLeadTimeDays",
-            "govFundShare",
-            "mopBankTransferPct",
-            "isEmergency",
-            "month_idx",
-            macro_fx=F("macro__fxRate_PHP_USD"),
-            macro_inf=F("macro__inflationPct"),
-            macro_wage=F("macro__wageIndex"),
-        )
-    )
-    raw = pd.DataFrame(list(qs))
-    if raw.empty:
+    # History + same-month macro as float columns (one query; need 13+ months for lag12)
+    from .history import HISTORY_COLS, fetch_history  # history -> rollout -> features
+    extra = [c for c in DRIVER_COLS if c not in HISTORY_COLS]
+    _, values = fetch_history(*extra, department=dept_obj)
+    if not len(values):
         raise ValueError(f"No DriversMonthly history for {department}")
+    cols = dict(zip(HISTORY_COLS + extra, values.T))
 
-    # Join macro for safety if some rows missed it (fall back by exact month)
-    if raw[["macro_fx","macro_inf","macro_wage"]].isna().any().any():
-        mdf = pd.DataFrame(list(MacroMonthly.objects.all().values("month","fxRate_PHP_USD","inflationPct","wageIndex")))
-        if not mdf.empty:
-            raw = raw.merge(
-                mdf.rename(columns={
-                    "fxRate_PHP_USD":"macro_fx",
-                    "inflationPct":"macro_inf",
-                    "wageIndex":"macro_wage"
-                }),
-                on="month", how="left", suffixes=("","_m2")
-            )
-            # prefer FK values then fallback to direct join
-            for a,b in [("macro_fx","macro_fx_m2"),("macro_inf","macro_inf_m2"),("macro_wage","macro_wage_m2")]:
-                raw[a] = raw[a].fillna(raw[b])
-            raw = raw.drop(columns=[c for c in raw.columns if c.endswith("_m2")], errors="ignore")
-
-    # Coerce types
-    raw["Date"] = pd.to_datetime(raw["month"])
-    raw[KEY] = dept_obj.name
-    raw[TARGET] = pd.to_numeric(raw["totalNet"], errors="coerce")
-    # basic macro names to match training (rename)
-    raw["fxRate"] = pd.to_numeric(raw["macro_fx"], errors="coerce")
-    raw["inflationPct"] = pd.to_numeric(raw["macro_inf"], errors="coerce")
-    raw["wageIndex"] = pd.to_numeric(raw["macro_wage"], errors="coerce")
-    raw["capexBudget"] = pd.to_numeric(raw["capexBudget"], errors="coerce")
-
-    # Calendar features
-    raw = raw.sort_values(["Date"]).reset_index(drop=True)
-    raw["year"]  = raw["Date"].dt.year
-    raw["month_num"] = raw["Date"].dt.month
-    raw["qtr"]   = raw["Date"].dt.quarter
-
-    # One-hot month & quarter like training
-    df = pd.get_dummies(raw, columns=["month_num","qtr"], prefix=["m","q"])
-
-    # Lags & rollings (on y)
-    df["lag1"]  = df[TARGET].shift(1)
-    df["lag3"]  = df[TARGET].shift(3)
-    df["lag12"] = df[TARGET].shift(12)
-
-    for w in [3,6,12]:
-        df[f"roll{w}_mean"] = df[TARGET].shift(1).rolling(w).mean()
-        df[f"roll{w}_std"]  = df[TARGET].shift(1).rolling(w).std()
-
-    # YoY and level shift
-    df["yoy"] = df[TARGET] / df[TARGET].shift(12) - 1.0
-    df["level_shift12"] = (df[TARGET].pct_change(12).abs() > 0.35).astype(int)
-
-    # global time trend
-    t0 = df["Date"].dt.year.min()
-    df["t"] = (df["Date"].dt.year - t0) * 12 + df["Date"].dt.month
-
-    # choose the target month row (normalize to first of month)
+    # choose the target month (normalize to first of month); only earlier rows feed the lags
     target = pd.to_datetime(target_date)
     target1 = pd.Timestamp(year=target.year, month=target.month, day=1)
+    ym = cols["year"] * 12 + cols["month"]
+    before = np.flatnonzero(ym < target1.year * 12 + target1.month)
+    if not len(before):
+        raise ValueError("Not enough history to compute lag12 features for this department/date.")
 
-    # if requested month not present yet in history, append placeholder row (common)
-    if target1 not in set(df["Date"]):
-        last = df.iloc[-1:].copy()
-        new = last.copy()
-        new["Date"] = target1
-        # keep macro from MacroMonthly table for that month if available
-        try:
-            mm = MacroMonthly.objects.get(month=target1)
-            new["fxRate"] = float(mm.fxRate_PHP_USD) if mm.fxRate_PHP_USD is not None else np.nan
-            new["inflationPct"] = float(mm.inflationPct) if mm.inflationPct is not None else np.nan
-            new["wageIndex"] = float(mm.wageIndex) if mm.wageIndex is not None else np.nan
-        except MacroMonthly.DoesNotExist:
-            pass
-        # totalNet (y) is unknown at forecast time
-        new[TARGET] = np.nan
-        df = pd.concat([df, new], ignore_index=True).sort_values("Date").reset_index(drop=True)
-
-        # recompute lags/rollings for the appended last row
-        for col in ["lag1","lag3","lag12","roll3_mean","roll6_mean","roll12_mean","roll3_std","roll6_std","roll12_std","yoy","level_shift12","t"]:
-            if col in df.columns:
-                # recompute vector already done above; OK.
-
-                pass
-
-    # Keep only rows up to target1 (to avoid leakage)
-    df = df[df["Date"] <= target1].copy()
-
+    y = cols[TARGET][before][-HIST_LEN:]
+    tail = np.full((1, HIST_LEN), np.nan)
+    tail[0, HIST_LEN - len(y):] = y
+    feats = tail_features(tail, cols["year"][:1].astype(int), target1)
     # Need lag12 to be available
-    if df["lag12"].isna().iloc[-1]:
+    if np.isnan(feats["lag12"][0]):
         raise ValueError("Not enough history to compute lag12 features for this department/date.")
 
-    # Build inference row
-    row = df.iloc[[-1]].copy()
-    # Add categorical Department exactly like training (category dtype)
-    row[KEY] = row[KEY].astype("category")
-
-    # Bring columns to model order
-    row = row.drop(columns=["month","totalNet","macro_fx","macro_inf","macro_wage"], errors="ignore")
-    row = _ensure_train_cols(row)
-
-    return row
+    at_target = np.flatnonzero(ym == target1.year * 12 + target1.month)
+    exog = {c: cols[c][at_target[-1] if len(at_target) else before[-1]] for c in MACRO_COLS + DRIVER_COLS}
+    if not len(at_target):
+        # month not recorded yet (common): latest drivers, macro of the target month if known
+        exog["month_idx"] = _month_idx(target1)
+        store = get_macro_store()
+        if store.has([exog["month_idx"]])[0]:
+            exog.update(zip(MACRO_COLS, store.lookup([exog["month_idx"]])[0]))
+
+    row = pd.DataFrame({c: [v] for c, v in exog.items()})
+    for c, v in feats.items():
+        row[c] = v
+    row[KEY] = dept_obj.name
+
+    # Bring columns to model order (Department as the trained category)
+    return get_bundle().schema.align(row)
@@ -0,0 +1,101 @@
+# backend/api/services/forecast_cache.py
+"""
+Versioned cache for next-year forecast responses.
+
+Keys combine the request (department, normalized sliders, horizon start) with the
+model bundle version (see model_registry) and a data version. The data version
+is bumped by the DriversMonthly / MacroMonthly signal handlers, so every cached forecast built on
+older data simply stops matching; the backend's LRU eviction reclaims the space.
+The backend is the "forecast" entry of settings.CACHES (local memory by default,
+file or database cache to share entries between workers).
+
+Version stamps (data, macro, search, lookups, rollup) are VersionStamp rows, not
+cache entries: a per-process cache would never see a bump made by another process
+(a management command, a shell, another server worker). Reading one is a single
+indexed SELECT; a bump is an UPDATE inside the writer's transaction, so readers see
+it exactly when the write commits.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from api.models import VersionStamp
+
+CACHE_ALIAS = "forecast"
+DATA_VERSION_KEY = "forecast:data_version"
+
+
+def get_cache():
+    return caches[CACHE_ALIAS if CACHE_ALIAS in settings.CACHES else "default"]
+
+
+def _seed(key: str) -> int:
+    """Create a stamp, seeded from the clock so a recreated stamp never reuses an old version."""
+    try:
+        with transaction.atomic():
+            return VersionStamp.objects.create(key=key, value=int(time.time() * 1000)).value
+    except IntegrityError:   # created concurrently
+        return VersionStamp.objects.values_list("value", flat=True).get(key=key)
+
+
+def version(key: str) -> int:
+    """Current value of a version stamp (created on first use)."""
+    v = VersionStamp.objects.filter(key=key).values_list("value", flat=True).first()
+    return int(v) if v is not None else _seed(key)
+
+
+def bump_version(key: str) -> None:
+    if not VersionStamp.objects.filter(key=key).update(value=F("value") + 1):
+        _seed(key)
+
+
+def versions(keys: list[str]) -> list[int]:
+    """Current values of several stamps in one query (missing ones are created)."""
+    found = dict(VersionStamp.objects.filter(key__in=keys).values_list("key", "value"))
+    return [int(found[k]) if k in found else _seed(k) for k in keys]
+
+
+def department_version_key(department_id: int) -> str:
+    return f"forecast:dept_version:{department_id}"
+
+
+def bump_department_versions(department_ids) -> None:
+    """A department's DriversMonthly rows changed: caches built on its history alone are stale."""
+    keys = [department_version_key(i) for i in sorted(set(department_ids))]
+    if VersionStamp.objects.filter(key__in=keys).update(value=F("value") + 1) < len(keys):
+        present = set(VersionStamp.objects.filter(key__in=keys).values_list("key", flat=True))
+        for k in keys:
+            if k not in present:
+                _seed(k)
+
+
+def data_version() -> int:
+    return version(DATA_VERSION_KEY)
+
+
+def bump_data_version() -> None:
+    """Invalidate every cached forecast (called on DriversMonthly / MacroMonthly writes)."""
+    bump_version(DATA_VERSION_KEY)
+
+
+def forecast_key(department: str, scenario: dict, horizon_start, model_version: str) -> str:
+    """Cache key for one forecast request under the given model bundle version."""
+    req = json.dumps(
+        {"dept": department, "scen": {k: scenario[k] for k in sorted(scenario)}, "start": f"{horizon_start:%Y-%m}"},
+        sort_keys=True, default=str,
+    )
+    digest = hashlib.sha1(req.encode()).hexdigest()
+    return f"forecast:{model_version}:{data_version()}:{digest}"
+
+
+def get_forecast(key: str):
+    return get_cache().get(key)
+
+
+def set_forecast(key: str, payload: dict) -> None:
+    get_cache().set(key, payload)
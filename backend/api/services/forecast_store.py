@@ -0,0 +1,105 @@
+# backend/api/services/forecast_store.py
+"""
+Persistence of forecast runs.
+
+A run is one ForecastRun row plus one ForecastResult row per (department, month),
+written with a single bulk_create inside a transaction. ``source`` tells the
+precomputed baseline / scenario runs (precompute_forecasts) from forecasts persisted
+by API requests, so a persisted slider or direct-mode run never shadows the baseline.
+"""
+import json
+import math
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max
+
+from api.models import Department, ForecastRun, ForecastResult
+from .model_registry import get_bundle
+
+BULK_BATCH_SIZE = 1000
+PRECOMPUTE = "precompute"
+REQUEST = "request"
+SOURCES = (PRECOMPUTE, REQUEST)
+
+
+def model_version() -> str:
+    return f"lgb-{get_bundle().version}"
+
+
+def _dec(x):
+    """Float -> Decimal(14, 2); NaN/None -> None."""
+    if x is None or (isinstance(x, float) and not math.isfinite(x)):
+        return None
+    return Decimal(str(round(float(x), 2)))
+
+
+def save_forecast_run(forecasts: dict, horizon: int = 12, scenario=None, assumptions: dict | None = None,
+                      notes: str | None = None, departments: dict | None = None,
+                      version: str | None = None, source: str = REQUEST) -> ForecastRun:
+    """
+    Record one forecast computation.
+
+    forecasts   : {department name: [{"date": "YYYY-MM", "p10", "p50", "p90"}, ...]}
+    assumptions : sliders used; stored as JSON in ``notes`` unless notes are given
+    departments : optional {name: Department} to skip the lookup query
+    version     : model bundle version the forecasts came from (default: current)
+    source      : PRECOMPUTE for precompute_forecasts runs, REQUEST for persisted API calls
+    """
+    if departments is None:
+        departments = {d.name: d for d in Department.objects.filter(name__in=list(forecasts))}
+    if notes is None and assumptions is not None:
+        notes = json.dumps(assumptions, sort_keys=True)
+
+    with transaction.atomic():
+        run = ForecastRun.objects.create(
+            model_version=f"lgb-{version}" if version else model_version(),
+            horizon_months=horizon,
+            scenario=scenario,
+            notes=notes,
+            source=source,
+        )
+        rows = [
+            ForecastResult(
+                run=run,
+                month=f"{r['date']}-01",
+                department=departments.get(name),
+                p10=_dec(r["p10"]),
+                p50=_dec(r["p50"]),
+                p90=_dec(r["p90"]),
+                level="department",
+            )
+            for name, rows in forecasts.items()
+            for r in rows
+        ]
+        ForecastResult.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE)
+    return run
+
+
+def latest_results(department: str | None = None, scenario: str | None = None,
+                   start=None, end=None, run_id: int | None = None, source: str = PRECOMPUTE):
+    """
+    ForecastResult rows of the latest matching run of ``source`` (or of ``run_id``).
+
+    ``scenario`` is a scenarioCode; without it (and without ``run_id``) only runs made
+    outside any Scenario (the baseline, or persisted slider requests with source REQUEST)
+    are considered. ``run_id`` selects that run whatever its source or scenario.
+    """
+    qs = ForecastResult.objects.select_related("department", "run")
+    if department:
+        qs = qs.filter(department__name__iexact=department)
+    if scenario:
+        qs = qs.filter(run__scenario__scenarioCode=scenario)
+    elif run_id is None:
+        qs = qs.filter(run__scenario__isnull=True)
+    if start:
+        qs = qs.filter(month__gte=start)
+    if end:
+        qs = qs.filter(month__lte=end)
+
+    if run_id is None:
+        qs = qs.filter(run__source=source)
+        run_id = qs.aggregate(latest=Max("run_id"))["latest"]
+        if run_id is None:
+            return qs.none()
+    return qs.filter(run_id=run_id).order_by("department__name", "month")
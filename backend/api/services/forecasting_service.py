@@ -1,7 +1,15 @@
 # backend/api/services/forecasting_service.py
+import logging
+import weakref
 import lightgbm as lgb
+import numpy as np
+import pandas as pd
 from pathlib import Path
 
+from .tree_eval import CompiledForest
+
+logger = logging.getLogger(__name__)
+
 # services/ -> api/ -> backend/  (we want backend/artifacts)
 ARTIFACT_DIR = Path(__file__).resolve().parents[2] / "artifacts"
 
@@ -26,4 +34,94 @@ def load_models(artifact_dir: Path | str | None = None):
     return {
         alpha: lgb.Booster(model_file=str(base / fname))
         for alpha, fname in FILENAMES.items()
-    }
\ No newline at end of file
+    }
+
+ALPHAS = list(FILENAMES)
+
+# booster -> (alphas, CompiledForest | None); entries go away with the boosters
+_COMPILED = weakref.WeakKeyDictionary()
+
+
+def inference_backend() -> str:
+    """settings.FORECAST_INFERENCE_BACKEND: "lightgbm" (default) or "numpy"."""
+    try:
+        from django.conf import settings
+        if settings.configured:
+            return getattr(settings, "FORECAST_INFERENCE_BACKEND", "lightgbm")
+    except ImportError:
+        pass
+    return "lightgbm"
+
+
+def compiled_forest(models: dict, alphas=ALPHAS):
+    """
+    NumPy evaluator for ``models`` (compiled and verified once per booster set).
+
+    Returns None when the models can't be compiled or the compiled forest does not
+    reproduce Booster.predict; callers then fall back to LightGBM.
+    """
+    key = models[alphas[0]]
+    hit = _COMPILED.get(key)
+    if hit is not None and hit[0] == tuple(alphas):
+        return hit[1]
+
+    boosters = [models[a] for a in alphas]
+    try:
+        forest = CompiledForest(boosters)
+        if not forest.verify(boosters):
+            forest = None
+    except ValueError as e:
+        logger.warning("Compiled forest unavailable, using LightGBM: %s", e)
+        forest = None
+    _COMPILED[key] = (tuple(alphas), forest)
+    return forest
+
+
+def encode_frame(X: pd.DataFrame, pandas_categorical: list | None) -> np.ndarray:
+    """
+    Turn an aligned feature frame into the float matrix LightGBM scores internally.
+
+    Category columns are re-coded against the categories the booster was trained with
+    (unknown values -> NaN), exactly like ``Booster.predict`` does for DataFrames, so
+    the result can be scored by every booster without repeating that work.
+    """
+    cat_cols = [c for c in X.columns if isinstance(X[c].dtype, pd.CategoricalDtype)]
+    if cat_cols and len(cat_cols) != len(pandas_categorical or []):
+        raise ValueError("Categorical columns do not match the trained model.")
+
+    M = np.empty(X.shape, dtype=np.float64)
+    cats = dict(zip(cat_cols, pandas_categorical or []))
+    for j, c in enumerate(X.columns):
+        if c in cats:
+            codes = X[c].cat.set_categories(cats[c]).cat.codes.to_numpy()
+            M[:, j] = np.where(codes < 0, np.nan, codes)
+        else:
+            M[:, j] = X[c].to_numpy(dtype=np.float64, na_value=np.nan)
+    return M
+
+
+def predict_quantiles(models: dict, X, alphas=ALPHAS) -> np.ndarray:
+    """
+    Score a feature matrix with every quantile booster; returns (rows x len(alphas)).
+
+    ``X`` is either a DataFrame aligned to the training columns or an already
+    encoded float matrix. DataFrames are validated and encoded once, then each
+    booster scores the plain matrix (no per-booster pandas round trip). With
+    FORECAST_INFERENCE_BACKEND = "numpy" all quantiles come from one pass of the
+    compiled tree evaluator instead.
+    """
+    if isinstance(X, pd.DataFrame):
+        X = encode_frame(X, models[alphas[0]].pandas_categorical)
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+
+    if inference_backend() == "numpy":
+        forest = compiled_forest(models, alphas)
+        if forest is not None:
+            return forest.predict(X)
+
+    out = np.empty((X.shape[0], len(alphas)))
+    for i, a in enumerate(alphas):
+        out[:, i] = models[a].predict(X)
+    return out
@@ -0,0 +1,111 @@
+# backend/api/services/history.py
+"""
+History / macro loading for the forecasting endpoints and batch jobs.
+
+History is fetched as typed columns: ONE query, the database casts every number to
+float and the rows go straight into a NumPy array (no Decimal objects, no DataFrame
+round trip). Macro values come from the in-process macro store (macro_store.py).
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+from django.db.models import FloatField
+from django.db.models.functions import Cast, ExtractMonth, ExtractYear
+
+from api.models import DriversMonthly
+from .macro_store import get_macro_store, month_index
+from .rollout import RolloutState, TARGET, MACRO_COLS, BUF_LEN
+
+DRIVER_BASE_COLS = ["enrolled_FTE_dept", "programLaunches_dept"]
+
+# columns of fetch_history()'s value matrix
+HISTORY_COLS = ["year", "month", TARGET, *MACRO_COLS, *DRIVER_BASE_COLS]
+_YEAR, _MONTH, _Y = (HISTORY_COLS.index(c) for c in ("year", "month", TARGET))
+_MACRO = slice(HISTORY_COLS.index(MACRO_COLS[0]), HISTORY_COLS.index(MACRO_COLS[-1]) + 1)
+_DRIVERS = slice(HISTORY_COLS.index(DRIVER_BASE_COLS[0]), HISTORY_COLS.index(DRIVER_BASE_COLS[-1]) + 1)
+
+
+def _float(expr):
+    return Cast(expr, FloatField())
+
+
+def horizon_targets(months: int = 12) -> list:
+    """First-of-month timestamps starting next month."""
+    start = date.today().replace(day=1) + relativedelta(months=1)
+    return [pd.Timestamp(start + relativedelta(months=i)) for i in range(months)]
+
+
+def horizon_macro(months) -> np.ndarray:
+    """(len(months), 3) fx / inflation / wage for each horizon month, NaN where missing."""
+    return get_macro_store().for_months(months)
+
+
+def fetch_history(*extra, **filters):
+    """
+    DriversMonthly rows matching ``filters`` as typed columns, from ONE query.
+
+    Returns ``(department_ids (n,), values (n, len(HISTORY_COLS) + len(extra)))``
+    ordered by department, month; each row carries its month's macro values from the
+    macro store, ``extra`` DriversMonthly fields follow HISTORY_COLS and NULLs come
+    back as NaN.
+    """
+    qs = (DriversMonthly.objects
+          .filter(**filters)
+          .annotate(
+              _year=ExtractYear("month"),
+              _month=ExtractMonth("month"),
+              _y=_float("totalNet"),
+              **{f"_{c}": _float(c) for c in extra},
+          )
+          .order_by("department_id", "month")
+          .values_list("department_id", "_year", "_month", "_y", *DRIVER_BASE_COLS, *(f"_{c}" for c in extra)))
+    rows = np.array(list(qs), dtype=float).reshape(-1, 4 + len(DRIVER_BASE_COLS) + len(extra))
+
+    # macro columns come from the in-process store (one vectorized lookup)
+    values = np.empty((len(rows), len(HISTORY_COLS) + len(extra)))
+    values[:, [_YEAR, _MONTH, _Y]] = rows[:, 1:4]
+    values[:, _MACRO] = get_macro_store().lookup(month_index(rows[:, 1], rows[:, 2]))
+    values[:, _DRIVERS.start:] = rows[:, 4:]
+    return rows[:, 0].astype(int), values
+
+
+def history_state(keys: dict, department_ids: np.ndarray, values: np.ndarray):
+    """
+    Rollout state + latest driver baselines from ``fetch_history`` columns.
+
+    ``keys`` maps department id -> series key. Returns ``(state, drivers_base)`` with
+    drivers_base (B, 2) = latest enrolled_FTE_dept / programLaunches_dept per department,
+    or ``(None, None)`` when there is no history.
+    """
+    if not len(department_ids):
+        return None, None
+    ids, starts = np.unique(department_ids, return_index=True)   # rows are grouped by id
+    ends = np.r_[starts[1:], len(department_ids)]
+    B = len(ids)
+    tail = np.full((B, BUF_LEN), np.nan)
+    last_macro = np.full((B, len(MACRO_COLS)), np.nan)
+    for i, (a, b) in enumerate(zip(starts, ends)):
+        y = values[max(a, b - BUF_LEN):b, _Y]
+        tail[i, BUF_LEN - len(y):] = y
+        macro = values[a:b, _MACRO]
+        seen = ~np.isnan(macro)
+        last = len(macro) - 1 - np.argmax(seen[::-1], axis=0)    # last non-NaN row per column
+        last_macro[i] = np.where(seen.any(axis=0), macro[last, np.arange(len(MACRO_COLS))], np.nan)
+
+    first_year = values[starts, _YEAR].astype(int)
+    drivers_base = np.nan_to_num(values[ends - 1, _DRIVERS], nan=0.0).astype(int)
+    state = RolloutState([keys[k] for k in ids], tail, first_year, last_macro)
+    return state, drivers_base
+
+
+def load_batch_state(departments: dict):
+    """
+    Rollout state + latest driver baselines for many departments from ONE history query.
+
+    ``departments`` maps department id -> name. Departments without history are
+    simply absent from ``state.keys``; ``(None, None)`` when none has any.
+    """
+    ids, values = fetch_history(department_id__in=list(departments))
+    return history_state(departments, ids, values)
@@ -0,0 +1,248 @@
+# backend/api/services/ingest.py
+"""
+Bulk DriversMonthly / MacroMonthly ingestion (CSV / JSON batches).
+
+``save()`` normalizes ``month`` (and fills ``month_idx``) one instance at a time;
+here the whole batch is normalized with vectorized pandas ops, department names are
+resolved with one query and rows are upserted on their unique key ((department,
+month) / month) with chunked ``bulk_create(update_conflicts=True)``. Bulk writes
+bypass the model signals, so the forecast data and department versions, the macro
+store version and the feature store are refreshed explicitly, once per batch.
+
+Only supplied cells are written: a blank (or null) cell leaves the stored value
+alone, and a new row gets the field's default there. Rows are upserted in groups
+that share the same supplied columns, each group updating just those columns.
+"""
+import io
+import json
+
+import numpy as np
+import pandas as pd
+from django.core.validators import DecimalValidator, MaxValueValidator, MinValueValidator
+from django.db import transaction
+from django.db.backends.base.operations import BaseDatabaseOperations
+
+from api.models import Department, DriversMonthly, MacroMonthly
+from .feature_store import rebuild as rebuild_features
+from .forecast_cache import bump_data_version, bump_department_versions
+from .macro_store import MACRO_SRC_COLS, bump_macro_version, month_index
+
+DEPARTMENT_COLS = ("department", "Department", "department_name")
+VALUE_FIELDS = {
+    "totalNet": "float",
+    "enrolled_FTE_dept": "int",
+    "activeProg_lab_dept": "int",
+    "programLaunches_dept": "int",
+    "capexBudget": "float",
+    "approvalLeadTimeDays": "int",
+    "govFundShare": "float",
+    "mopBankTransferPct": "int",
+    "isEmergency": "bool",
+    "month_idx": "int",
+}
+MACRO_ALIASES = {"fxRate": "fxRate_PHP_USD"}       # model feature name -> MacroMonthly field
+CHUNK_SIZE = 1000
+
+
+class IngestError(ValueError):
+    """The batch can't be loaded; ``errors`` lists the offending rows."""
+
+    def __init__(self, message: str, errors: list | None = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def read_rows(data, fmt: str | None = None) -> pd.DataFrame:
+    """
+    Batch as a DataFrame from a list of dicts, ``{"rows": [...]}``, a JSON string or CSV text.
+    ``fmt`` ("csv" / "json") forces the text format; otherwise it is sniffed.
+    """
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    if isinstance(data, str):
+        text = data.strip()
+        if fmt == "json" or (fmt is None and text[:1] in "[{"):
+            data = json.loads(text)
+        else:
+            return pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False, na_values=[""])
+    if isinstance(data, dict):
+        data = data.get("rows", [])
+    if not isinstance(data, list):
+        raise IngestError("Expected a list of rows.")
+    return pd.DataFrame(data)
+
+
+TRUTHY = {"1", "true", "t", "yes", "y"}
+FALSY = {"0", "false", "f", "no", "n"}
+
+
+def _blank(col: pd.Series) -> pd.Series:
+    return col.isna() | (col.astype(str).str.strip() == "")
+
+
+def _truth(v):
+    """True / False for a boolean cell value, None if it isn't one."""
+    if isinstance(v, (bool, np.bool_)):
+        return bool(v)
+    if isinstance(v, (int, float, np.number)) and v in (0, 1):
+        return bool(v)
+    word = str(v).strip().lower()
+    return True if word in TRUTHY else False if word in FALSY else None
+
+
+def _bool(src: pd.DataFrame, col: str, errors: list) -> pd.Series:
+    """``src[col]`` as nullable booleans (blank -> NA); other values are reported per row."""
+    blank = _blank(src[col])
+    vals = src[col].where(~blank).map(_truth, na_action="ignore")
+    errors += [{"row": int(i), "error": f"Invalid {col}: {src.at[i, col]}"}
+               for i in np.flatnonzero(~blank & vals.isna())]
+    return vals.astype("boolean")
+
+
+def _months(df: pd.DataFrame) -> tuple[pd.Series, list[dict]]:
+    """First-of-month timestamps of the ``month`` column, plus one error per unparsable value."""
+    month = pd.to_datetime(df["month"].astype(str), errors="coerce", format="mixed")
+    errors = [{"row": int(i), "error": f"Invalid month: {df.at[i, 'month']}"} for i in np.flatnonzero(month.isna())]
+    return month.dt.to_period("M").dt.to_timestamp(), errors
+
+
+def _bulk_upsert(model, clean: pd.DataFrame, unique_fields: list[str], fields: list[str], chunk_size: int) -> int:
+    """
+    Upsert ``clean`` on ``unique_fields``: rows are grouped by which of ``fields`` they
+    carry, and each group updates only those columns. Returns rows written.
+    """
+    given = clean[fields].notna()
+    written = 0
+    for key, rows in clean.groupby([given[c] for c in fields], sort=False):
+        key = key if isinstance(key, tuple) else (key,)
+        cols = [c for c, g in zip(fields, key) if g]
+        objs = [model(**r) for r in _records(rows[[c for c in clean.columns if c not in fields or c in cols]])]
+        for i in range(0, len(objs), chunk_size):
+            if cols:
+                model.objects.bulk_create(objs[i:i + chunk_size], update_conflicts=True,
+                                          unique_fields=unique_fields, update_fields=cols)
+            else:   # nothing to update: only new rows are inserted
+                model.objects.bulk_create(objs[i:i + chunk_size], ignore_conflicts=True)
+        written += len(objs)
+    return written
+
+
+def _numeric(model, src: pd.DataFrame, col: str, errors: list) -> pd.Series:
+    """
+    ``src[col]`` as floats (blank -> NaN) checked against ``model``'s field: bulk_create
+    skips the model validators, so values that don't parse or fall outside the field's
+    range (Min/Max validators, integer width, decimal digits) are reported per row instead of stored.
+    """
+    vals = pd.to_numeric(src[col], errors="coerce")
+    given = ~_blank(src[col])
+    errors += [{"row": int(i), "error": f"Invalid {col}: {src.at[i, col]}"} for i in np.flatnonzero(given & vals.isna())]
+
+    field = model._meta.get_field(col)
+    # column width of integer fields (SQLite's backend reports no range of its own)
+    lo, hi = BaseDatabaseOperations.integer_field_ranges.get(field.get_internal_type(), (-np.inf, np.inf))
+    limit = np.inf
+    for v in field.validators:
+        if isinstance(v, MinValueValidator):
+            lo = max(lo, float(v.limit_value))
+        elif isinstance(v, MaxValueValidator):
+            hi = min(hi, float(v.limit_value))
+        elif isinstance(v, DecimalValidator) and v.max_digits is not None:
+            limit = 10.0 ** (v.max_digits - (v.decimal_places or 0))
+    bad = (vals < lo) | (vals > hi) | (vals.abs() >= limit)
+    errors += [{"row": int(i), "error": f"{col} out of range: {src.at[i, col]}"} for i in np.flatnonzero(bad)]
+    return vals
+
+
+def _records(df: pd.DataFrame) -> list[dict]:
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def normalize(df: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
+    """
+    Vectorized clean-up: department ids (one query), first-of-month ``month``,
+    ``month_idx`` where not given, typed values (NA where blank); one row per
+    (department, month) holding each column's last non-blank value.
+    Returns ``(frame, value columns supplied)``.
+    """
+    dept_col = next((c for c in DEPARTMENT_COLS if c in df.columns), None)
+    if dept_col is None or "month" not in df.columns:
+        raise IngestError("Each row needs a department and a month.")
+    df = df.reset_index(drop=True)
+    month, errors = _months(df)
+    bad = month.isna()
+
+    names = df[dept_col].astype(str).str.strip()
+    by_name = {n.lower(): pk for pk, n in Department.objects.values_list("id", "name")}
+    dept_id = names.str.lower().map(by_name)
+    missing = dept_id.isna()
+    errors += [{"row": int(i), "error": f"Unknown department: {names[i]}"} for i in np.flatnonzero(missing & ~bad)]
+
+    supplied = [c for c in VALUE_FIELDS if c in df.columns]
+    values = {}
+    for c in supplied:
+        kind = VALUE_FIELDS[c]
+        if kind == "bool":
+            values[c] = _bool(df, c, errors)
+            continue
+        vals = _numeric(DriversMonthly, df, c, errors)
+        values[c] = vals.round().astype("Int64") if kind == "int" else vals
+    if errors:
+        raise IngestError(f"{len(errors)} invalid row(s).", sorted(errors, key=lambda e: e["row"]))
+
+    out = pd.DataFrame({"department_id": dept_id.astype(int), "month": month.dt.date, **values})
+
+    idx = month_index(month.dt.year.to_numpy(), month.dt.month.to_numpy())
+    if "month_idx" in out.columns:
+        out["month_idx"] = out["month_idx"].fillna(pd.Series(idx, index=out.index)).astype("Int64")
+    else:
+        out["month_idx"] = idx
+        supplied.append("month_idx")
+
+    out = out.groupby(["department_id", "month"], sort=False, as_index=False).last()
+    return out, supplied
+
+
+def upsert_drivers(df: pd.DataFrame, chunk_size: int = CHUNK_SIZE) -> dict:
+    """Normalize and upsert a batch; returns ``{"rows", "departments"}``."""
+    clean, fields = normalize(df)
+    with transaction.atomic():
+        written = _bulk_upsert(DriversMonthly, clean, ["department", "month"], fields, chunk_size)
+        dept_ids = sorted(clean["department_id"].unique().tolist())
+        rebuild_features(dept_ids)
+        bump_department_versions(dept_ids)
+    bump_data_version()
+    return {"rows": written, "departments": len(dept_ids)}
+
+
+def normalize_macro(df: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
+    """
+    Vectorized clean-up of a macro batch: first-of-month ``month``, numeric series
+    (``fxRate`` accepted for ``fxRate_PHP_USD``, NaN where blank); one row per month
+    holding each series' last non-blank value. Returns ``(frame, series supplied)``.
+    """
+    df = df.rename(columns={k: v for k, v in MACRO_ALIASES.items() if v not in df.columns})
+    supplied = [c for c in MACRO_SRC_COLS if c in df.columns]
+    if "month" not in df.columns or not supplied:
+        raise IngestError(f"Each row needs a month and at least one of {', '.join(MACRO_SRC_COLS)}.")
+    df = df.reset_index(drop=True)
+    month, errors = _months(df)
+    if errors:
+        raise IngestError(f"{len(errors)} invalid row(s).", errors)
+
+    out = pd.DataFrame({"month": month.dt.date})
+    for c in supplied:
+        out[c] = _numeric(MacroMonthly, df, c, errors)
+    if errors:
+        raise IngestError(f"{len(errors)} invalid row(s).", sorted(errors, key=lambda e: e["row"]))
+    return out.groupby("month", sort=False, as_index=False).last(), supplied
+
+
+def upsert_macro(df: pd.DataFrame, chunk_size: int = CHUNK_SIZE) -> dict:
+    """Normalize and upsert a macro batch on month; returns ``{"rows", "months"}``."""
+    clean, fields = normalize_macro(df)
+    with transaction.atomic():
+        written = _bulk_upsert(MacroMonthly, clean, ["month"], fields, chunk_size)
+    bump_macro_version()
+    bump_data_version()
+    months = clean["month"]
+    return {"rows": written, "months": f"{months.min():%Y-%m}..{months.max():%Y-%m}" if written else None}
@@ -0,0 +1,66 @@
+# backend/api/services/lookups.py
+"""
+Reference-data bootstrap: the six dimension tables in one payload.
+
+The payload is serialized ONCE per lookups version (a VersionStamp row, bumped by
+the dimension-table signal handlers) and kept as JSON bytes with a strong ETag
+(sha256 of those bytes), both in the shared cache and in process memory. A request
+whose If-None-Match matches is answered from the version stamp alone (one indexed
+read) without querying the six tables.
+"""
+import hashlib
+import threading
+
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Department, SourceOfFund, TransactionType, TypeOfBusiness, ModeOfPayment, TaxRegistration
+from api.serializers import (DepartmentSerializer, SourceOfFundSerializer, TransactionTypeSerializer,
+                             TypeOfBusinessSerializer, ModeOfPaymentSerializer, TaxRegistrationSerializer)
+from .forecast_cache import bump_version, get_cache, version
+
+LOOKUPS_VERSION_KEY = "lookups:version"
+
+# payload key -> (model, serializer)
+LOOKUP_TABLES = {
+    "departments": (Department, DepartmentSerializer),
+    "sourceOfFunds": (SourceOfFund, SourceOfFundSerializer),
+    "transactionTypes": (TransactionType, TransactionTypeSerializer),
+    "typesOfBusiness": (TypeOfBusiness, TypeOfBusinessSerializer),
+    "modesOfPayment": (ModeOfPayment, ModeOfPaymentSerializer),
+    "taxRegistrations": (TaxRegistration, TaxRegistrationSerializer),
+}
+
+
+def bump_lookups_version() -> None:
+    """A dimension table changed: the payload is rebuilt on next request."""
+    bump_version(LOOKUPS_VERSION_KEY)
+
+
+def build_payload() -> bytes:
+    data = {key: serializer(model.objects.order_by("id"), many=True).data
+            for key, (model, serializer) in LOOKUP_TABLES.items()}
+    return JSONRenderer().render(data)
+
+
+_local: tuple | None = None        # (version, etag, body)
+_lock = threading.Lock()
+
+
+def lookups() -> tuple[str, bytes]:
+    """``(etag, body)`` of the current payload; built at most once per version."""
+    global _local
+    v = version(LOOKUPS_VERSION_KEY)
+    local = _local
+    if local is not None and local[0] == v:
+        return local[1], local[2]
+    with _lock:
+        if _local is None or _local[0] != v:
+            cache = get_cache()
+            key = f"lookups:payload:{v}"
+            entry = cache.get(key)
+            if entry is None:
+                body = build_payload()
+                entry = (f'"{hashlib.sha256(body).hexdigest()}"', body)
+                cache.set(key, entry, timeout=None)
+            _local = (v, *entry)
+        return _local[1], _local[2]
@@ -0,0 +1,106 @@
+# backend/api/services/macro_store.py
+"""
+In-process MacroMonthly store.
+
+The macro table is small and changes about once a month, so every process keeps it
+as NumPy arrays indexed by month_idx (2015-01 -> 1, the DriversMonthly convention):
+``values`` (n_months, 3) fxRate / inflationPct / wageIndex, NaN where null, and
+``present`` marking months that have a row (month is unique). Lookups for any set
+of months are one fancy-index.
+
+The arrays are rebuilt only when the macro version stamp (a VersionStamp row,
+bumped by the MacroMonthly signal handlers and the macro ingest) differs from the
+one they were loaded under, so every process refreshes after a write from any other.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from api.models import MacroMonthly
+from .forecast_cache import version, bump_version
+
+MACRO_VERSION_KEY = "forecast:macro_version"
+MACRO_SRC_COLS = ["fxRate_PHP_USD", "inflationPct", "wageIndex"]
+EPOCH_YEAR = 2015
+
+
+def month_index(year, month):
+    """month_idx of (year, month); works element-wise on arrays (2015-01 -> 1)."""
+    return (np.asarray(year) - EPOCH_YEAR) * 12 + np.asarray(month)
+
+
+def months_index(months) -> np.ndarray:
+    """month_idx of an iterable of dates / timestamps."""
+    idx = pd.DatetimeIndex(list(months))
+    return month_index(idx.year.to_numpy(), idx.month.to_numpy())
+
+
+def bump_macro_version() -> None:
+    """MacroMonthly changed: every process reloads its store on next use."""
+    bump_version(MACRO_VERSION_KEY)
+
+
+class MacroStore:
+    """Month-indexed macro arrays of one macro version."""
+
+    def __init__(self, month_idx: np.ndarray, values: np.ndarray, version: int | None = None):
+        self.version = version
+        if len(month_idx):
+            self.start = int(month_idx.min())
+            n = int(month_idx.max()) - self.start + 1
+        else:
+            self.start, n = 0, 0
+        self.values = np.full((n, len(MACRO_SRC_COLS)), np.nan)
+        self.present = np.zeros(n, dtype=bool)
+        pos = month_idx - self.start
+        self.values[pos] = values
+        self.present[pos] = True
+
+    @classmethod
+    def load(cls, version: int | None = None) -> "MacroStore":
+        rows = list(MacroMonthly.objects.values_list("month", *MACRO_SRC_COLS))
+        idx = np.array([month_index(r[0].year, r[0].month) for r in rows], dtype=int)
+        vals = np.array([r[1:] for r in rows], dtype=float).reshape(len(rows), len(MACRO_SRC_COLS))
+        return cls(idx, vals, version)
+
+    @property
+    def empty(self) -> bool:
+        return not self.present.any()
+
+    def _positions(self, month_idx):
+        pos = np.asarray(month_idx, dtype=int) - self.start
+        ok = (pos >= 0) & (pos < len(self.present))
+        return np.where(ok, pos, 0), ok
+
+    def lookup(self, month_idx) -> np.ndarray:
+        """(n, 3) macro values for each month_idx; NaN where there is no row (or a null)."""
+        pos, ok = self._positions(month_idx)
+        if not len(self.values):
+            return np.full((len(pos), len(MACRO_SRC_COLS)), np.nan)
+        return np.where(ok[:, None], self.values[pos], np.nan)
+
+    def has(self, month_idx) -> np.ndarray:
+        """Whether each month has a MacroMonthly row."""
+        pos, ok = self._positions(month_idx)
+        return ok & self.present[pos] if len(self.present) else ok
+
+    def for_months(self, months) -> np.ndarray:
+        return self.lookup(months_index(months))
+
+
+_store: MacroStore | None = None
+_lock = threading.Lock()
+
+
+def get_macro_store() -> MacroStore:
+    """Current store, reloaded first if a MacroMonthly write bumped the version."""
+    global _store
+    v = version(MACRO_VERSION_KEY)
+    store = _store
+    if store is not None and store.version == v:
+        return store
+    with _lock:
+        if _store is None or _store.version != v:
+            _store = MacroStore.load(v)
+        return _store
@@ -0,0 +1,190 @@
+# backend/api/services/model_registry.py
+"""
+Single source of the forecasting models.
+
+A ``ModelBundle`` is everything one forecast needs from ``artifacts/``: the three
+quantile boosters, ``train_columns.json`` (compiled into a FeatureSchema) and
+(optionally) ``exog_elasticities.json``, loaded together, warmed up and stamped
+with a content version; a direct multi-horizon set in ``artifacts/direct/``
+(services/direct.py) joins the same bundle. ``ModelRegistry`` preloads a bundle at startup
+(ApiConfig.ready), watches the artifact files and, when they change, builds a NEW
+bundle and swaps the reference atomically. Requests keep using the bundle they
+started with, so nothing in flight is dropped.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+
+from .feature_schema import FeatureSchema
+from .forecasting_service import ARTIFACT_DIR, FILENAMES, load_models, predict_quantiles
+
+logger = logging.getLogger(__name__)
+
+TRAIN_COLS_FILE = "train_columns.json"
+EXOG_ELAS_FILE = "exog_elasticities.json"
+DIRECT_DIR = "direct"   # optional direct multi-horizon set: same file names, own train_columns.json
+
+
+class ModelBundle:
+    """Boosters + training schema + elasticities of one artifact version."""
+
+    def __init__(self, models: dict, train_cols: list[str], elas: dict | None, version: str, fingerprint: str):
+        self.models = models
+        self.train_cols = train_cols
+        self.schema = FeatureSchema.for_models(train_cols, models)  # compiled once per version
+        self.elas = elas
+        self.version = version            # content hash of the artifacts
+        self.fingerprint = fingerprint    # cheap stat-based signature used for change detection
+        self.loaded_at = time.time()
+        self.direct_models = None         # direct multi-horizon boosters, when trained
+        self.direct_schema = None
+
+    @property
+    def has_direct(self) -> bool:
+        return self.direct_models is not None
+
+    def warm_up(self) -> None:
+        """One prediction so the first real request doesn't pay lazy initialisation."""
+        predict_quantiles(self.models, self.schema.matrix(self.schema.categories[:1] or [None]))
+        if self.has_direct:
+            predict_quantiles(self.direct_models,
+                              self.direct_schema.matrix(self.direct_schema.categories[:1] or [None]))
+
+
+def _watched_files(base: Path) -> list[Path]:
+    direct = base / DIRECT_DIR
+    return ([base / fn for fn in FILENAMES.values()] + [base / TRAIN_COLS_FILE, base / EXOG_ELAS_FILE]
+            + [direct / fn for fn in FILENAMES.values()] + [direct / TRAIN_COLS_FILE])
+
+
+def _load_direct(bundle: ModelBundle, base: Path) -> None:
+    """Attach the direct set under ``base/direct`` if one was trained; a broken set is an error."""
+    direct = base / DIRECT_DIR
+    if not (direct / TRAIN_COLS_FILE).exists():
+        return
+    try:
+        models = load_models(direct)
+        cols = json.loads((direct / TRAIN_COLS_FILE).read_text())
+        bundle.direct_schema = FeatureSchema.for_models(cols, models)
+    except Exception as e:
+        raise RuntimeError(f"Invalid direct model set under {direct}. Re-train it. ({e})")
+    bundle.direct_models = models
+
+
+def artifact_fingerprint(base: Path) -> str:
+    """(name, size, mtime) of every watched artifact; changes whenever a file is replaced."""
+    parts = []
+    for p in _watched_files(base):
+        try:
+            st = p.stat()
+            parts.append(f"{p.name}:{st.st_size}:{st.st_mtime_ns}")
+        except FileNotFoundError:
+            parts.append(f"{p.name}:-")
+    return hashlib.sha1(";".join(parts).encode()).hexdigest()[:12]
+
+
+def load_bundle(base: Path) -> ModelBundle:
+    """Read, validate and warm up every artifact under ``base``; raises on any problem."""
+    fingerprint = artifact_fingerprint(base)
+
+    digest = hashlib.sha256()
+    for p in _watched_files(base):
+        if p.exists():
+            digest.update(p.name.encode())
+            digest.update(p.read_bytes())
+
+    models = load_models(base)
+    try:
+        train_cols = json.loads((base / TRAIN_COLS_FILE).read_text())
+    except Exception as e:
+        raise RuntimeError(f"Missing or unreadable {TRAIN_COLS_FILE}. Re-train first. ({e})")
+    if not isinstance(train_cols, list) or not train_cols:
+        raise RuntimeError(f"Invalid {TRAIN_COLS_FILE} (not a non-empty list). Re-train first.")
+    try:
+        elas = json.loads((base / EXOG_ELAS_FILE).read_text())
+    except Exception:
+        elas = None  # optional (instant UI overlay)
+
+    try:
+        bundle = ModelBundle(models, train_cols, elas, digest.hexdigest()[:12], fingerprint)
+    except ValueError as e:
+        raise RuntimeError(f"{TRAIN_COLS_FILE} does not match the models. Re-train first. ({e})")
+    _load_direct(bundle, base)
+    bundle.warm_up()
+    return bundle
+
+
+class ModelRegistry:
+    """Holds the current ModelBundle and hot-swaps it when the artifacts change."""
+
+    def __init__(self, artifact_dir: Path | str | None = None, check_interval: float | None = None):
+        self._artifact_dir = Path(artifact_dir) if artifact_dir else None
+        self._check_interval = check_interval
+        self._bundle: ModelBundle | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def artifact_dir(self) -> Path:
+        if self._artifact_dir is None:
+            return Path(_setting("FORECAST_ARTIFACT_DIR", ARTIFACT_DIR))
+        return self._artifact_dir
+
+    @property
+    def check_interval(self) -> float:
+        if self._check_interval is None:
+            return float(_setting("FORECAST_MODEL_CHECK_SECONDS", 5.0))
+        return self._check_interval
+
+    def preload(self) -> None:
+        """Load at startup; a missing artifact is logged, not fatal (requests will report it)."""
+        try:
+            self.get()
+        except Exception as e:
+            logger.warning("Forecast model preload failed: %s", e)
+
+    def get(self) -> ModelBundle:
+        """Current bundle, reloading first if the artifact files changed."""
+        bundle = self._bundle
+        now = time.monotonic()
+        if bundle is not None and now - self._checked_at < self.check_interval:
+            return bundle
+
+        with self._lock:
+            bundle = self._bundle
+            if bundle is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return bundle  # another thread just checked
+            self._checked_at = time.monotonic()
+            if bundle is not None and artifact_fingerprint(self.artifact_dir) == bundle.fingerprint:
+                return bundle
+            try:
+                new = load_bundle(self.artifact_dir)
+            except Exception:
+                if bundle is None:
+                    raise
+                logger.exception("Artifact reload failed; keeping model version %s", bundle.version)
+                return bundle
+            if bundle is not None:
+                logger.info("Swapped forecast models %s -> %s", bundle.version, new.version)
+            self._bundle = new  # atomic reference swap; in-flight requests keep the old bundle
+            return new
+
+
+def _setting(name: str, default):
+    try:
+        from django.conf import settings
+        if settings.configured:
+            return getattr(settings, name, default)
+    except ImportError:
+        pass
+    return default
+
+
+registry = ModelRegistry()
+
+
+def get_bundle() -> ModelBundle:
+    return registry.get()
@@ -0,0 +1,174 @@
+# backend/api/services/response_surface.py
+"""
+Precomputed slider response surfaces for instant next-year forecasts.
+
+The six sliders have bounded UI ranges (sensitivity.SLIDERS), so per department a
+coarse grid over that box (``KNOTS`` values per slider) is forecast ONCE with a
+single batched rollout (one predict per horizon step for the whole grid) and kept as
+an array (knots..., 12, 3). A slider request inside the box is then answered by
+multilinear interpolation between the 2^6 surrounding grid points: a convex
+combination of sorted quantile vectors, so p10 <= p50 <= p90 still holds.
+
+At the knots the answer equals the rollout; between them it is only an
+approximation with NO useful error bound. The trees respond to the macro sliders in
+steps that no coarse grid resolves: over 30 random slider points the median of the
+worst monthly p50 error was 1-2%, but single points were off by 27% to over 150%
+depending on the department. Surfaces are therefore off
+unless FORECAST_SURFACE_ENABLED is set, answers are flagged ``approximate``, and
+callers can force an exact rollout.
+
+A surface is stamped with (model version, macro version, department version,
+horizon start): only a model swap, a macro write, a write to THAT department's
+DriversMonthly rows or a new month makes it stale. Lookups that find no surface for
+the current stamp return None and queue a rebuild on a background thread; finished
+surfaces are kept in process and in the "forecast" cache, so other workers sharing
+that cache reuse them instead of rebuilding.
+"""
+import itertools
+import logging
+import queue
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections
+
+from .direct import run_forecast
+from .forecast_cache import department_version_key, get_cache, versions
+from .history import fetch_history, history_state, horizon_macro, horizon_targets
+from .macro_store import MACRO_VERSION_KEY
+from .model_registry import get_bundle
+from .sensitivity import SLIDERS, scenario_arrays
+
+logger = logging.getLogger(__name__)
+
+# knots per slider: 7 * 7 * 7 * 5 * 3 * 4 = 20580 grid points (~6 MB per department)
+KNOTS = {
+    "fxRate_delta": 7,
+    "inflationPct_delta": 7,
+    "wageIndex_delta": 7,
+    "dept_pct": 5,
+    "enrolled_FTE_delta": 3,
+    "programLaunches_delta": 4,
+}
+AXES = {name: np.linspace(*SLIDERS[name][1], n) for name, n in KNOTS.items()}
+
+
+def enabled() -> bool:
+    return getattr(settings, "FORECAST_SURFACE_ENABLED", False)
+
+
+def current_stamp(bundle, department_id: int, horizon_start=None) -> tuple:
+    """(model version, macro version, department version, horizon start) a surface must carry to be fresh."""
+    start = horizon_start if horizon_start is not None else horizon_targets(1)[0]
+    macro_v, dept_v = versions([MACRO_VERSION_KEY, department_version_key(department_id)])
+    return bundle.version, macro_v, dept_v, f"{start:%Y-%m}"
+
+
+def _cache_key(stamp: tuple, department: str) -> str:
+    return "surface:" + ":".join(map(str, stamp)) + f":{department.lower()}"
+
+
+class ResponseSurface:
+    """Forecast quantiles of one department on the slider grid ``AXES``."""
+
+    def __init__(self, department: str, stamp: tuple, values: np.ndarray):
+        self.department = department
+        self.stamp = stamp
+        self.values = values          # (*knot counts, H, 3)
+
+    @classmethod
+    def build(cls, bundle, department: str, stamp: tuple) -> "ResponseSurface | None":
+        """Forecast the whole grid in one batched rollout; None if the department has no history."""
+        dept_ids, hist = fetch_history(department__name__iexact=department)
+        if not len(dept_ids):
+            return None
+        state, drivers_base = history_state({i: department for i in dept_ids}, dept_ids, hist)
+        points = [dict(zip(AXES, combo)) for combo in itertools.product(*AXES.values())]
+        targets = horizon_targets(12)
+        quantiles, _ = run_forecast(
+            bundle, "recursive", state.repeat(len(points)), targets, horizon_macro(targets),
+            drivers_base=np.repeat(drivers_base, len(points), axis=0), **scenario_arrays(points),
+        )
+        shape = tuple(len(v) for v in AXES.values())
+        return cls(department, stamp, quantiles.reshape(shape + quantiles.shape[1:]))
+
+    def interpolate(self, point: dict) -> np.ndarray | None:
+        """(H, 3) quantiles at a slider point; None when it lies outside the grid."""
+        block, weights = self.values, []
+        for name, knots in AXES.items():
+            v = point[name]
+            if not knots[0] <= v <= knots[-1]:
+                return None
+            i = min(int(np.searchsorted(knots, v, side="right")) - 1, len(knots) - 2)
+            weights.append((v - knots[i]) / (knots[i + 1] - knots[i]))
+            block = block[(slice(None),) * len(weights[:-1]) + (slice(i, i + 2),)]
+        for t in weights:   # contract the 2 x 2 x ... corner block one axis at a time
+            block = block[0] * (1.0 - t) + block[1] * t
+        return block
+
+
+_surfaces: dict[str, ResponseSurface] = {}
+_pending: "queue.Queue[tuple]" = queue.Queue()
+_queued: set = set()
+_lock = threading.Lock()
+_worker: threading.Thread | None = None
+
+
+def lookup(bundle, department: str, department_id: int, point: dict, horizon_start) -> np.ndarray | None:
+    """
+    Interpolated (H, 3) quantiles from the current surface of ``department`` (an
+    existing Department, ``department_id`` its pk), or None (surfaces disabled; no
+    fresh surface yet: a background rebuild is queued; or the point is off-grid).
+    """
+    if not enabled():
+        return None
+    stamp = current_stamp(bundle, department_id, horizon_start)
+    key = department.lower()
+    surface = _surfaces.get(key)
+    if surface is None or surface.stamp != stamp:
+        surface = get_cache().get(_cache_key(stamp, department))
+        if surface is None:
+            schedule(department, department_id, stamp)
+            return None
+        _surfaces[key] = surface
+    return surface.interpolate(point)
+
+
+def schedule(department: str, department_id: int, stamp: tuple) -> None:
+    """Queue a background rebuild of ``department``'s surface for ``stamp`` (once)."""
+    global _worker
+    job = (department.lower(), stamp)
+    with _lock:
+        if job in _queued:
+            return
+        _queued.add(job)
+        _pending.put((department, department_id, stamp))
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work, name="response-surface", daemon=True)
+            _worker.start()
+
+
+def build_and_store(bundle, department: str, stamp: tuple) -> ResponseSurface | None:
+    surface = ResponseSurface.build(bundle, department, stamp)
+    if surface is not None:
+        _surfaces[department.lower()] = surface
+        get_cache().set(_cache_key(stamp, department), surface)
+    return surface
+
+
+def _work() -> None:
+    while True:
+        department, department_id, stamp = _pending.get()
+        try:
+            close_old_connections()
+            bundle = get_bundle()
+            # a newer write or model may have landed while this job waited
+            if current_stamp(bundle, department_id) == stamp:
+                build_and_store(bundle, department, stamp)
+        except Exception:
+            logger.exception("Response surface build failed for %s", department)
+        finally:
+            with _lock:
+                _queued.discard((department.lower(), stamp))
+            close_old_connections()
@@ -0,0 +1,157 @@
+# backend/api/services/rfp_search.py
+"""
+Ranked full-text + fuzzy search over RequestForPayment.
+
+The searchable document of an RFP is payableTo, description, requestedBy,
+accountName and the pr / po / rr reference numbers joined with spaces.
+
+- PostgreSQL: the document expression (``DOC_SQL``) has two GIN indexes (migration
+  0016): ``to_tsvector('simple', doc)`` for full-text matches and ``doc
+  gin_trgm_ops`` for typo-tolerant trigram matches. A query matches when either
+  index hits (``@@`` / word-similarity ``<%``) and is ranked by ts_rank plus
+  word_similarity, so the work grows with the number of matches, not the table.
+- Other backends (SQLite in tests / local runs): an in-process trigram inverted
+  index over the same document (``NgramIndex``), rebuilt when the search version
+  stamp (bumped by the RFP signal handlers) changes. Trigrams are pg_trgm's (lower
+  case, alphanumeric words padded with two leading blanks and one trailing), and
+  a row's score is the share of the query's trigrams it contains.
+"""
+import re
+import threading
+
+import numpy as np
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from api.models import RequestForPayment
+from .forecast_cache import version, bump_version
+
+SEARCH_FIELDS = ["payableTo", "description", "requestedBy", "accountName", "pr", "po", "rr"]
+SEARCH_VERSION_KEY = "rfp:search_version"
+MIN_SCORE = 0.3          # in-process index: share of query trigrams a row must contain
+
+# immutable (indexable) document expression; migration 0016 indexes exactly this text
+DOC_SQL = " || ' ' || ".join(f"coalesce(\"api_requestforpayment\".\"{f}\", '')" for f in SEARCH_FIELDS)
+
+
+def bump_search_version() -> None:
+    """RFPs changed: in-process search indexes rebuild on next use."""
+    bump_version(SEARCH_VERSION_KEY)
+
+
+# --------------------------
+# Trigrams
+# --------------------------
+_WORD = re.compile(r"[^\W_]+")
+
+
+def trigrams(text: str) -> set[str]:
+    """pg_trgm trigrams of ``text``."""
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NgramIndex:
+    """Trigram -> row positions inverted index over the RFP search documents of one version."""
+
+    def __init__(self, ids: np.ndarray, docs: list[str], version: int | None = None):
+        self.version = version
+        self.ids = np.asarray(ids, dtype=np.int64)
+        postings: dict[str, list[int]] = {}
+        for pos, doc in enumerate(docs):
+            for g in trigrams(doc):
+                postings.setdefault(g, []).append(pos)
+        self.postings = {g: np.array(p, dtype=np.int64) for g, p in postings.items()}
+
+    @classmethod
+    def load(cls, version: int | None = None) -> "NgramIndex":
+        rows = list(RequestForPayment.objects.order_by("id").values_list("id", *SEARCH_FIELDS))
+        docs = [" ".join(v for v in r[1:] if v) for r in rows]
+        return cls(np.array([r[0] for r in rows], dtype=np.int64), docs, version)
+
+    def search(self, query: str, min_score: float = MIN_SCORE):
+        """``(ids, scores)`` of matching rows, best first (ties: lower id first)."""
+        grams = [g for g in trigrams(query) if g in self.postings]
+        n_query = len(trigrams(query))
+        if not grams or not n_query:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        hits = np.bincount(np.concatenate([self.postings[g] for g in grams]), minlength=len(self.ids))
+        scores = hits / n_query
+        pos = np.flatnonzero(scores >= min_score)
+        order = np.lexsort((self.ids[pos], -scores[pos]))
+        return self.ids[pos[order]], scores[pos[order]]
+
+
+_index: NgramIndex | None = None
+_lock = threading.Lock()
+
+
+def get_ngram_index() -> NgramIndex:
+    """Current in-process index, rebuilt first if an RFP write bumped the version."""
+    global _index
+    v = version(SEARCH_VERSION_KEY)
+    index = _index
+    if index is not None and index.version == v:
+        return index
+    with _lock:
+        if _index is None or _index.version != v:
+            _index = NgramIndex.load(v)
+        return _index
+
+
+# --------------------------
+# Search
+# --------------------------
+def _pg_match(query: str) -> RawSQL:
+    return RawSQL(
+        f"(to_tsvector('simple', {DOC_SQL}) @@ plainto_tsquery('simple', %s) OR %s <%% ({DOC_SQL}))",
+        [query, query], output_field=BooleanField(),
+    )
+
+
+def _search_postgres(query: str, offset: int, limit: int) -> list:
+    score = RawSQL(
+        f"(ts_rank(to_tsvector('simple', {DOC_SQL}), plainto_tsquery('simple', %s)) + word_similarity(%s, {DOC_SQL}))",
+        [query, query], output_field=FloatField(),
+    )
+    return list(RequestForPayment.objects
+                .filter(_pg_match(query))
+                .annotate(score=score)
+                .order_by("-score", "id")[offset:offset + limit])
+
+
+def _search_ngram(query: str, offset: int, limit: int) -> list:
+    ids, scores = get_ngram_index().search(query)
+    ids, scores = ids[offset:offset + limit], scores[offset:offset + limit]
+    rows = RequestForPayment.objects.in_bulk(ids.tolist())
+    out = []
+    for pk, s in zip(ids.tolist(), scores.tolist()):
+        if pk in rows:   # deleted since the index was built
+            rows[pk].score = s
+            out.append(rows[pk])
+    return out
+
+
+def search_rfps(query: str, offset: int = 0, limit: int = 20) -> list:
+    """RFPs matching ``query`` ranked best first, rows ``offset .. offset + limit``; each has ``.score``."""
+    query = query.strip()
+    if not query:
+        return []
+    if connection.vendor == "postgresql":
+        return _search_postgres(query, offset, limit)
+    return _search_ngram(query, offset, limit)
+
+
+def filter_matches(queryset, query: str):
+    """``queryset`` narrowed to the RFPs ``search_rfps`` would match, in the queryset's own order."""
+    query = query.strip()
+    if not query:
+        return queryset
+    if connection.vendor == "postgresql":
+        return queryset.filter(_pg_match(query))
+    ids, _ = get_ngram_index().search(query)
+    return queryset.filter(id__in=ids.tolist())
@@ -0,0 +1,162 @@
+# backend/api/services/rfp_totals.py
+"""
+DriversMonthly.totalNet derived from RequestForPayment.netTotal.
+
+A department's monthly spend (the forecast target) is the sum of netTotal over its
+RFPs whose dateRequested falls in that month. ``refresh_bucket`` re-sums ONE
+(department, month) bucket (an indexed range SUM and a single-row upsert); the RFP
+signal handlers call it on create / update / delete, for both buckets when an
+update moves an RFP. ``rebuild`` recomputes every bucket with one GROUP BY.
+
+Only CLOSED months are written. The current month is still collecting RFPs: a
+partial total stored as its totalNet would become every forecast's lag1, and a
+new row without drivers would become the latest history row and zero the driver
+scaling. ``close_months`` runs before every RFP write and stores the months that
+ended since the last close (a VersionStamp row keeps the last closed month), so
+the first write of a new month stores the previous one; writes into a closed
+month re-sum their bucket at once. A closed month that has no DriversMonthly row
+yet gets one with the department's previous month's drivers carried forward
+(existing rows only take the new total). The open month's running spend is in the
+spend rollup (services/spend_rollup.py).
+
+Months without RFPs keep the totalNet entered by hand (history predating the RFP
+system); a bucket whose last RFP is deleted drops to 0. The upserts bypass the
+DriversMonthly signals, so the stored features of the touched months and the
+forecast data and department versions are refreshed here.
+"""
+from bisect import bisect_left
+from datetime import date
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from api.models import DriversMonthly, RequestForPayment, VersionStamp
+from . import feature_store
+from .forecast_cache import bump_data_version, bump_department_versions
+from .macro_store import month_index
+
+
+# copied from the department's previous row when a bucket creates its month's row
+CARRIED_FIELDS = [
+    "enrolled_FTE_dept", "activeProg_lab_dept", "programLaunches_dept", "capexBudget",
+    "approvalLeadTimeDays", "govFundShare", "mopBankTransferPct",
+]
+CLOSED_KEY = "rfp_totals:closed_through"   # VersionStamp: month_idx of the last month stored
+
+
+def open_month() -> date:
+    """First day of the current month: the one month whose totals are still incomplete."""
+    return date.today().replace(day=1)
+
+
+def _month_idx(month) -> int:
+    return int(month_index(month.year, month.month))
+
+
+def _bucket(department_id: int, month, total, carried: dict | None = None) -> DriversMonthly:
+    return DriversMonthly(department_id=department_id, month=month, totalNet=total,
+                          month_idx=_month_idx(month), **(carried or {}))
+
+
+def _carried(department_ids, months) -> dict:
+    """{(department id, month): CARRIED_FIELDS of the department's latest row before month}."""
+    rows = (DriversMonthly.objects
+            .filter(department_id__in=set(department_ids), month__lt=max(months))
+            .order_by("department_id", "month")
+            .values("department_id", "month", *CARRIED_FIELDS))
+    by_dept = {}
+    for r in rows:
+        by_dept.setdefault(r["department_id"], []).append(r)
+    out = {}
+    for dept, month in zip(department_ids, months):
+        prev = by_dept.get(dept, [])
+        i = bisect_left([r["month"] for r in prev], month)
+        if i:
+            out[(dept, month)] = {f: prev[i - 1][f] for f in CARRIED_FIELDS}
+    return out
+
+
+def _upsert(objs: list) -> None:
+    # new buckets get month_idx; existing rows only take the new total
+    DriversMonthly.objects.bulk_create(
+        objs, batch_size=1000, update_conflicts=True,
+        unique_fields=["department", "month"], update_fields=["totalNet"],
+    )
+
+
+def bucket_total(department_id: int, month) -> Decimal:
+    """Sum of netTotal of a department's RFPs requested in ``month`` (first of month)."""
+    total = (RequestForPayment.objects
+             .filter(department_id=department_id,
+                     dateRequested__gte=month, dateRequested__lt=month + relativedelta(months=1))
+             .aggregate(total=Sum("netTotal"))["total"])
+    return total if total is not None else Decimal("0")
+
+
+def refresh_bucket(department_id: int, day) -> None:
+    """Re-sum the (department, month of ``day``) bucket and store it as that month's totalNet (closed months only)."""
+    month = day.replace(day=1)
+    if month >= open_month():
+        return
+    carried = _carried([department_id], [month]).get((department_id, month))
+    with transaction.atomic():
+        _upsert([_bucket(department_id, month, bucket_total(department_id, month), carried)])
+        feature_store.refresh_window(department_id, month)
+        bump_department_versions([department_id])
+    bump_data_version()
+
+
+def close_months() -> int:
+    """
+    Store every month that ended since the last close (a no-op within a month); returns
+    buckets written. The UPDATE on the stamp row claims the close, so one process does it.
+    """
+    last = open_month() - relativedelta(months=1)
+    target = _month_idx(last)
+    done = VersionStamp.objects.filter(key=CLOSED_KEY).values_list("value", flat=True).first()
+    if done is not None and done >= target:
+        return 0
+    with transaction.atomic():
+        if done is None:   # first close: older months are stored by `manage.py rebuild_totals`
+            try:
+                with transaction.atomic():
+                    VersionStamp.objects.create(key=CLOSED_KEY, value=target)
+            except IntegrityError:
+                return 0
+            start = last
+        else:
+            if not VersionStamp.objects.filter(key=CLOSED_KEY, value=done).update(value=target):
+                return 0
+            start = last - relativedelta(months=target - done - 1)
+        return rebuild(start=start)
+
+
+def rebuild(department_ids=None, start=None) -> int:
+    """
+    Recompute every closed RFP-backed bucket (optionally for some departments, or from
+    month ``start`` on) with one GROUP BY; returns buckets written.
+    """
+    rfps = RequestForPayment.objects.filter(department__isnull=False, dateRequested__lt=open_month())
+    if department_ids is not None:
+        rfps = rfps.filter(department_id__in=department_ids)
+    if start is not None:
+        rfps = rfps.filter(dateRequested__gte=start)
+    totals = (rfps
+              .annotate(bucket=TruncMonth("dateRequested"))
+              .values("department_id", "bucket")
+              .annotate(total=Sum("netTotal"))
+              .order_by())
+    totals = list(totals)
+    carried = _carried([r["department_id"] for r in totals], [r["bucket"] for r in totals]) if totals else {}
+    objs = [_bucket(r["department_id"], r["bucket"], r["total"], carried.get((r["department_id"], r["bucket"])))
+            for r in totals]
+    with transaction.atomic():
+        _upsert(objs)
+        touched = sorted({o.department_id for o in objs})
+        feature_store.rebuild(touched)
+        bump_department_versions(touched)
+    bump_data_version()
+    return len(objs)
@@ -0,0 +1,290 @@
+# backend/api/services/rollout.py
+"""
+Incremental recursive rollout for the next-year forecast.
+
+Instead of rebuilding the whole panel (concat + get_dummies + groupby shifts and
+rollings) for every horizon month, the history is reduced ONCE to the state the
+next step actually needs, and that state is advanced by one month per step with
+the fed-back p50. Every series in a batch is one row of the state, so the same
+loop serves one department, many departments or many scenarios of one department.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from .feature_schema import FeatureSchema
+from .features import KEY, TARGET, HIST_LEN, MACRO_COLS, panel_tails, tail_features
+from .forecasting_service import predict_quantiles
+
+ALPHAS = [0.10, 0.50, 0.90]
+
+BUF_LEN = HIST_LEN                            # longest lag / rolling window
+EXOG_KEYS = ["fxRate", "inflationPct", "wageIndex", "enrolled_FTE_dept", "programLaunches_dept"]
+
+
+# --------------------------
+# History state
+# --------------------------
+class RolloutState:
+    """
+    Recursive feature state for a batch of series (one row per series).
+
+    - ``buf``: ring buffer of the last 12 targets (NaN-padded for short histories),
+      which is all lag1/lag3/lag12 and roll3/6/12 mean/std ever look at.
+    - ``first_year``: origin of the trend counter ``t``.
+    - ``last_macro``: last non-NaN fxRate / inflationPct / wageIndex seen, used when
+      a horizon month has no macro row.
+    """
+
+    def __init__(self, keys, tail, first_year, last_macro=None):
+        tail = np.asarray(tail, dtype=float)
+        self.keys = list(keys)
+        self.buf = np.full((len(self.keys), BUF_LEN), np.nan)
+        n = min(tail.shape[1], BUF_LEN)
+        if n:
+            self.buf[:, BUF_LEN - n:] = tail[:, -n:]
+        self.head = 0  # ring index of the oldest slot (next one to overwrite)
+        self.first_year = np.broadcast_to(np.asarray(first_year, dtype=int), (len(self.keys),)).copy()
+        if last_macro is None:
+            last_macro = np.full((len(self.keys), len(MACRO_COLS)), np.nan)
+        self.last_macro = np.array(last_macro, dtype=float).reshape(len(self.keys), len(MACRO_COLS))
+
+    @classmethod
+    def from_history(cls, key, y, first_year, macro=None):
+        """Build a single-series state from its ordered target history (and macro columns)."""
+        y = np.asarray(y, dtype=float)
+        last_macro = np.full(len(MACRO_COLS), np.nan)
+        if macro is not None:
+            macro = np.asarray(macro, dtype=float).reshape(len(y), len(MACRO_COLS))
+            for j in range(len(MACRO_COLS)):
+                col = macro[:, j]
+                col = col[~np.isnan(col)]
+                if len(col):
+                    last_macro[j] = col[-1]
+        return cls([key], y[-BUF_LEN:].reshape(1, -1), first_year, last_macro.reshape(1, -1))
+
+    @classmethod
+    def from_panel(cls, panel: pd.DataFrame):
+        """
+        Build a batch state from a long panel (KEY, Date, y[, macro cols]) sorted by KEY, Date.
+
+        Rows of the state follow the order in which departments first appear.
+        """
+        keys, tail, first_year, last_macro = panel_tails(panel)
+        return cls(keys, tail, first_year, last_macro)
+
+    @property
+    def size(self) -> int:
+        return len(self.keys)
+
+    def repeat(self, n: int) -> "RolloutState":
+        """Copy of this (single-series) state replicated ``n`` times, e.g. one row per scenario."""
+        out = RolloutState.__new__(RolloutState)
+        out.keys = [k for k in self.keys for _ in range(n)]
+        out.buf = np.repeat(self._ordered(), n, axis=0)
+        out.head = 0
+        out.first_year = np.repeat(self.first_year, n)
+        out.last_macro = np.repeat(self.last_macro, n, axis=0)
+        return out
+
+    def copy(self) -> "RolloutState":
+        out = RolloutState.__new__(RolloutState)
+        out.keys = list(self.keys)
+        out.buf = self.buf.copy()
+        out.head = self.head
+        out.first_year = self.first_year.copy()
+        out.last_macro = self.last_macro.copy()
+        return out
+
+    def _ordered(self) -> np.ndarray:
+        """Buffer unrolled oldest → newest."""
+        return np.roll(self.buf, -self.head, axis=1)
+
+    def window(self, w: int) -> np.ndarray:
+        """Last ``w`` targets per series, oldest → newest, shape (B, w)."""
+        idx = (self.head + np.arange(BUF_LEN - w, BUF_LEN)) % BUF_LEN
+        return self.buf[:, idx]
+
+    def features(self, tgt_ts: pd.Timestamp) -> dict:
+        """Recursive + calendar features of the row for ``tgt_ts`` (features.tail_features)."""
+        return tail_features(self._ordered(), self.first_year, tgt_ts)
+
+    def push(self, y_new, macro_new=None) -> None:
+        """Advance one month: append the fed-back target (and effective macro values)."""
+        self.buf[:, self.head] = y_new
+        self.head = (self.head + 1) % BUF_LEN
+        if macro_new is not None:
+            macro_new = np.asarray(macro_new, dtype=float)
+            self.last_macro = np.where(np.isnan(macro_new), self.last_macro, macro_new)
+
+
+# --------------------------
+# Scenario inputs
+# --------------------------
+class ScenarioError(ValueError):
+    """A slider value is not a finite number; ``field`` names it."""
+
+    def __init__(self, field: str, message: str):
+        super().__init__(message)
+        self.field = field
+
+
+def slider_value(values: dict, name: str) -> float:
+    """``values[name]`` as a finite float (missing, null or "" count as 0)."""
+    raw = values.get(name, 0)
+    if raw is None or raw == "":
+        return 0.0
+    try:
+        if isinstance(raw, bool):
+            raise TypeError
+        v = float(raw)
+    except (TypeError, ValueError):
+        raise ScenarioError(name, f"{name} must be a number, got {raw!r}.")
+    if not math.isfinite(v):
+        raise ScenarioError(name, f"{name} must be finite, got {raw!r}.")
+    return v
+
+
+def parse_scenario(assumptions: dict | None, drivers: dict | None = None) -> dict:
+    """
+    Normalize slider assumptions / driver deltas (dept_pct is returned as a fraction).
+    Raises ScenarioError for a section that isn't an object or a non-numeric value.
+    """
+    assumptions = assumptions or {}
+    drivers = drivers or {}
+    for section, values in (("assumptions", assumptions), ("drivers", drivers)):
+        if not isinstance(values, dict):
+            raise ScenarioError(section, f"{section} must be an object of slider values.")
+    return {
+        "fx_delta":   slider_value(assumptions, "fxRate_delta"),
+        "inf_delta":  slider_value(assumptions, "inflationPct_delta"),
+        "wage_delta": slider_value(assumptions, "wageIndex_delta"),
+        "dept_pct":   slider_value(assumptions, "dept_pct") / 100.0,
+        "enrolled_delta": int(slider_value(drivers, "enrolled_FTE_delta")),
+        "programs_delta": int(slider_value(drivers, "programLaunches_delta")),
+    }
+
+
+# --------------------------
+# Elasticity overlay
+# --------------------------
+def _elas_model(elas: dict, q: float):
+    for k, model in elas.items():
+        try:
+            if abs(float(k) - float(q)) < 1e-12:
+                return model
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _predict_quantile_linear(elas: dict, exog: np.ndarray, q: float) -> np.ndarray:
+    """Quantile linear model on EXOG_KEYS columns of ``exog`` (B, 5); NaN inputs count as 0."""
+    model = _elas_model(elas, q)
+    if model is None:
+        return np.full(exog.shape[0], np.nan)
+    coefs = model.get("coef", {}) or {}
+    yhat = np.full(exog.shape[0], float(model.get("intercept", 0.0)))
+    for j, name in enumerate(EXOG_KEYS):
+        v = np.nan_to_num(exog[:, j], nan=0.0, posinf=0.0, neginf=0.0)
+        yhat = yhat + float(coefs.get(name, 0.0)) * v
+    return yhat
+
+
+def overlay_ratios(elas: dict, base_exog: np.ndarray, scen_exog: np.ndarray) -> np.ndarray:
+    """Per-quantile y1/y0 ratios from the linear overlay, clipped to [0.5, 1.5]; shape (B, 3)."""
+    out = np.ones((base_exog.shape[0], len(ALPHAS)))
+    for i, q in enumerate(ALPHAS):
+        y0 = _predict_quantile_linear(elas, base_exog, q)
+        y1 = _predict_quantile_linear(elas, scen_exog, q)
+        ok = np.isfinite(y0) & (y0 != 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[:, i] = np.where(ok, np.clip(y1 / np.where(ok, y0, 1.0), 0.5, 1.5), 1.0)
+    return out
+
+
+def postprocess(raw: np.ndarray, ratios, scale: np.ndarray) -> np.ndarray:
+    """Published quantiles from raw model output (M, 3): overlay ratios, department uplift, then sort."""
+    p = raw if ratios is None else raw * ratios
+    # Department uplift AFTER overlay, then non-crossing safety
+    return np.sort(p * scale[:, None], axis=1)
+
+
+# --------------------------
+# Rollout
+# --------------------------
+def run_rollout(state: RolloutState, targets, models, schema, macro,
+                exog_delta=0.0, drivers_base=0.0, drivers_delta=0.0, dept_pct=0.0, elas=None, feedback=None):
+    """
+    Recursive 12-month (or any horizon) rollout for every series in ``state``.
+
+    Parameters
+    ----------
+    targets       : horizon months (first-of-month timestamps), in order
+    schema        : FeatureSchema of ``models`` (or the train_columns list to compile one)
+    macro         : (H, 3) or (B, H, 3) base fxRate / inflationPct / wageIndex per horizon
+                    month, NaN where no macro row exists (falls back to the last known value)
+    exog_delta    : additive fx / inflation / wage deltas, broadcastable to (B, 3)
+    drivers_base  : latest enrolled_FTE_dept / programLaunches_dept, broadcastable to (B, 2)
+    drivers_delta : slider deltas on top of ``drivers_base``, broadcastable to (B, 2)
+    dept_pct      : department uplift as a fraction (0.05 = +5%), broadcastable to (B,)
+    feedback      : optional ``f(h, quantiles (B, 3)) -> (B,)`` value fed back after step h
+                    instead of the p50 (e.g. a sampled draw, services/simulate.py)
+
+    Returns ``(quantiles, last_step)``: quantiles is (B, H, 3) [p10, p50, p90] after
+    overlay, uplift and non-crossing sort; last_step holds the final step's exog vectors
+    and overlay ratios for debugging.
+    """
+    state = state.copy()  # callers may reuse their state for other scenarios
+    if not isinstance(schema, FeatureSchema):
+        schema = FeatureSchema.for_models(schema, models)
+    B, H = state.size, len(targets)
+    macro = np.asarray(macro, dtype=float)
+    if macro.ndim == 2:
+        macro = np.broadcast_to(macro, (B,) + macro.shape)
+    exog_delta = np.broadcast_to(np.asarray(exog_delta, dtype=float), (B, len(MACRO_COLS)))
+    drivers_base = np.broadcast_to(np.asarray(drivers_base, dtype=float), (B, 2))
+    drivers_eff = drivers_base + np.broadcast_to(np.asarray(drivers_delta, dtype=float), (B, 2))
+    scale = 1.0 + np.broadcast_to(np.asarray(dept_pct, dtype=float), (B,))
+
+    out = np.empty((B, H, len(ALPHAS)))
+    last_step = None
+    X0 = schema.matrix(state.keys)   # key codes + zero defaults, shared by every step
+    X = np.empty_like(X0)
+    for h, tgt in enumerate(targets):
+        tgt_ts = pd.Timestamp(tgt).to_period("M").to_timestamp()
+
+        base = np.where(np.isnan(macro[:, h]), state.last_macro, macro[:, h])
+        eff = base + exog_delta  # NaN base stays NaN
+
+        feats = state.features(tgt_ts)
+        for j, c in enumerate(MACRO_COLS):
+            feats[c] = eff[:, j]
+        feats["enrolled_FTE_dept"] = drivers_eff[:, 0]
+        feats["programLaunches_dept"] = drivers_eff[:, 1]
+
+        np.copyto(X, X0)
+        p = predict_quantiles(models, schema.fill(X, feats), ALPHAS)
+
+        base_exog = np.column_stack([base, drivers_base])
+        scen_exog = np.column_stack([eff, drivers_eff])
+        ratios = overlay_ratios(elas, base_exog, scen_exog) if elas else None
+        p = postprocess(p, ratios, scale)
+        out[:, h] = p
+
+        # Recursive rollout: feed the median (or the caller's draw) back with the effective exog.
+        # That p50 already carries overlay and uplift, so here they shape every later step.
+        state.push(p[:, 1] if feedback is None else feedback(h, p), eff)
+        last_step = {"base_exog": base_exog, "scen_exog": scen_exog, "ratios": ratios}
+
+    return out, last_step
+
+
+def forecast_rows(targets, quantiles) -> list[dict]:
+    """[{date: 'YYYY-MM', p10, p50, p90}, ...] for one series' (H, 3) quantiles."""
+    return [
+        {"date": f"{tgt:%Y-%m}", "p10": float(p10), "p50": float(p50), "p90": float(p90)}
+        for tgt, (p10, p50, p90) in zip(targets, quantiles)
+    ]
+
@@ -0,0 +1,40 @@
+# backend/api/services/rollout_pool.py
+"""
+Process-pool entry points for batched rollouts (precompute_forecasts).
+
+Under the ``spawn`` start method (the default on Windows and macOS) a worker
+unpickles its initializer and job function by importing their module before
+anything else runs. rollout.py pulls in features -> api.models, which needs a
+configured app registry, so this module imports nothing from Django or the
+services at load time: ``init_worker`` runs ``django.setup()`` first and only then
+imports the rollout and the model registry. Jobs (which pickle a RolloutState and
+a FeatureSchema) are unpickled after the initializer, so they load fine too.
+"""
+import os
+
+_WORKER_MODELS = None
+
+
+def init_worker() -> None:
+    """Pool initializer: set Django up if needed, then take the boosters from the registry once."""
+    global _WORKER_MODELS
+    from django.apps import apps
+
+    if not apps.ready:
+        import django
+
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+        django.setup()
+    from .model_registry import get_bundle
+
+    _WORKER_MODELS = get_bundle().models
+
+
+def rollout_job(job: dict):
+    """Run one rollout in a worker; ``job`` holds run_rollout's arguments (without models)."""
+    from .rollout import run_rollout
+
+    job = dict(job)
+    quantiles, _ = run_rollout(job.pop("state"), job.pop("targets"), _WORKER_MODELS,
+                               job.pop("schema"), job.pop("macro"), **job)
+    return quantiles
@@ -0,0 +1,143 @@
+# backend/api/services/sensitivity.py
+"""
+Scenario sensitivity sweeps over the Forecasting page's six sliders.
+
+A sweep is a list of slider vectors for one department. All of them share the
+department's history state, so the state is replicated once per vector
+(``RolloutState.repeat``) and every horizon step scores the whole sweep with one
+predict call: a few hundred scenarios cost about as much as a few single forecasts.
+
+The tornado table varies one slider at a time between its low and high value with
+the others at the baseline; its rows are evaluated in the same batch as the sweep.
+"""
+import itertools
+
+import numpy as np
+
+from .rollout import parse_scenario, slider_value
+
+# slider -> (request section, UI range); the ranges match Forecasting.jsx
+SLIDERS = {
+    "fxRate_delta":          ("assumptions", (-5.0, 5.0)),
+    "inflationPct_delta":    ("assumptions", (-3.0, 3.0)),
+    "wageIndex_delta":       ("assumptions", (-5.0, 5.0)),
+    "dept_pct":              ("assumptions", (-50.0, 50.0)),
+    "enrolled_FTE_delta":    ("drivers", (-1000.0, 1000.0)),
+    "programLaunches_delta": ("drivers", (-5.0, 10.0)),
+}
+MAX_SCENARIOS = 2000
+
+
+def _check_names(names) -> None:
+    unknown = sorted(set(names) - set(SLIDERS))
+    if unknown:
+        raise ValueError(f"Unknown slider(s): {', '.join(unknown)}")
+
+
+def slider_point(values: dict | None) -> dict:
+    """All six sliders of a flat {slider: value} dict (missing ones 0); unknown names raise ValueError."""
+    values = values or {}
+    _check_names(values)
+    return {name: slider_value(values, name) for name in SLIDERS}
+
+
+def scenario_point(scen: dict) -> dict:
+    """Slider point of a parse_scenario() dict (the inverse mapping; dept_pct back in percent)."""
+    return {
+        "fxRate_delta": scen["fx_delta"],
+        "inflationPct_delta": scen["inf_delta"],
+        "wageIndex_delta": scen["wage_delta"],
+        "dept_pct": scen["dept_pct"] * 100.0,
+        "enrolled_FTE_delta": float(scen["enrolled_delta"]),
+        "programLaunches_delta": float(scen["programs_delta"]),
+    }
+
+
+def expand_grid(grid: dict) -> list[dict]:
+    """Cartesian product of {slider: [values, ...]} as flat slider points."""
+    _check_names(grid)
+    axes = {name: [slider_value({name: v}, name) for v in (vals if isinstance(vals, list) else [vals])]
+            for name, vals in grid.items()}
+    size = int(np.prod([len(v) for v in axes.values()])) if axes else 0
+    if size > MAX_SCENARIOS:
+        raise ValueError(f"The grid has {size} scenarios; at most {MAX_SCENARIOS} are allowed.")
+    return [slider_point(dict(zip(axes, combo))) for combo in itertools.product(*axes.values())]
+
+
+def scenario_arrays(points: list[dict]) -> dict:
+    """run_rollout's per-row exog_delta (n, 3), drivers_delta (n, 2) and dept_pct (n,) for slider points."""
+    scens = []
+    for p in points:
+        sections = {"assumptions": {}, "drivers": {}}
+        for name, (section, _) in SLIDERS.items():
+            sections[section][name] = p[name]
+        scens.append(parse_scenario(sections["assumptions"], sections["drivers"]))
+    return {
+        "exog_delta": np.array([[s["fx_delta"], s["inf_delta"], s["wage_delta"]] for s in scens]),
+        "drivers_delta": np.array([[s["enrolled_delta"], s["programs_delta"]] for s in scens], dtype=float),
+        "dept_pct": np.array([s["dept_pct"] for s in scens]),
+    }
+
+
+def tornado_points(base: dict, ranges: dict) -> list[dict]:
+    """(low, high) points per slider in ``ranges`` with every other slider at ``base``."""
+    points = []
+    for name, (lo, hi) in ranges.items():
+        points += [{**base, name: lo}, {**base, name: hi}]
+    return points
+
+
+def sweep_ranges(points: list[dict], base: dict) -> dict:
+    """Tornado range of each slider: the sweep's min / max where it varies, else the UI range."""
+    out = {}
+    for name, (_, ui_range) in SLIDERS.items():
+        vals = {p[name] for p in points} | {base[name]}
+        out[name] = (min(vals), max(vals)) if len(vals) > 1 else ui_range
+    return out
+
+
+def run_sweep(run, state, points: list[dict], base: dict, drivers_base, targets, macro):
+    """
+    Evaluate ``points`` plus the baseline and tornado rows in ONE batched rollout.
+
+    ``run(state, targets, macro, **scenario)`` is the forecast runner (run_rollout /
+    direct.run_forecast with the bundle bound); ``state`` is the department's single-series
+    state. Returns ``(baseline (H, 3), tornado rows, point quantiles (n, H, 3))``.
+    """
+    ranges = sweep_ranges(points, base)
+    extra = [base] + tornado_points(base, ranges)
+    rows = extra + points
+    quantiles, _ = run(state.repeat(len(rows)), targets, macro,
+                       drivers_base=np.repeat(np.asarray(drivers_base, dtype=float).reshape(1, 2), len(rows), axis=0),
+                       **scenario_arrays(rows))
+
+    base_q = quantiles[0]
+    base_total = float(base_q[:, 1].sum())
+    tornado = []
+    for i, (name, (lo, hi)) in enumerate(ranges.items()):
+        low, high = (float(quantiles[1 + 2 * i + k][:, 1].sum()) for k in (0, 1))
+        tornado.append({
+            "slider": name, "low": lo, "high": hi,
+            "p50_low": low, "p50_high": high,
+            "change_low_pct": _pct(low, base_total), "change_high_pct": _pct(high, base_total),
+            "swing": abs(high - low),
+        })
+    tornado.sort(key=lambda r: -r["swing"])
+    return base_q, tornado, quantiles[len(extra):]
+
+
+def _pct(value: float, base: float):
+    return None if base == 0 else 100.0 * (value / base - 1.0)
+
+
+def scenario_rows(points: list[dict], quantiles: np.ndarray, base_total: float) -> list[dict]:
+    """Compact per-scenario table: sliders + 12-month sums of the monthly p10 / p50 / p90."""
+    totals = quantiles.sum(axis=1)   # (n, 3)
+    return [
+        {
+            "sliders": p,
+            "p10_sum": float(t[0]), "p50_sum": float(t[1]), "p90_sum": float(t[2]),
+            "change_pct": _pct(float(t[1]), base_total),
+        }
+        for p, t in zip(points, totals)
+    ]
@@ -0,0 +1,139 @@
+# backend/api/services/simulate.py
+"""
+Monte Carlo sample paths of the recursive forecast.
+
+Per-month p10 / p50 / p90 can't be summed into intervals for an annual or a
+university-wide total. Here every department's state is replicated into N paths
+(``RolloutState.repeat``) and the rollout feeds back a DRAW instead of the p50: at
+each step every path's quantiles (after overlay, uplift and sort) define a
+piecewise-linear inverse CDF through (0.1, p10), (0.5, p50), (0.9, p90), extended
+linearly to 0 and 1, and one uniform draw per path picks its value. One step is
+one (paths x features) predict for all departments; paths are independent, so
+they are run in chunks of at most ``FORECAST_SIM_CHUNK_ROWS`` rows to bound the
+rollout's working memory, and no further chunk is started once it would overrun
+``FORECAST_SIM_BUDGET_SECONDS`` (the result then has fewer paths than asked for;
+callers report the count).
+
+The drawn values themselves are kept (exact quantiles need every path): one
+(departments x paths x 12) float array, summarized in place. Its size is capped by
+``FORECAST_SIM_MAX_PATH_ROWS`` departments x paths (``check_size``), so a request
+can't allocate more than about MAX_PATH_ROWS x 12 x 8 bytes.
+
+Departments are drawn independently of each other, so the cross-department total
+is the sum of independent paths (only the shared scenario links them).
+"""
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .rollout import ALPHAS, run_rollout
+
+MAX_PATHS = 50_000
+MAX_PATH_ROWS = 200_000       # departments x paths: ~19 MB of float64 12-month paths
+CHUNK_ROWS = 20_000
+BUDGET_SECONDS = 10.0
+SUMMARY_QUANTILES = ALPHAS
+
+
+def sample_quantiles(p: np.ndarray, u: np.ndarray) -> np.ndarray:
+    """
+    Draw from each row's piecewise-linear inverse CDF through (ALPHAS, p); ``p`` (M, 3)
+    sorted, ``u`` (M,) uniform on [0, 1). The outer segments' slopes carry on to 0 and 1.
+    """
+    lo, mid, hi = ALPHAS
+    below = p[:, 1] + (u - mid) * (p[:, 1] - p[:, 0]) / (mid - lo)
+    above = p[:, 1] + (u - mid) * (p[:, 2] - p[:, 1]) / (hi - mid)
+    return np.where(u < mid, below, above)
+
+
+def max_path_rows() -> int:
+    return getattr(settings, "FORECAST_SIM_MAX_PATH_ROWS", MAX_PATH_ROWS)
+
+
+def check_size(n_series: int, n_paths: int) -> None:
+    """ValueError when ``n_series`` x ``n_paths`` sampled paths exceed the memory cap."""
+    limit = max_path_rows()
+    if n_series * n_paths > limit:
+        raise ValueError(f"{n_series} department(s) x {n_paths} paths exceeds the limit of {limit} "
+                         f"simulated paths; ask for at most {max(1, limit // n_series)} paths.")
+
+
+def simulate_paths(state, targets, models, schema, macro, n_paths: int, seed=None,
+                   drivers_base=0.0, chunk_rows: int | None = None, budget: float | None = None,
+                   **scenario) -> np.ndarray:
+    """
+    Up to ``n_paths`` sampled paths per series of ``state``: array (B, N, H), N < n_paths
+    only when the time ``budget`` (seconds) ran out first. The first chunk always runs.
+
+    ``scenario`` holds run_rollout's exog / driver / uplift / elas arguments (shared by
+    every path); ``drivers_base`` is per series, broadcastable to (B, 2).
+    """
+    B, H = state.size, len(targets)
+    check_size(B, n_paths)
+    rng = np.random.default_rng(seed)
+    drivers_base = np.broadcast_to(np.asarray(drivers_base, dtype=float), (B, 2))
+    chunk = max(1, (chunk_rows or getattr(settings, "FORECAST_SIM_CHUNK_ROWS", CHUNK_ROWS)) // B)
+    budget = budget if budget is not None else getattr(settings, "FORECAST_SIM_BUDGET_SECONDS", BUDGET_SECONDS)
+
+    paths = np.empty((B, n_paths, H))
+    started, slowest = time.monotonic(), 0.0
+    for start in range(0, n_paths, chunk):
+        if start and time.monotonic() - started + slowest > budget:
+            return paths[:, :start]
+        t0 = time.monotonic()
+        n = min(chunk, n_paths - start)
+        drawn = np.empty((B * n, H))   # rows are series-major: row b*n + j is path j of series b
+
+        def draw(h, p):
+            drawn[:, h] = sample_quantiles(p, rng.random(len(p)))
+            return drawn[:, h]
+
+        run_rollout(state.repeat(n), targets, models, schema, macro,
+                    drivers_base=np.repeat(drivers_base, n, axis=0), feedback=draw, **scenario)
+        paths[:, start:start + n] = drawn.reshape(B, n, H)
+        slowest = max(slowest, time.monotonic() - t0)
+    return paths
+
+
+def path_quantiles(values: np.ndarray, axis: int) -> dict:
+    """{"p10", "p50", "p90", "mean"} of ``values`` over ``axis`` (the paths axis)."""
+    qs = np.quantile(values, SUMMARY_QUANTILES, axis=axis)
+    out = {f"p{round(q * 100)}": qs[i] for i, q in enumerate(SUMMARY_QUANTILES)}
+    out["mean"] = values.mean(axis=axis)
+    return out
+
+
+def summarize(keys, targets, paths: np.ndarray) -> dict:
+    """
+    Interval summaries of ``paths`` (B, N, H): per series the running cumulative total per
+    month and the annual (whole-horizon) total; across series the monthly and annual totals.
+
+    ``paths`` is overwritten with its running totals (no second (B, N, H) array is made).
+    """
+    months = [f"{t:%Y-%m}" for t in targets]
+
+    def rows(stats):
+        return [{"date": m, **{k: float(v[h]) for k, v in stats.items()}} for h, m in enumerate(months)]
+
+    def scalar(stats):
+        return {k: float(v) for k, v in stats.items()}
+
+    cum = np.cumsum(paths, axis=2, out=paths)
+    total_cum = cum.sum(axis=0)                       # (N, H): one university-wide path per draw
+    total = np.diff(total_cum, axis=1, prepend=0.0)
+    return {
+        "Departments": [
+            {
+                "Department": key,
+                "Annual": scalar(path_quantiles(cum[i, :, -1], axis=0)),
+                "Cumulative": rows(path_quantiles(cum[i], axis=0)),
+            }
+            for i, key in enumerate(keys)
+        ],
+        "Total": {
+            "Annual": scalar(path_quantiles(total_cum[:, -1], axis=0)),
+            "Monthly": rows(path_quantiles(total, axis=0)),
+            "Cumulative": rows(path_quantiles(total_cum, axis=0)),
+        },
+    }
@@ -0,0 +1,149 @@
+# backend/api/services/spend_rollup.py
+"""
+Pre-aggregated RFP spend (SpendRollup) and the analytics queries served from it.
+
+The rollup holds one row per (month, department, transaction type, source of fund,
+mode of payment, currency) with the bucket's net spend and RFP count. Any grouping
+by a subset of those dimensions and by month / quarter / year is a GROUP BY over
+the rollup, whose size depends on how many combinations occur, not on RFP volume.
+
+``refresh_bucket`` re-sums ONE bucket (the RFP signal handlers call it on create /
+update / delete, for both buckets when an update moves an RFP); ``rebuild``
+recomputes the table with one GROUP BY over the RFPs. Each write bumps the rollup
+version stamp, which keys the cached analytics responses and their ETags.
+"""
+import hashlib
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth, TruncQuarter, TruncYear
+
+from api.models import (Department, ModeOfPayment, RequestForPayment, SourceOfFund, SpendRollup,
+                        TransactionType)
+from .forecast_cache import bump_version, get_cache, version
+
+ROLLUP_VERSION_KEY = "rfp:rollup_version"
+
+# API name -> (RFP FK field, rollup column, dimension model)
+DIMENSIONS = {
+    "department": ("department", "department_id", Department),
+    "transactionType": ("transactionType", "transactionType_id", TransactionType),
+    "sourceOfFund": ("sourceOfFund", "sourceOfFund_id", SourceOfFund),
+    "modeOfPayment": ("modeOfPayment", "modeOfPayment_id", ModeOfPayment),
+}
+GROUPS = [*DIMENSIONS, "currency"]
+PERIODS = {"month": TruncMonth, "quarter": TruncQuarter, "year": TruncYear}
+BUCKET_FIELDS = ["dateRequested", *(fk + "_id" for fk, _, _ in DIMENSIONS.values()), "currency"]
+
+
+def rollup_version() -> int:
+    return version(ROLLUP_VERSION_KEY)
+
+
+def bucket_key(rfp) -> tuple:
+    """(dateRequested, department_id, transactionType_id, sourceOfFund_id, modeOfPayment_id, currency) of an RFP."""
+    return tuple(getattr(rfp, f) for f in BUCKET_FIELDS)
+
+
+def same_bucket(a: tuple, b: tuple) -> bool:
+    """Whether two bucket keys fall in the same rollup row."""
+    return a[0].replace(day=1) == b[0].replace(day=1) and a[1:] == b[1:]
+
+
+def _upsert(objs: list) -> None:
+    SpendRollup.objects.bulk_create(
+        objs, batch_size=1000, update_conflicts=True,
+        unique_fields=["month", *(col for _, col, _ in DIMENSIONS.values()), "currency"],
+        update_fields=["netTotal", "count"],
+    )
+
+
+def refresh_bucket(key: tuple) -> None:
+    """Re-sum the rollup bucket of ``key`` (see ``bucket_key``)."""
+    day, *ids, currency = key
+    month = day.replace(day=1)
+    rfps = RequestForPayment.objects.filter(dateRequested__gte=month,
+                                            dateRequested__lt=month + relativedelta(months=1),
+                                            currency=currency)
+    grain = {"month": month, "currency": currency}
+    for (fk, col, _), pk in zip(DIMENSIONS.values(), ids):
+        rfps = rfps.filter(**({f"{fk}_id": pk} if pk else {f"{fk}__isnull": True}))
+        grain[col] = pk or 0
+    agg = rfps.aggregate(total=Sum("netTotal"), n=Count("id"))
+    with transaction.atomic():
+        if agg["n"]:
+            _upsert([SpendRollup(**grain, netTotal=agg["total"], count=agg["n"])])
+        else:
+            SpendRollup.objects.filter(**grain).delete()
+    bump_version(ROLLUP_VERSION_KEY)
+
+
+def rebuild() -> int:
+    """Recompute the whole rollup with one GROUP BY over the RFPs; returns buckets written."""
+    fks = [f"{fk}_id" for fk, _, _ in DIMENSIONS.values()]
+    rows = (RequestForPayment.objects
+            .annotate(bucket=TruncMonth("dateRequested"))
+            .values("bucket", *fks, "currency")
+            .annotate(total=Sum("netTotal"), n=Count("id"))
+            .order_by())
+    objs = [
+        SpendRollup(month=r["bucket"], currency=r["currency"], netTotal=r["total"], count=r["n"],
+                    **{col: r[fk] or 0 for fk, (_, col, _) in zip(fks, DIMENSIONS.values())})
+        for r in rows
+    ]
+    with transaction.atomic():
+        SpendRollup.objects.all().delete()
+        SpendRollup.objects.bulk_create(objs, batch_size=1000)
+    bump_version(ROLLUP_VERSION_KEY)
+    return len(objs)
+
+
+def _names(group: str, ids) -> dict:
+    _, _, model = DIMENSIONS[group]
+    return dict(model.objects.filter(pk__in=[i for i in ids if i]).values_list("pk", "name"))
+
+
+def spend(group_by: list[str], period: str | None = "month", start=None, end=None,
+          currencies: list[str] | None = None) -> list[dict]:
+    """
+    Net spend grouped by ``group_by`` (subset of GROUPS) and ``period`` (month /
+    quarter / year, or None for no time axis), for months start..end inclusive.
+    Rows: {"period": "YYYY-MM-DD" | None, <group>: name, ..., "netTotal", "count"}.
+    """
+    qs = SpendRollup.objects.all()
+    if start:
+        qs = qs.filter(month__gte=start)
+    if end:
+        qs = qs.filter(month__lte=end)
+    if currencies:
+        qs = qs.filter(currency__in=currencies)
+    keys = [DIMENSIONS[g][1] if g in DIMENSIONS else g for g in group_by]
+    if period:
+        qs = qs.annotate(period=PERIODS[period]("month"))
+        keys = ["period", *keys]
+    rows = list(qs.values(*keys).annotate(total=Sum("netTotal"), n=Sum("count")).order_by(*keys))
+
+    names = {g: _names(g, {r[DIMENSIONS[g][1]] for r in rows}) for g in group_by if g in DIMENSIONS}
+    out = []
+    for r in rows:
+        item = {"period": r["period"].isoformat() if period else None}
+        for g in group_by:
+            item[g] = names[g].get(r[DIMENSIONS[g][1]]) if g in DIMENSIONS else r[g]
+        item["netTotal"] = float(r["total"] or Decimal("0"))
+        item["count"] = int(r["n"] or 0)
+        out.append(item)
+    return out
+
+
+def cached_spend(params: dict, **kwargs) -> tuple[list[dict], str]:
+    """``spend(**kwargs)`` memoized under the current rollup version; returns ``(rows, etag)``."""
+    etag = hashlib.sha1(f"{rollup_version()}|{sorted(params.items())}".encode()).hexdigest()[:20]
+    key = f"rfp:spend:{etag}"
+    cache = get_cache()
+    rows = cache.get(key)
+    if rows is None:
+        rows = spend(**kwargs)
+        cache.set(key, rows)
+    return rows, f'"{etag}"'
@@ -0,0 +1,268 @@
+# backend/api/services/tree_eval.py
+"""
+Pure-NumPy evaluator for the quantile LightGBM models.
+
+For one-row (or few-row) inputs most of ``Booster.predict`` time is per-call
+overhead, not tree traversal. ``CompiledForest`` flattens the trees of several
+boosters into node arrays (split feature, threshold, children, default/missing
+handling, categorical bitsets, leaf values) once, then walks every tree of every
+booster for all rows together, one depth level per NumPy step.
+
+Decisions follow LightGBM's Tree::NumericalDecision / CategoricalDecision, so
+outputs agree with ``Booster.predict`` up to float summation order; ``verify``
+checks that on probe rows built from the models' own split thresholds.
+"""
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+K_ZERO_THRESHOLD = 1e-35                      # LightGBM kZeroThreshold
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+IDENTITY_OBJECTIVES = ("quantile", "regression", "regression_l1", "huber", "fair", "mape")
+_ALL_ONES = np.uint64(np.iinfo(np.uint64).max)
+
+
+def _parse_trees(model_str: str) -> tuple[list[dict], int]:
+    """Tree blocks of a LightGBM text model as dicts of raw strings, plus the feature count."""
+    header, _, body = model_str.partition("\nTree=")
+    meta = dict(line.split("=", 1) for line in header.splitlines() if "=" in line)
+    objective = meta.get("objective", "").split(" ")[0]
+    if objective not in IDENTITY_OBJECTIVES or int(meta.get("num_tree_per_iteration", 1)) != 1:
+        raise ValueError(f"Unsupported model for compiled evaluation (objective={objective!r})")
+    n_features = int(meta["max_feature_idx"]) + 1
+
+    trees = []
+    for block in ("Tree=" + body).split("\nTree="):
+        block = block.split("end of trees")[0]
+        kv = dict(line.split("=", 1) for line in block.splitlines() if "=" in line)
+        if "num_leaves" not in kv:
+            continue
+        if kv.get("is_linear", "0") != "0":
+            raise ValueError("Linear trees are not supported by the compiled evaluator")
+        trees.append(kv)
+    return trees, n_features
+
+
+def _arr(kv: dict, key: str, dtype):
+    return np.array(kv[key].split(), dtype=dtype) if kv.get(key) else np.array([], dtype=dtype)
+
+
+class CompiledForest:
+    """Flattened trees of one or more boosters; ``predict`` returns (rows x boosters)."""
+
+    def __init__(self, boosters: list):
+        feat, thr, left, right, dflt_left, missing, is_cat = [], [], [], [], [], [], []
+        cat_start, cat_len, cat_words = [], [], []
+        false_mask, pos_value, tree_pos_start, tree_model = [], [], [], []
+        n_cat_words = n_pos = 0
+        leaf_value, roots, n_nodes, n_leaves = [], [], 0, 0
+        self.n_models = len(boosters)
+        self.n_features = None
+        self.bias = np.zeros(self.n_models)          # single-leaf trees
+        self.max_leaves = 1
+
+        for m, booster in enumerate(boosters):
+            trees, n_features = _parse_trees(booster.model_to_string())
+            if self.n_features not in (None, n_features):
+                raise ValueError("Boosters disagree on the number of features")
+            self.n_features = n_features
+
+            for kv in trees:
+                nl = int(kv["num_leaves"])
+                lv = _arr(kv, "leaf_value", np.float64)
+                if nl == 1:
+                    self.bias[m] += lv[0]
+                    continue
+                self.max_leaves = max(self.max_leaves, nl)
+
+                dt = _arr(kv, "decision_type", np.int64)
+                lc = _arr(kv, "left_child", np.int64)
+                rc = _arr(kv, "right_child", np.int64)
+                # internal children -> global node ids; leaves (~k) -> ~(global leaf id)
+                left.append(np.where(lc >= 0, lc + n_nodes, ~(~lc + n_leaves)))
+                right.append(np.where(rc >= 0, rc + n_nodes, ~(~rc + n_leaves)))
+                leaf_value.append(lv)
+                feat.append(_arr(kv, "split_feature", np.int64))
+                t = _arr(kv, "threshold", np.float64)
+                thr.append(t)
+                is_cat.append((dt & 1).astype(bool))
+                dflt_left.append(((dt >> 1) & 1).astype(bool))
+                missing.append((dt >> 2) & 3)
+
+                # categorical splits: threshold is an index into cat_boundaries
+                starts = np.zeros(len(dt), dtype=np.int64)
+                lens = np.zeros(len(dt), dtype=np.int64)
+                if int(kv.get("num_cat", 0)) > 0:
+                    bounds = _arr(kv, "cat_boundaries", np.int64)
+                    words = _arr(kv, "cat_threshold", np.uint32)
+                    cat_nodes = np.flatnonzero(dt & 1)
+                    ci = t[cat_nodes].astype(np.int64)
+                    starts[cat_nodes] = bounds[ci] + n_cat_words
+                    lens[cat_nodes] = bounds[ci + 1] - bounds[ci]
+                    cat_words.append(words)
+                    n_cat_words += len(words)
+                cat_start.append(starts)
+                cat_len.append(lens)
+
+                # leaves in left-to-right order; a node that goes right rules out its left subtree
+                order, masks = [], [0] * len(dt)
+
+                def walk(nd):
+                    if nd < 0:
+                        order.append(~nd)
+                        return len(order) - 1, len(order)
+                    a, b = walk(lc[nd])
+                    masks[nd] = ((1 << 64) - 1) ^ ((((1 << (b - a)) - 1) << a) if nl <= 64 else 0)
+                    return a, walk(rc[nd])[1]
+
+                walk(0)
+                false_mask.append(np.array(masks, dtype=np.uint64))
+                pos_value.append(lv[order])
+                tree_pos_start.append(n_pos)
+                tree_model.append(m)
+                n_pos += nl
+
+                roots.append(n_nodes)
+                n_nodes += len(dt)
+                n_leaves += nl
+
+        def cat(parts, dtype):
+            return np.concatenate(parts).astype(dtype) if parts else np.array([], dtype=dtype)
+
+        self.roots = np.array(roots, dtype=np.int64)
+        self.feat = cat(feat, np.int64)
+        self.thr = cat(thr, np.float64)
+        self.left = cat(left, np.int64)
+        self.right = cat(right, np.int64)
+        self.default_left = cat(dflt_left, bool)
+        self.missing = cat(missing, np.int64)
+        self.is_cat = cat(is_cat, bool)
+        self.cat_start = cat(cat_start, np.int64)
+        self.cat_len = cat(cat_len, np.int64)
+        self.cat_words = cat(cat_words, np.uint32)
+        self.leaf_value = cat(leaf_value, np.float64)
+        self.false_mask = cat(false_mask, np.uint64)
+        self.pos_value = cat(pos_value, np.float64)
+        self.tree_pos_start = np.array(tree_pos_start, dtype=np.int64)
+        self.tree_model = np.array(tree_model, dtype=np.int64)
+        self.leaf_model = np.repeat(self.tree_model, np.diff(np.append(self.tree_pos_start, n_pos)))
+        self.tree_onehot = np.eye(self.n_models)[self.tree_model].reshape(-1, self.n_models)
+
+        # where NaN goes: numerical "None" missing treats NaN as 0, Zero/NaN use the default
+        # direction, categorical always goes right
+        with np.errstate(invalid="ignore"):
+            self.nan_left = np.where(self.missing == MISSING_NONE, 0.0 <= self.thr, self.default_left) & ~self.is_cat
+        self.zero_nodes = np.flatnonzero((self.missing == MISSING_ZERO) & ~self.is_cat)
+        self.cat_nodes = np.flatnonzero(self.is_cat)
+
+    # --------------------------
+    # Split decisions
+    # --------------------------
+    def _in_bitset(self, nodes: np.ndarray, fval: np.ndarray) -> np.ndarray:
+        """Categorical split: NaN / negative -> right, else membership in the node's bitset."""
+        ok = ~np.isnan(fval)
+        iv = np.where(ok, fval, -1).astype(np.int64)
+        ok &= iv >= 0
+        word = iv >> 5
+        ok &= word < self.cat_len[nodes]
+        idx = np.where(ok, self.cat_start[nodes] + word, 0)
+        bit = (self.cat_words[idx] >> (iv & 31).astype(np.uint32)) & 1
+        return ok & (bit == 1)
+
+    def _decide(self, node: np.ndarray, fval: np.ndarray) -> np.ndarray:
+        """True where the split at ``node`` sends ``fval`` left (same shapes)."""
+        with np.errstate(invalid="ignore"):
+            go_left = fval <= self.thr[node]
+        nan = np.isnan(fval)
+        if nan.any():
+            go_left = np.where(nan, self.nan_left[node], go_left)
+        if self.zero_nodes.size:
+            z = (self.missing[node] == MISSING_ZERO) & ~self.is_cat[node] & (np.abs(fval) <= K_ZERO_THRESHOLD)
+            go_left = np.where(z, self.default_left[node], go_left)
+        if self.cat_nodes.size:
+            c = self.is_cat[node]
+            if c.any():
+                go_left[c] = self._in_bitset(node[c], fval[c])
+        return go_left
+
+    # --------------------------
+    # Prediction
+    # --------------------------
+    def _predict_bitvector(self, X: np.ndarray) -> np.ndarray:
+        """
+        All splits of all trees in one shot: every node is evaluated, each node that goes
+        right clears its left subtree's leaves from the tree's bitvector, and the exit
+        leaf is the lowest remaining bit (trees with at most 64 leaves).
+        """
+        F = X[:, self.feat]                           # (rows, nodes)
+        with np.errstate(invalid="ignore"):
+            go_left = F <= self.thr
+        nan = np.isnan(F)
+        if nan.any():
+            go_left = np.where(nan, self.nan_left, go_left)
+        if self.zero_nodes.size:
+            z = self.zero_nodes
+            go_left[:, z] = np.where(np.abs(F[:, z]) <= K_ZERO_THRESHOLD, self.default_left[z], go_left[:, z])
+        if self.cat_nodes.size:
+            go_left[:, self.cat_nodes] = self._in_bitset(self.cat_nodes, F[:, self.cat_nodes])
+
+        masks = np.where(go_left, _ALL_ONES, self.false_mask)
+        exit_mask = np.bitwise_and.reduceat(masks, self.roots, axis=1)
+        lowest = exit_mask & (~exit_mask + np.uint64(1))
+        pos = np.log2(lowest.astype(np.float64)).astype(np.int64)
+        values = self.pos_value[self.tree_pos_start + pos]   # (rows, trees)
+        return values @ self.tree_onehot + self.bias
+
+    def _predict_levels(self, X: np.ndarray) -> np.ndarray:
+        """Walk every (row, tree) pair one depth level per step (any tree size)."""
+        n, T = X.shape[0], len(self.roots)
+        cur = np.tile(self.roots, n)                 # row-major: row i, tree j -> i*T + j
+        row = np.repeat(np.arange(n), T)
+        active = np.arange(n * T)
+        while active.size:
+            node = cur[active]
+            go_left = self._decide(node, X[row[active], self.feat[node]])
+            cur[active] = np.where(go_left, self.left[node], self.right[node])
+            active = active[cur[active] >= 0]
+
+        leaves = ~cur
+        out = np.tile(self.bias, (n, 1))
+        np.add.at(out, (row, self.leaf_model[leaves]), self.leaf_value[leaves])
+        return out
+
+    def predict(self, X) -> np.ndarray:
+        """Raw scores for every booster: (rows x n_models)."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        if not len(self.roots):
+            return np.tile(self.bias, (X.shape[0], 1))
+        if self.max_leaves <= 64:
+            return self._predict_bitvector(X)
+        return self._predict_levels(X)
+
+    def verify(self, boosters: list, n_probe: int = 256, rtol: float = 1e-9, seed: int = 0) -> bool:
+        """Compare against ``Booster.predict`` on rows sampled around the models' thresholds."""
+        rng = np.random.default_rng(seed)
+        P = np.zeros((n_probe, self.n_features))
+        for f in range(self.n_features):
+            cand = self.thr[(self.feat == f) & ~self.is_cat]
+            if len(cand):
+                c = rng.choice(cand, n_probe)
+                v = c + rng.choice([-1e-9, 1e-9], n_probe) * np.maximum(1.0, np.abs(c))
+            else:
+                v = rng.integers(0, 8, n_probe).astype(float)
+            v[rng.random(n_probe) < 0.05] = np.nan
+            v[rng.random(n_probe) < 0.05] = 0.0
+            P[:, f] = v
+        ref = np.column_stack([b.predict(P) for b in boosters])
+        got = self.predict(P)
+        ok = np.allclose(got, ref, rtol=rtol, atol=1e-9 * max(1.0, float(np.abs(ref).max())))
+        if not ok:
+            logger.warning("Compiled forest disagrees with Booster.predict (max abs diff %g)",
+                           float(np.nanmax(np.abs(got - ref))))
+        return ok
@@ -0,0 +1,126 @@
+# backend/api/signals.py
+from django.conf import settings
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import (DriversMonthly, MacroMonthly, RequestForPayment, Department, SourceOfFund, TransactionType,
+                     TypeOfBusiness, ModeOfPayment, TaxRegistration)
+from .services import feature_store, rfp_totals, spend_rollup
+from .services.rfp_search import bump_search_version
+from .services.lookups import bump_lookups_version
+from .services.forecast_cache import bump_data_version, bump_department_versions
+from .services.macro_store import bump_macro_version
+
+
+@receiver([post_save, post_delete], sender=DriversMonthly)
+@receiver([post_save, post_delete], sender=MacroMonthly)
+def invalidate_forecasts(sender, **kwargs):
+    """Forecast inputs changed: cached forecasts are stale."""
+    bump_data_version()
+
+
+@receiver([post_save, post_delete], sender=MacroMonthly)
+def invalidate_macro_store(sender, **kwargs):
+    """Macro rows changed: in-process macro stores reload on next use."""
+    bump_macro_version()
+
+
+@receiver(pre_save, sender=DriversMonthly)
+def remember_drivers_key(sender, instance, raw=False, **kwargs):
+    """Keep the row's previous (department, month): moving a row changes both windows."""
+    instance._feature_key = None
+    if instance.pk and not raw:
+        instance._feature_key = (DriversMonthly.objects
+                                 .filter(pk=instance.pk)
+                                 .values_list("department_id", "month")
+                                 .first())
+
+
+@receiver(post_save, sender=DriversMonthly)
+def refresh_features_on_save(sender, instance, raw=False, **kwargs):
+    """Recompute the stored features of the written month and the 12 rows after it."""
+    if raw:
+        return
+    new = (instance.department_id, instance.month)
+    old = getattr(instance, "_feature_key", None)
+    if old and old != new:
+        feature_store.refresh_window(*old)
+    feature_store.refresh_window(*new)
+
+
+@receiver(post_delete, sender=DriversMonthly)
+def refresh_features_on_delete(sender, instance, **kwargs):
+    feature_store.refresh_window(instance.department_id, instance.month)
+
+
+@receiver([post_save, post_delete], sender=DriversMonthly)
+def invalidate_department(sender, instance, **kwargs):
+    """The department's history changed (both departments when a row moves): its surfaces are stale."""
+    ids = {instance.department_id}
+    old = getattr(instance, "_feature_key", None)
+    if old:
+        ids.add(old[0])
+    bump_department_versions(ids)
+
+
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=SourceOfFund)
+@receiver([post_save, post_delete], sender=TransactionType)
+@receiver([post_save, post_delete], sender=TypeOfBusiness)
+@receiver([post_save, post_delete], sender=ModeOfPayment)
+@receiver([post_save, post_delete], sender=TaxRegistration)
+def invalidate_lookups(sender, **kwargs):
+    """Dimension rows changed: the /api/lookups/ payload and its ETag are rebuilt."""
+    bump_lookups_version()
+
+
+@receiver([post_save, post_delete], sender=RequestForPayment)
+def invalidate_rfp_search(sender, **kwargs):
+    """RFPs changed: in-process search indexes (non-PostgreSQL backends) rebuild on next use."""
+    bump_search_version()
+
+
+def _rfp_totals_enabled() -> bool:
+    return getattr(settings, "FORECAST_TOTALNET_FROM_RFPS", False)
+
+
+@receiver(pre_save, sender=RequestForPayment)
+def remember_rfp_bucket(sender, instance, raw=False, **kwargs):
+    """Keep the RFP's previous bucket key: an update may move it to other spend buckets."""
+    instance._spend_bucket = None
+    if instance.pk and not raw:
+        instance._spend_bucket = (RequestForPayment.objects
+                                  .filter(pk=instance.pk)
+                                  .values_list(*spend_rollup.BUCKET_FIELDS)
+                                  .first())
+
+
+@receiver(post_save, sender=RequestForPayment)
+def refresh_spend_on_save(sender, instance, raw=False, **kwargs):
+    """Re-sum the RFP's spend rollup and (department, month) totalNet buckets (and the ones it left)."""
+    if raw:
+        return
+    new = spend_rollup.bucket_key(instance)
+    old = getattr(instance, "_spend_bucket", None)
+    if old and not spend_rollup.same_bucket(old, new):
+        spend_rollup.refresh_bucket(old)
+    spend_rollup.refresh_bucket(new)
+
+    if not _rfp_totals_enabled():
+        return
+    rfp_totals.close_months()
+    (day, dept), (old_day, old_dept) = new[:2], (old or (None, None))[:2]
+    if old_dept and (old_dept, old_day.replace(day=1)) != (dept, day.replace(day=1)):
+        rfp_totals.refresh_bucket(old_dept, old_day)
+    if dept:
+        rfp_totals.refresh_bucket(dept, day)
+
+
+@receiver(post_delete, sender=RequestForPayment)
+def refresh_spend_on_delete(sender, instance, **kwargs):
+    spend_rollup.refresh_bucket(spend_rollup.bucket_key(instance))
+    if not _rfp_totals_enabled():
+        return
+    rfp_totals.close_months()
+    if instance.department_id:
+        rfp_totals.refresh_bucket(instance.department_id, instance.dateRequested)
@@ -1,3 +1,1321 @@
-from django.test import TestCase
+import atexit
+import json
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .apps import _serving
+from .models import (Department, DriversFeatures, DriversMonthly, ForecastRun, MacroMonthly, ModeOfPayment, RequestForPayment, Scenario,
+                     SourceOfFund, SpendRollup, TransactionType)
+from .pagination import KeysetPagination
+from .serializers import MacroMonthlySerializer
+from .services import feature_store, forecast_cache, response_surface, rfp_totals, rollout, simulate, spend_rollup
+from .services import direct
+from .services.direct import (DIRECT_COLS, direct_forecast, direct_path, run_forecast, save_direct, train_direct,
+                             training_frame)
+from .services.feature_schema import FeatureSchema
+from .services.features import (KEY, MACRO_COLS, TARGET, horizon_features, panel_features, panel_tails,
+                                tail_features)
+from .services.forecast_store import PRECOMPUTE, REQUEST, save_forecast_run
+from .services import forecasting_service
+from .services.forecasting_service import FILENAMES, predict_quantiles
+from .services.history import HISTORY_COLS, fetch_history, horizon_macro, horizon_targets, load_batch_state
+from .services.ingest import IngestError, read_rows, upsert_drivers, upsert_macro
+from .services.macro_store import MACRO_VERSION_KEY, bump_macro_version, get_macro_store, months_index
+from .services.model_registry import ModelRegistry, get_bundle
+from .services.rfp_search import filter_matches, search_rfps
+from .services.sensitivity import MAX_SCENARIOS, SLIDERS, scenario_arrays
+from .services.rollout import ALPHAS, RolloutState, postprocess, run_rollout
+from .services.tree_eval import CompiledForest
+
+TRAIN_COLS = json.loads((Path(settings.BASE_DIR) / "artifacts" / "train_columns.json").read_text())
+
+
+def _panel(departments=("CCIS", "CEA"), months=40, seed=0, start="2020-01-01") -> pd.DataFrame:
+    """Synthetic monthly spend with trend, seasonality and macro columns."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=months, freq="MS")
+    rows = []
+    for k, dept in enumerate(departments):
+        level = 1000.0 * (k + 1)
+        for i, d in enumerate(dates):
+            rows.append({
+                KEY: dept, "Date": d,
+                TARGET: level + 15 * i + 120 * np.sin(2 * np.pi * d.month / 12) + rng.normal(0, 20),
+                "fxRate": 55 + rng.normal(0, 1), "inflationPct": 3 + rng.normal(0, 0.3),
+                "wageIndex": 100 + i * 0.2, "enrolled_FTE_dept": 500 + 10 * k,
+                "programLaunches_dept": k,
+            })
+    return pd.DataFrame(rows)
+
+
+def _train(panel: pd.DataFrame, rounds: int = 25) -> dict:
+    """Small quantile boosters on the production column layout ({alpha: Booster})."""
+    feats = panel_features(panel)
+    X = FeatureSchema(TRAIN_COLS, [sorted(panel[KEY].unique())]).align(feats)
+    params = {"objective": "quantile", "learning_rate": 0.1, "num_leaves": 15, "min_data_in_leaf": 5,
+              "seed": 7, "deterministic": True, "force_row_wise": True, "verbose": -1}
+    return {
+        alpha: lgb.train({**params, "alpha": alpha}, lgb.Dataset(X, label=feats[TARGET], categorical_feature=[KEY]),
+                         num_boost_round=rounds)
+        for alpha in FILENAMES
+    }
+
+
+_ARTIFACTS = None
+
+
+def _artifacts() -> Path:
+    """Artifact directory with small recursive and direct model sets (trained once per test run)."""
+    global _ARTIFACTS
+    if _ARTIFACTS is None:
+        path = Path(tempfile.mkdtemp(prefix="forecast-artifacts-"))
+        atexit.register(shutil.rmtree, path, True)
+        panel = _panel(departments=("CCIS", "CEA", "SHS"), months=48)
+        for alpha, booster in _train(panel).items():
+            booster.save_model(str(path / FILENAMES[alpha]))
+        for name in ("train_columns.json", "exog_elasticities.json"):
+            shutil.copy(Path(settings.BASE_DIR) / "artifacts" / name, path / name)
+        save_direct(train_direct(panel, num_boost_round=20, params={"min_data_in_leaf": 5}), path)
+        _ARTIFACTS = path
+    return _ARTIFACTS
+
+
+class ForecastApiTestCase(TestCase):
+    """Departments with 40 months of history up to last month, served by the test models."""
+    departments = ("CCIS", "CEA")
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.enterClassContext(override_settings(FORECAST_ARTIFACT_DIR=_artifacts(), FORECAST_MODEL_CHECK_SECONDS=0))
+
+    @classmethod
+    def setUpTestData(cls):
+        start = (pd.Timestamp.today().to_period("M") - 40).to_timestamp()
+        panel = _panel(cls.departments, start=start)
+        depts = {name: Department.objects.create(name=name) for name in (*cls.departments, "NOHIST")}
+        DriversMonthly.objects.bulk_create([
+            DriversMonthly(department=depts[r[KEY]], month=r["Date"].date(), totalNet=round(r[TARGET], 2),
+                           enrolled_FTE_dept=r["enrolled_FTE_dept"], programLaunches_dept=r["programLaunches_dept"])
+            for r in panel.to_dict("records")
+        ])
+        first = panel[panel[KEY] == cls.departments[0]]
+        MacroMonthly.objects.bulk_create([
+            MacroMonthly(month=r["Date"].date(), fxRate_PHP_USD=round(r["fxRate"], 2),
+                         inflationPct=round(r["inflationPct"], 2), wageIndex=round(r["wageIndex"], 3))
+            for r in first.to_dict("records")
+        ])
+        forecast_cache.bump_data_version()
+        bump_macro_version()
+
+    def post(self, url, body):
+        return APIClient().post(url, body, format="json")
+
+
+class ModelRegistryTests(TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp(prefix="forecast-registry-"))
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        shutil.copytree(_artifacts(), self.dir, dirs_exist_ok=True)
+        self.registry = ModelRegistry(self.dir, check_interval=0)
+
+    def test_preload_then_unchanged_artifacts_keep_the_bundle(self):
+        self.registry.preload()
+        bundle = self.registry.get()
+        self.assertTrue(bundle.has_direct)
+        self.assertIs(self.registry.get(), bundle)
+
+    def test_changed_artifacts_are_swapped_in(self):
+        old = self.registry.get()
+        _train(_panel(departments=("CCIS", "CEA", "SHS")), rounds=10)[0.5].save_model(str(self.dir / FILENAMES[0.5]))
+        new = self.registry.get()
+        self.assertIsNot(new, old)
+        self.assertNotEqual(new.version, old.version)
+        self.assertIs(self.registry.get(), new)
+        # a request that started on the old bundle can still finish with it
+        X = old.schema.matrix(["CCIS"])
+        self.assertEqual(predict_quantiles(old.models, X).shape, (1, 3))
+
+    def test_broken_reload_keeps_the_old_bundle(self):
+        old = self.registry.get()
+        (self.dir / "train_columns.json").write_text("{not json")
+        with self.assertLogs("api.services.model_registry", "ERROR"):
+            self.assertIs(self.registry.get(), old)
+
+    def test_missing_artifacts_fail_the_request_not_the_preload(self):
+        registry = ModelRegistry(self.dir / "empty", check_interval=0)
+        with self.assertLogs("api.services.model_registry", "WARNING"):
+            registry.preload()
+        with self.assertRaises(Exception):
+            registry.get()
+
+    def test_only_runserver_preloads_among_management_commands(self):
+        for argv, serving in ((["manage.py", "runserver"], True), (["manage.py", "migrate"], False),
+                              (["django-admin", "check"], False), (["gunicorn", "backend.wsgi"], True)):
+            with mock.patch("sys.argv", argv):
+                self.assertEqual(_serving(), serving, argv)
+
+
+class FeatureSchemaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.models = _train(_panel())
+        cls.schema = FeatureSchema.for_models(TRAIN_COLS, cls.models)
+        cls.feats = panel_features(_panel(departments=("CCIS", "CEA", "SHS"), months=16))
+
+    def test_align_gives_the_training_layout(self):
+        X = self.schema.align(self.feats.drop(columns=["lag12"]))
+        self.assertEqual(list(X.columns), TRAIN_COLS)
+        self.assertTrue((X["lag12"] == 0).all())
+        self.assertEqual(list(X[KEY].cat.categories), list(self.models[0.5].pandas_categorical[0]))
+
+    def test_filled_matrix_matches_the_encoded_frame(self):
+        keys = list(self.feats[KEY])
+        cols = {c: self.feats[c].to_numpy() for c in self.feats.columns if c != KEY}
+        M = self.schema.fill(self.schema.matrix(keys), {**cols, "not_a_feature": np.ones(len(keys))})
+        want = forecasting_service.encode_frame(self.schema.align(self.feats), self.models[0.5].pandas_categorical)
+        np.testing.assert_array_equal(M, want)
+
+    def test_unknown_departments_encode_as_nan(self):
+        np.testing.assert_array_equal(self.schema.encode_keys(["CEA", "SHS", "CCIS"]), [1.0, np.nan, 0.0])
+
+    def test_layout_must_match_the_models(self):
+        with self.assertRaises(ValueError):
+            FeatureSchema(TRAIN_COLS, [])
+        with self.assertRaises(ValueError):
+            FeatureSchema(TRAIN_COLS + TRAIN_COLS[:1], self.models[0.5].pandas_categorical)
+
+
+class FeaturePipelineTests(TestCase):
+    """Whole-panel, last-row and horizon modes must agree with each other and with per-series pandas."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # departments with different lengths and start years, rows shuffled
+        cls.panel = pd.concat([_panel(("CCIS",), months=30, seed=1),
+                               _panel(("CEA",), months=20, seed=2, start="2021-05-01")]).sample(frac=1, random_state=3)
+        cls.recursive = ["lag1", "lag3", "lag12", "roll3_mean", "roll3_std", "roll6_mean", "roll6_std",
+                         "roll12_mean", "roll12_std", "t", "year"]
+
+    def test_panel_mode_matches_per_series_pandas(self):
+        feats = panel_features(self.panel)
+        for dept, hist in self.panel.groupby(KEY):
+            y = hist.sort_values("Date")[TARGET].reset_index(drop=True)
+            got = feats[feats[KEY] == dept].reset_index(drop=True)
+            np.testing.assert_allclose(got["lag3"], y.shift(3))
+            np.testing.assert_allclose(got["roll6_std"], y.shift(1).rolling(6).std())
+            np.testing.assert_allclose(got["yoy"], y / y.shift(12) - 1.0)
+            self.assertEqual(got["t"].iloc[0], got["Date"].iloc[0].month)
+
+    def test_last_row_mode_matches_the_next_panel_row(self):
+        tgt = pd.Timestamp("2022-12-01")
+        hist = self.panel[self.panel["Date"] < tgt]
+        keys, tail, first_year, _ = panel_tails(hist.sort_values([KEY, "Date"]))
+        last = tail_features(tail, first_year, tgt)
+        nxt = pd.DataFrame({KEY: keys, "Date": tgt, TARGET: np.nan})
+        full = panel_features(pd.concat([hist, nxt]))
+        want = full[full["Date"] == tgt].set_index(KEY).loc[keys]
+        for c in self.recursive:
+            np.testing.assert_allclose(last[c], want[c], err_msg=c)
+        np.testing.assert_array_equal(last["yoy"], np.nan)
+        self.assertEqual(last["m_12"].tolist(), want["m_12"].tolist())
+
+    def test_horizon_mode_matches_last_row_mode_from_the_origin(self):
+        h = 3
+        feats = horizon_features(self.panel, h)
+        for dept, hist in self.panel.groupby(KEY):
+            hist = hist.sort_values("Date").reset_index(drop=True)
+            origin = hist.iloc[:-h]
+            _, tail, first_year, _ = panel_tails(origin)
+            tgt = hist["Date"].iloc[-1]
+            last = tail_features(tail, first_year, tgt)
+            want = feats[(feats[KEY] == dept) & (feats["Date"] == tgt)]
+            for c in self.recursive:
+                np.testing.assert_allclose(last[c], want[c], err_msg=f"{dept} {c}")
+
+
+class RolloutEquivalenceTests(TestCase):
+    """run_rollout must reproduce the original loop: rebuild the panel and score its last row per month."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.panel = _panel()
+        cls.models = _train(cls.panel)
+        cls.schema = FeatureSchema.for_models(TRAIN_COLS, cls.models)
+
+    def _reference(self, dept, targets, macro, exog_delta, drivers, dept_pct):
+        hist = self.panel[self.panel[KEY] == dept][[KEY, "Date", TARGET, *MACRO_COLS]].copy()
+        out = []
+        for h, tgt in enumerate(targets):
+            eff = macro[h] + exog_delta
+            hist = pd.concat([hist, pd.DataFrame([{KEY: dept, "Date": tgt, TARGET: np.nan,
+                                                   **dict(zip(MACRO_COLS, eff))}])], ignore_index=True)
+            row = panel_features(hist).iloc[[-1]].copy()
+            row["enrolled_FTE_dept"], row["programLaunches_dept"] = drivers
+            X = self.schema.align(row)
+            raw = np.column_stack([self.models[a].predict(X) for a in ALPHAS])
+            p = postprocess(raw, None, np.array([1.0 + dept_pct]))[0]
+            hist.loc[hist.index[-1], TARGET] = p[1]
+            out.append(p)
+        return np.array(out)
+
+    def test_matches_panel_rebuild_loop(self):
+        targets = list(pd.date_range("2023-05-01", periods=12, freq="MS"))
+        macro = np.column_stack([np.full(12, 56.0), np.linspace(3, 4, 12), np.linspace(108, 110, 12)])
+        exog_delta, drivers, dept_pct = np.array([1.5, -0.5, 0.0]), (520.0, 2.0), 0.05
+
+        state = RolloutState.from_panel(self.panel.sort_values([KEY, "Date"]))
+        got, _ = run_rollout(state, targets, self.models, self.schema, macro,
+                             exog_delta=exog_delta, drivers_base=[500.0, 0.0], drivers_delta=[20.0, 2.0],
+                             dept_pct=dept_pct)
+        for i, dept in enumerate(state.keys):
+            want = self._reference(dept, targets, macro, exog_delta, drivers, dept_pct)
+            np.testing.assert_allclose(got[i], want, rtol=1e-9)
+
+    def test_state_is_not_consumed(self):
+        state = RolloutState.from_panel(self.panel.sort_values([KEY, "Date"]))
+        targets = list(pd.date_range("2023-05-01", periods=3, freq="MS"))
+        macro = np.full((3, 3), np.nan)
+        a, _ = run_rollout(state, targets, self.models, self.schema, macro)
+        b, _ = run_rollout(state, targets, self.models, self.schema, macro)
+        np.testing.assert_array_equal(a, b)
+        self.assertTrue((np.diff(a, axis=2) >= 0).all())
+
+
+class PredictQuantilesTests(TestCase):
+    """predict_quantiles must return exactly what each booster's own predict() returns."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.panel = _panel(departments=("CCIS", "CEA", "SHS"))
+        cls.models = _train(cls.panel)
+        cls.schema = FeatureSchema.for_models(TRAIN_COLS, cls.models)
+        cls.X = cls.schema.align(panel_features(cls.panel))
+
+    def _each_booster(self, X):
+        return np.column_stack([self.models[a].predict(X) for a in ALPHAS])
+
+    def test_frame_and_matrix_inputs_match_each_booster(self):
+        want = self._each_booster(self.X)
+        np.testing.assert_array_equal(predict_quantiles(self.models, self.X), want)
+        M = forecasting_service.encode_frame(self.X, self.models[0.5].pandas_categorical)
+        np.testing.assert_array_equal(M[:, self.schema.index[KEY]], self.schema.encode_keys(self.panel[KEY]))
+        np.testing.assert_array_equal(predict_quantiles(self.models, M), want)
+        np.testing.assert_array_equal(predict_quantiles(self.models, M[3]), want[3:4])
+
+    def test_categories_are_recoded_like_booster_predict(self):
+        X = self.X.copy()
+        # categories listed in another order, plus a department the models never saw
+        X[KEY] = pd.Categorical(["ZZZ", *X[KEY].astype(str)[1:]], categories=["ZZZ", "SHS", "CEA", "CCIS"])
+        np.testing.assert_array_equal(predict_quantiles(self.models, X), self._each_booster(X))
+
+    @override_settings(FORECAST_INFERENCE_BACKEND="numpy")
+    def test_numpy_backend_scores_all_quantiles_in_one_pass(self):
+        forest = forecasting_service.compiled_forest(self.models)
+        self.assertIsNotNone(forest)
+        self.assertIs(forecasting_service.compiled_forest(self.models), forest)   # compiled once
+        np.testing.assert_allclose(predict_quantiles(self.models, self.X), self._each_booster(self.X), rtol=1e-9)
+
+    def test_mismatched_categoricals_are_rejected(self):
+        with self.assertRaises(ValueError):
+            forecasting_service.encode_frame(self.X, [])
+
+
+class CompiledForestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.models = _train(_panel(departments=("CCIS", "CEA", "SHS")), rounds=40)
+        cls.boosters = [cls.models[a] for a in ALPHAS]
+
+    def test_verify_against_booster(self):
+        forest = CompiledForest(self.boosters)
+        self.assertTrue(forest.verify(self.boosters, n_probe=512))
+
+    def test_predict_matches_booster_on_feature_rows(self):
+        panel = _panel(departments=("CCIS", "CEA", "SHS"), seed=1)
+        schema = FeatureSchema.for_models(TRAIN_COLS, self.models)
+        X = schema.align(panel_features(panel))
+        X_num = np.asarray(X.assign(**{KEY: X[KEY].cat.codes.replace(-1, np.nan)}), dtype=float)
+        want = np.column_stack([b.predict(X) for b in self.boosters])
+        np.testing.assert_allclose(CompiledForest(self.boosters).predict(X_num), want, rtol=1e-9)
+
+    def test_verify_detects_a_different_model(self):
+        other = _train(_panel(departments=("CCIS", "CEA", "SHS"), seed=5), rounds=40)
+        forest = CompiledForest(self.boosters)
+        with self.assertLogs("api.services.tree_eval", "WARNING"):
+            self.assertFalse(forest.verify([other[a] for a in ALPHAS]))
+
+
+RFP_FIELDS = dict(
+    requestedBy="a", payableTo="b", description="c", dateNeeded=date(2026, 1, 31), bankName="x",
+    accountName="y", accountNumber="1", contactPerson="p", contactNumber="1", email="a@b.c",
+    termsOfPayment="t", tin="1", payeeAddress="z", currency="PHP", amount=1, serviceFee=0, lessEWT=0,
+)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dept = Department.objects.create(name="CCIS")
+        # ties on netTotal (and on dateRequested: every row is created today) exercise the id tie-break
+        totals = [50, 10, 30, 30, 20, 30, 40]
+        cls.rfps = [RequestForPayment.objects.create(netTotal=Decimal(t), department=cls.dept, **RFP_FIELDS)
+                    for t in totals]
+
+    def _walk(self, ordering, page_size=3):
+        client, ids, pages = APIClient(), [], 0
+        url = f"/api/rfps/?ordering={ordering}&page_size={page_size}"
+        while url:
+            body = client.get(url).json()
+            ids += [r["id"] for r in body["results"]]
+            url, pages = body["next"], pages + 1
+        return ids, pages
+
+    def test_pages_cover_every_row_once_in_order(self):
+        for ordering, desc in (("netTotal", False), ("-netTotal", True), ("dateRequested", False)):
+            field = ordering.lstrip("-")
+            ids, pages = self._walk(ordering)
+            want = sorted(self.rfps, key=lambda r: (getattr(r, field), r.pk), reverse=desc)
+            self.assertEqual(ids, [r.pk for r in want], ordering)
+            self.assertEqual(pages, 3)
+
+    def test_rows_inserted_before_the_cursor_do_not_shift_the_next_page(self):
+        client = APIClient()
+        first = client.get("/api/rfps/?ordering=netTotal&page_size=3").json()
+        RequestForPayment.objects.create(netTotal=Decimal(5), department=self.dept, **RFP_FIELDS)
+        second = client.get(first["next"]).json()
+        seen = {r["id"] for r in first["results"]}
+        self.assertFalse(seen & {r["id"] for r in second["results"]})
+        self.assertEqual([r["netTotal"] for r in second["results"]], ["30.00", "30.00", "40.00"])
+
+    def test_search_and_filters_run_over_every_row(self):
+        acme = [RequestForPayment.objects.create(netTotal=Decimal(t), department=self.dept,
+                                                 **{**RFP_FIELDS, "payableTo": "Acme Lab Supplies"})
+                for t in (70, 15, 45)]
+        client, ids = APIClient(), []
+        url = "/api/rfps/?q=acme%20suplies&ordering=-netTotal&page_size=2&amount_min=20"
+        while url:
+            body = client.get(url).json()
+            ids += [r["id"] for r in body["results"]]
+            url = body["next"]
+        self.assertEqual(ids, [acme[0].pk, acme[2].pk])
+
+    def test_bad_cursors_are_rejected(self):
+        client = APIClient()
+        other = KeysetPagination.encode_cursor("netTotal", True, "30.00", self.rfps[0].pk)
+        for cursor in ("not-a-cursor", other):
+            r = client.get(f"/api/rfps/?ordering=netTotal&cursor={cursor}")
+            self.assertEqual(r.status_code, 400)
+            self.assertIn("cursor", r.json())
+        self.assertEqual(client.get("/api/rfps/?ordering=amount").status_code, 400)
+
+
+class RfpSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        dept = Department.objects.create(name="CCIS")
+
+        def rfp(**kw):
+            return RequestForPayment.objects.create(netTotal=Decimal(1), department=dept, **{**RFP_FIELDS, **kw})
+
+        cls.exact = rfp(payableTo="Acme Lab Supplies", description="microscopes")
+        cls.partial = rfp(payableTo="Acme Holdings", description="office supplies")
+        cls.other = rfp(payableTo="Northwind Traders", description="catering", po="PO-77123")
+        cls.requester = rfp(requestedBy="Maria Santos", description="travel")
+
+    def _search(self, query):
+        r = APIClient().get(f"/api/rfps/search/{query}")
+        self.assertEqual(r.status_code, 200, r.content)
+        return r.json()
+
+    def test_best_matches_rank_first_and_tolerate_typos(self):
+        body = self._search("?q=acme%20suplies")
+        self.assertEqual([r["id"] for r in body["results"]], [self.exact.pk, self.partial.pk])
+        scores = [r["score"] for r in body["results"]]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertIsNone(body["next"])
+
+    def test_every_search_field_is_indexed(self):
+        for q, rfp in (("PO-77123", self.other), ("maria santos", self.requester), ("microscope", self.exact)):
+            self.assertEqual([r.pk for r in search_rfps(q)], [rfp.pk], q)
+        self.assertEqual(search_rfps("zzzz qqqq"), [])
+
+    def test_pages_and_sparse_fields(self):
+        body = self._search("?q=acme&page_size=1&fields=id,payableTo,score")
+        self.assertEqual(body["results"], [{"id": self.exact.pk, "payableTo": "Acme Lab Supplies",
+                                            "score": body["results"][0]["score"]}])
+        nxt = APIClient().get(body["next"]).json()
+        self.assertEqual([r["id"] for r in nxt["results"]], [self.partial.pk])
+        self.assertIsNone(nxt["next"])
+        for query in ("", "?q=%20", "?q=acme&page=x", "?q=acme&fields=secret"):
+            self.assertEqual(APIClient().get(f"/api/rfps/search/{query}").status_code, 400, query)
+
+    def test_index_follows_writes(self):
+        self.assertEqual(search_rfps("globex"), [])
+        added = RequestForPayment.objects.create(netTotal=Decimal(1), department=self.exact.department,
+                                                 **{**RFP_FIELDS, "payableTo": "Globex Corporation"})
+        self.assertEqual([r.pk for r in search_rfps("globex")], [added.pk])
+        self.partial.delete()
+        self.assertEqual([r.pk for r in search_rfps("acme")], [self.exact.pk])
+        self.assertEqual(list(filter_matches(RequestForPayment.objects.order_by("id"), "acme globex")),
+                         [self.exact, added])
+
+
+class BulkUpsertTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dept = Department.objects.create(name="CCIS")
+
+    def test_conflicts_update_only_supplied_columns(self):
+        upsert_drivers(read_rows("department,month,totalNet,enrolled_FTE_dept\nccis,2024-01-15,100,500\nCCIS,2024-02,200,510\n"))
+        result = upsert_drivers(read_rows([{"Department": "CCIS", "month": "2024-01-01", "totalNet": 150}]))
+
+        self.assertEqual(result, {"rows": 1, "departments": 1})
+        rows = {r.month: r for r in DriversMonthly.objects.filter(department=self.dept)}
+        self.assertEqual(sorted(rows), [date(2024, 1, 1), date(2024, 2, 1)])
+        self.assertEqual(rows[date(2024, 1, 1)].totalNet, Decimal("150.00"))
+        self.assertEqual(rows[date(2024, 1, 1)].enrolled_FTE_dept, 500)   # untouched by the second batch
+        self.assertEqual(rows[date(2024, 1, 1)].month_idx, 109)
+
+    def test_last_duplicate_in_a_batch_wins(self):
+        upsert_drivers(read_rows([
+            {"department": "CCIS", "month": "2024-03", "totalNet": 1},
+            {"department": "CCIS", "month": "2024-03-20", "totalNet": 2},
+        ]))
+        self.assertEqual(DriversMonthly.objects.get(department=self.dept, month=date(2024, 3, 1)).totalNet, 2)
+
+    def test_blank_cells_leave_stored_values_alone(self):
+        upsert_drivers(read_rows([{"department": "CCIS", "month": "2024-01", "totalNet": 100, "isEmergency": True,
+                                   "enrolled_FTE_dept": 500}]))
+        upsert_drivers(read_rows("department,month,totalNet,isEmergency,enrolled_FTE_dept\n"
+                                 "CCIS,2024-01,,,510\n"
+                                 "CCIS,2024-02,7,,\n"))
+        upsert_drivers(read_rows([{"department": "CCIS", "month": "2024-01", "isEmergency": None, "totalNet": None}]))
+        jan = DriversMonthly.objects.get(department=self.dept, month=date(2024, 1, 1))
+        self.assertEqual((jan.totalNet, jan.isEmergency, jan.enrolled_FTE_dept), (Decimal("100.00"), True, 510))
+        feb = DriversMonthly.objects.get(department=self.dept, month=date(2024, 2, 1))
+        self.assertEqual((feb.totalNet, feb.isEmergency, feb.enrolled_FTE_dept), (Decimal("7.00"), False, None))
+
+        upsert_drivers(read_rows("department,month,isEmergency\nCCIS,2024-01,no\n"))
+        self.assertFalse(DriversMonthly.objects.get(department=self.dept, month=date(2024, 1, 1)).isEmergency)
+
+    def test_duplicates_keep_their_last_non_blank_cells(self):
+        upsert_drivers(read_rows([
+            {"department": "CCIS", "month": "2024-03", "totalNet": 1, "isEmergency": True},
+            {"department": "CCIS", "month": "2024-03-20", "totalNet": 2},
+        ]))
+        row = DriversMonthly.objects.get(department=self.dept, month=date(2024, 3, 1))
+        self.assertEqual((row.totalNet, row.isEmergency), (Decimal("2.00"), True))
+
+    def test_blank_macro_cells_leave_stored_series_alone(self):
+        upsert_macro(read_rows("month,fxRate,inflationPct\n2024-01,55.5,3.1\n"))
+        upsert_macro(read_rows("month,fxRate,inflationPct\n2024-01,,3.4\n2024-02,56,\n"))
+        rows = {m.month: (m.fxRate_PHP_USD, m.inflationPct) for m in MacroMonthly.objects.all()}
+        self.assertEqual(rows, {date(2024, 1, 1): (Decimal("55.50"), Decimal("3.40")),
+                                date(2024, 2, 1): (Decimal("56.00"), None)})
+
+    def test_invalid_rows_reject_the_whole_batch(self):
+        with self.assertRaises(IngestError) as ctx:
+            upsert_drivers(read_rows([
+                {"department": "CCIS", "month": "2024-04", "totalNet": 5},
+                {"department": "nope", "month": "2024-05"},
+                {"department": "CCIS", "month": "2024-06", "govFundShare": 1.5},
+                {"department": "CCIS", "month": "2024-07", "isEmergency": "maybe"},
+            ]))
+        self.assertEqual([e["row"] for e in ctx.exception.errors], [1, 2, 3])
+        self.assertFalse(DriversMonthly.objects.exists())
+
+    def test_endpoint_reports_row_errors_as_400(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="loader"))
+        r = client.post("/api/drivers/bulk/", {"rows": [{"department": "CCIS", "month": "2024-01",
+                                                         "programLaunches_dept": -1}]}, format="json")
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.json()["errors"][0]["row"], 0)
+        r = client.post("/api/drivers/bulk/", {"rows": [{"department": "CCIS", "month": "2024-01", "totalNet": 9}]},
+                        format="json")
+        self.assertEqual(r.json(), {"received": 1, "rows": 1, "departments": 1})
+
+
+class MacroIngestTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="loader"))
+
+    def _fx(self, *months):
+        return get_macro_store().lookup(months_index(months))[:, 0].tolist()
+
+    def test_endpoint_upserts_on_month_in_chunks(self):
+        rows = [{"month": f"2024-{m:02d}-15", "fxRate": 55 + m, "inflationPct": 3} for m in range(1, 6)]
+        r = self.client.post("/api/macro/bulk/?chunk_size=2", rows, format="json")
+        self.assertEqual(r.json(), {"received": 5, "rows": 5, "months": "2024-01..2024-05"})
+        self.assertEqual(self._fx(date(2024, 1, 1), date(2024, 5, 1)), [56.0, 60.0])
+
+        data, macro = forecast_cache.data_version(), forecast_cache.version(MACRO_VERSION_KEY)
+        r = self.client.post("/api/macro/bulk/", {"rows": [{"month": "2024-05", "fxRate_PHP_USD": 61.25}]},
+                             format="json")
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertEqual(MacroMonthly.objects.count(), 5)
+        self.assertNotEqual(forecast_cache.data_version(), data)
+        self.assertNotEqual(forecast_cache.version(MACRO_VERSION_KEY), macro)
+        self.assertEqual(self._fx(date(2024, 5, 1)), [61.25])
+        self.assertEqual(MacroMonthly.objects.get(month=date(2024, 5, 1)).inflationPct, Decimal("3.00"))
+
+    def test_import_command_reads_a_csv_file(self):
+        path = Path(tempfile.mkdtemp(prefix="macro-")) / "macro.csv"
+        self.addCleanup(shutil.rmtree, path.parent, True)
+        path.write_text("month,fxRate_PHP_USD,inflationPct,wageIndex\n2024-01,55.1,3.2,101.5\n2024-02,55.4,3.1,101.7\n")
+        out = StringIO()
+        call_command("import_macro", str(path), stdout=out)
+        self.assertIn("Upserted 2 macro month(s) (2024-01..2024-02)", out.getvalue())
+        self.assertEqual(MacroMonthly.objects.get(month=date(2024, 2, 1)).wageIndex, Decimal("101.700"))
+        with self.assertRaises(CommandError):
+            call_command("import_macro", str(path.parent / "missing.csv"), stdout=StringIO())
+
+    def test_one_row_per_month(self):
+        MacroMonthly.objects.create(month=date(2024, 1, 1), fxRate_PHP_USD=55)
+        with self.assertRaises(IntegrityError):
+            MacroMonthly.objects.create(month=date(2024, 1, 20), fxRate_PHP_USD=56)
+
+    def test_serializer_matches_the_model(self):
+        row = MacroMonthly.objects.create(month=date(2024, 1, 1), fxRate_PHP_USD=55)
+        self.assertEqual(set(MacroMonthlySerializer(row).data),
+                         {"id", "month", "fxRate_PHP_USD", "inflationPct", "wageIndex"})
+
+
+class CacheInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dept = Department.objects.create(name="CCIS")
+        cls.other = Department.objects.create(name="CEA")
+
+    def _key(self):
+        return forecast_cache.forecast_key("CCIS", {"fx_delta": 0.0}, date(2026, 1, 1), "v1")
+
+    def test_drivers_writes_change_the_forecast_key(self):
+        key = self._key()
+        forecast_cache.set_forecast(key, {"cached": True})
+        self.assertEqual(forecast_cache.get_forecast(self._key()), {"cached": True})
+
+        row = DriversMonthly.objects.create(department=self.dept, month=date(2024, 1, 1), totalNet=10)
+        key2 = self._key()
+        self.assertNotEqual(key2, key)
+        self.assertIsNone(forecast_cache.get_forecast(key2))
+
+        row.totalNet = 20
+        row.save()
+        key3 = self._key()
+        self.assertNotEqual(key3, key2)
+        row.delete()
+        self.assertNotEqual(self._key(), key3)
+
+    def test_drivers_writes_bump_only_their_department(self):
+        keys = [forecast_cache.department_version_key(d.pk) for d in (self.dept, self.other)]
+        before = forecast_cache.versions(keys)
+        DriversMonthly.objects.create(department=self.dept, month=date(2024, 1, 1), totalNet=10)
+        after = forecast_cache.versions(keys)
+        self.assertNotEqual(after[0], before[0])
+        self.assertEqual(after[1], before[1])
+
+    def test_bulk_ingest_bumps_versions(self):
+        key, dept_v = self._key(), forecast_cache.version(forecast_cache.department_version_key(self.dept.pk))
+        upsert_drivers(read_rows([{"department": "CCIS", "month": "2024-01", "totalNet": 1}]))
+        self.assertNotEqual(self._key(), key)
+        self.assertNotEqual(forecast_cache.version(forecast_cache.department_version_key(self.dept.pk)), dept_v)
+
+    def test_macro_writes_reload_the_macro_store(self):
+        row = MacroMonthly.objects.create(month=date(2024, 1, 1), fxRate_PHP_USD=Decimal("55.00"))
+        store = get_macro_store()
+        self.assertEqual(store.for_months([pd.Timestamp("2024-01-01")])[0, 0], 55.0)
+        key, macro_v = self._key(), forecast_cache.version(MACRO_VERSION_KEY)
+
+        row.fxRate_PHP_USD = Decimal("57.50")
+        row.save()
+        self.assertNotEqual(forecast_cache.version(MACRO_VERSION_KEY), macro_v)
+        self.assertNotEqual(self._key(), key)
+        reloaded = get_macro_store()
+        self.assertIsNot(reloaded, store)
+        self.assertEqual(reloaded.for_months([pd.Timestamp("2024-01-01")])[0, 0], 57.5)
+        self.assertIs(get_macro_store(), reloaded)   # unchanged version: no reload
+
+    def test_bump_is_seen_without_the_cache(self):
+        # stamps live in the database: clearing (or not sharing) the cache can't hide a bump
+        v = forecast_cache.data_version()
+        forecast_cache.bump_data_version()
+        forecast_cache.get_cache().clear()
+        self.assertEqual(forecast_cache.data_version(), v + 1)
+
+
+class ForecastResultListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dept = Department.objects.create(name="CCIS")
+        cls.scenario = Scenario.objects.create(scenarioCode="LOWFX", scenarioName="Low FX")
+
+        def run(p50, **kw):
+            rows = [{"date": f"2026-{m:02d}", "p10": p50 - 1, "p50": p50, "p90": p50 + 1} for m in (1, 2)]
+            return save_forecast_run({"CCIS": rows}, horizon=2, version="t", **kw)
+
+        cls.baseline = run(100, assumptions={}, source=PRECOMPUTE)
+        cls.scenario_run = run(200, scenario=cls.scenario, assumptions={"fxRate_delta": -1}, source=PRECOMPUTE)
+        cls.request_run = run(300, assumptions={"fxRate_delta": 2})   # persisted slider request
+
+    def _get(self, query=""):
+        return APIClient().get(f"/api/forecast/results/{query}")
+
+    def _p50s(self, query=""):
+        r = self._get(query)
+        self.assertEqual(r.status_code, 200, r.content)
+        return {(row["run"], row["p50"]) for row in r.json()}
+
+    def test_default_is_the_latest_baseline(self):
+        self.assertEqual(self._p50s(), {(self.baseline.pk, "100.00")})
+
+    def test_request_runs_do_not_shadow_the_baseline(self):
+        self.assertEqual(self._p50s("?source=request"), {(self.request_run.pk, "300.00")})
+        self.assertEqual(self.request_run.source, REQUEST)
+
+    def test_scenario_by_code(self):
+        self.assertEqual(self._p50s("?scenario=LOWFX"), {(self.scenario_run.pk, "200.00")})
+
+    def test_scenario_run_by_id(self):
+        self.assertEqual(self._p50s(f"?run={self.scenario_run.pk}"), {(self.scenario_run.pk, "200.00")})
+        self.assertEqual(self._p50s(f"?run={self.request_run.pk}&start=2026-02"), {(self.request_run.pk, "300.00")})
+        self.assertEqual(len(self._get(f"?run={self.scenario_run.pk}&start=2026-02").json()), 1)
+
+    def test_bad_params_are_400(self):
+        for query, field in (("?run=x", "run"), ("?start=2026-13", "start"), ("?source=other", "source")):
+            r = self._get(query)
+            self.assertEqual(r.status_code, 400, query)
+            self.assertIn(field, r.json())
+
+
+@override_settings(FORECAST_TOTALNET_FROM_RFPS=True)
+class RfpTotalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dept = Department.objects.create(name="CCIS")
+        cls.other = Department.objects.create(name="CEA")
+        cls.this_month = date.today().replace(day=1)
+        cls.last_month = (cls.this_month - pd.DateOffset(months=1)).date()
+
+    def _rfp(self, total, dept=None):
+        return RequestForPayment.objects.create(netTotal=Decimal(total), department=dept or self.dept, **RFP_FIELDS)
+
+    def _total(self, month, dept=None):
+        return (DriversMonthly.objects.filter(department=dept or self.dept, month=month)
+                .values_list("totalNet", flat=True).first())
+
+    def _next_month(self):
+        # the clock moves on: today's month is closed, the next one is open
+        return mock.patch.object(rfp_totals, "open_month",
+                                 return_value=(self.this_month + pd.DateOffset(months=1)).date())
+
+    def test_writes_into_a_closed_month_update_its_bucket(self):
+        DriversMonthly.objects.create(department=self.dept, month=self.last_month - pd.DateOffset(months=1),
+                                      totalNet=1, enrolled_FTE_dept=480, programLaunches_dept=2)
+        rfp = self._rfp(100)
+        rfp.dateRequested = self.last_month.replace(day=15)
+        rfp.save()
+        self.assertEqual(self._total(self.last_month), Decimal("100.00"))
+        row = DriversMonthly.objects.get(department=self.dept, month=self.last_month)
+        self.assertEqual((row.enrolled_FTE_dept, row.programLaunches_dept), (480, 2))   # carried forward
+
+        rfp.netTotal = Decimal(70)
+        rfp.save()
+        self.assertEqual(self._total(self.last_month), Decimal("70.00"))
+        rfp.delete()
+        self.assertEqual(self._total(self.last_month), Decimal("0.00"))
+
+    def test_open_month_is_stored_by_the_first_write_after_it_ends(self):
+        self._rfp(100)
+        self._rfp(25)
+        self.assertIsNone(self._total(self.this_month))   # still open: no partial lag1
+
+        data_v = forecast_cache.data_version()
+        with self._next_month():
+            self._rfp(40, dept=self.other)
+        self.assertEqual(self._total(self.this_month), Decimal("125.00"))
+        self.assertEqual(self._total(self.this_month, self.other), Decimal("40.00"))
+        self.assertGreater(forecast_cache.data_version(), data_v)
+        with self._next_month():
+            self.assertEqual(rfp_totals.close_months(), 0)   # closed once
+
+    def test_months_missed_without_writes_are_closed_together(self):
+        with mock.patch.object(rfp_totals, "open_month", return_value=self.last_month):
+            rfp = self._rfp(60)   # closes through the month before last
+        RequestForPayment.objects.filter(pk=rfp.pk).update(dateRequested=self.last_month)
+        with self._next_month():
+            self._rfp(5)
+        self.assertEqual(self._total(self.last_month), Decimal("60.00"))
+        self.assertEqual(self._total(self.this_month), Decimal("5.00"))
+
+    @override_settings(FORECAST_TOTALNET_FROM_RFPS=False)
+    def test_off_by_setting(self):
+        with self._next_month():
+            self._rfp(100)
+        self.assertFalse(DriversMonthly.objects.exists())
+
+
+class BatchForecastTests(ForecastApiTestCase):
+    body = {"assumptions": {"fxRate_delta": 1.5, "dept_pct": 5}, "drivers": {"enrolled_FTE_delta": 20}}
+
+    def test_batch_matches_single_department_forecasts(self):
+        r = self.post("/api/forecast/batch/", {**self.body, "departments": ["ccis", "CEA"]})
+        self.assertEqual(r.status_code, 200, r.content)
+        batch = {d["Department"]: d["Forecast"] for d in r.json()["Departments"]}
+        self.assertEqual(sorted(batch), ["CCIS", "CEA"])
+        for dept, rows in batch.items():
+            single = self.post("/api/forecast/next-year/", {**self.body, "Department": dept, "exact": True})
+            self.assertEqual(single.status_code, 200, single.content)
+            got = [[m["p10"], m["p50"], m["p90"]] for m in rows]
+            want = [[m["p10"], m["p50"], m["p90"]] for m in single.json()["Forecast"]]
+            np.testing.assert_allclose(got, want, rtol=1e-12)
+            self.assertEqual([m["date"] for m in rows], [m["date"] for m in single.json()["Forecast"]])
+
+    def test_history_of_every_department_is_one_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.post("/api/forecast/batch/", {"departments": "all"})
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertEqual(len([q for q in ctx.captured_queries if "api_driversmonthly" in q["sql"]]), 1)
+        self.assertEqual(r.json()["skipped"], ["NOHIST"])
+        self.assertEqual(len(r.json()["Departments"]), 2)
+
+    def test_unknown_departments_are_400(self):
+        r = self.post("/api/forecast/batch/", {"departments": ["CCIS", "nope"]})
+        self.assertEqual(r.status_code, 400)
+        self.assertIn("nope", r.json()["detail"])
+        self.assertEqual(self.post("/api/forecast/batch/", {"departments": []}).status_code, 400)
+
+    def test_non_numeric_sliders_are_400_naming_the_field(self):
+        cases = [
+            ("/api/forecast/batch/", {"assumptions": {"fxRate_delta": "abc"}}, "fxRate_delta"),
+            ("/api/forecast/batch/", {"drivers": {"programLaunches_delta": [1]}}, "programLaunches_delta"),
+            ("/api/forecast/batch/", {"assumptions": [1, 2]}, "assumptions"),
+            ("/api/forecast/next-year/", {"Department": "CCIS", "assumptions": {"dept_pct": "NaN"}}, "dept_pct"),
+            ("/api/forecast/simulate/", {"paths": 10, "drivers": {"enrolled_FTE_delta": "x"}}, "enrolled_FTE_delta"),
+            ("/api/forecast/sensitivity/", {"Department": "CCIS", "grid": {"wageIndex_delta": [1, "y"]}},
+             "wageIndex_delta"),
+        ]
+        for url, body, field in cases:
+            r = self.post(url, body)
+            self.assertEqual(r.status_code, 400, (url, body))
+            self.assertIn(field, r.json(), (url, body))
+
+
+class FeatureStoreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dept = Department.objects.create(name="CCIS")
+        panel = _panel(("CCIS",), months=30, start="2022-01-01")
+        DriversMonthly.objects.bulk_create([
+            DriversMonthly(department=cls.dept, month=r["Date"].date(), totalNet=round(r[TARGET], 2))
+            for r in panel.to_dict("records")
+        ])
+        feature_store.rebuild()
+
+    def _stored(self):
+        return list(DriversFeatures.objects.filter(department=self.dept).order_by("month_idx")
+                    .values_list("month", *feature_store.FEATURE_FIELDS))
+
+    def assertMatchesRebuild(self):
+        incremental = self._stored()
+        feature_store.rebuild()
+        rebuilt = self._stored()
+        self.assertEqual([r[0] for r in incremental], [r[0] for r in rebuilt])
+        # pandas' running window sums depend on where the slice starts: equal up to rounding
+        np.testing.assert_allclose(np.array([r[1:] for r in incremental], dtype=float),
+                                   np.array([r[1:] for r in rebuilt], dtype=float), rtol=1e-8)
+
+    def test_stored_features_match_the_panel_pipeline(self):
+        frame = feature_store.feature_panel()
+        want = panel_features(frame[[KEY, "Date", TARGET]])
+        self.assertEqual(len(frame), 30)
+        for c in feature_store.FEATURE_FIELDS:
+            np.testing.assert_allclose(frame[c].astype(float), want[c].astype(float), err_msg=c)
+
+    def test_an_edit_rewrites_only_the_next_twelve_months(self):
+        row = DriversMonthly.objects.get(department=self.dept, month=date(2022, 6, 1))
+        row.totalNet = Decimal("99999.00")
+        with mock.patch.object(feature_store, "_upsert", wraps=feature_store._upsert) as upsert:
+            row.save()
+        self.assertEqual([o.month for o in upsert.call_args.args[0]],
+                         [date(2022 + (5 + i) // 12, (5 + i) % 12 + 1, 1) for i in range(13)])
+        self.assertEqual(DriversFeatures.objects.get(department=self.dept, month=date(2022, 7, 1)).lag1, 99999.0)
+        self.assertMatchesRebuild()
+
+    def test_an_earlier_month_moves_the_trend_origin(self):
+        DriversMonthly.objects.create(department=self.dept, month=date(2021, 12, 1), totalNet=Decimal("900.00"))
+        self.assertEqual(DriversFeatures.objects.get(department=self.dept, month=date(2022, 1, 1)).t, 13)
+        self.assertMatchesRebuild()
+
+    def test_deleting_and_moving_rows(self):
+        DriversMonthly.objects.get(department=self.dept, month=date(2023, 3, 1)).delete()
+        self.assertFalse(DriversFeatures.objects.filter(department=self.dept, month=date(2023, 3, 1)).exists())
+        self.assertMatchesRebuild()
+
+        row = DriversMonthly.objects.get(department=self.dept, month=date(2023, 8, 1))
+        row.month = date(2023, 3, 1)
+        row.save()
+        self.assertFalse(DriversFeatures.objects.filter(department=self.dept, month=date(2023, 8, 1)).exists())
+        self.assertMatchesRebuild()
+
+
+class HistoryFetchTests(ForecastApiTestCase):
+    def test_history_is_one_query_of_float_columns(self):
+        dept = Department.objects.get(name="CEA")
+        get_macro_store()   # warm
+        with CaptureQueriesContext(connection) as ctx:
+            ids, values = fetch_history("capexBudget", department=dept)
+        self.assertEqual(len([q for q in ctx.captured_queries if "api_driversmonthly" in q["sql"]]), 1)
+        self.assertFalse([q for q in ctx.captured_queries if "api_macromonthly" in q["sql"]])
+        self.assertEqual(values.dtype, np.float64)
+
+        rows = list(DriversMonthly.objects.filter(department=dept).order_by("month"))
+        macro = {m.month: m for m in MacroMonthly.objects.all()}
+        cols = dict(zip([*HISTORY_COLS, "capexBudget"], values.T))
+        self.assertEqual(set(ids), {dept.pk})
+        self.assertEqual(cols["year"].tolist(), [r.month.year for r in rows])
+        self.assertEqual(cols["month"].tolist(), [r.month.month for r in rows])
+        self.assertEqual(cols[TARGET].tolist(), [float(r.totalNet) for r in rows])
+        self.assertEqual(cols["fxRate"].tolist(), [float(macro[r.month].fxRate_PHP_USD) for r in rows])
+        self.assertEqual(cols["enrolled_FTE_dept"].tolist(), [r.enrolled_FTE_dept for r in rows])
+        self.assertTrue(np.isnan(cols["capexBudget"]).all())   # NULL -> NaN
+
+    def test_batch_state_holds_each_department_tail_and_latest_drivers(self):
+        depts = {d.pk: d.name for d in Department.objects.all()}
+        state, drivers_base = load_batch_state(depts)
+        self.assertEqual(state.keys, ["CCIS", "CEA"])   # NOHIST has no rows
+        for i, name in enumerate(state.keys):
+            rows = list(DriversMonthly.objects.filter(department__name=name).order_by("month"))
+            self.assertEqual(state.window(12)[i].tolist(), [float(r.totalNet) for r in rows[-12:]])
+            self.assertEqual(state.first_year[i], rows[0].month.year)
+            self.assertEqual(drivers_base[i].tolist(), [rows[-1].enrolled_FTE_dept, rows[-1].programLaunches_dept])
+        nohist = Department.objects.get(name="NOHIST")
+        self.assertEqual(load_batch_state({nohist.pk: nohist.name}), (None, None))
+
+
+class SimulateTests(ForecastApiTestCase):
+    def _state(self):
+        return load_batch_state({d.pk: d.name for d in Department.objects.all()})
+
+    def test_draws_follow_the_interpolated_quantiles(self):
+        p = np.array([[80.0, 100.0, 140.0]] * 5)
+        u = np.array([0.1, 0.5, 0.9, 0.0, 0.7])
+        np.testing.assert_allclose(simulate.sample_quantiles(p, u), [80.0, 100.0, 140.0, 75.0, 120.0])
+
+    def test_first_month_draws_match_the_forecast_quantiles(self):
+        bundle, targets = get_bundle(), horizon_targets(12)
+        state, drivers_base = self._state()
+        macro = horizon_macro(targets)
+        paths = simulate.simulate_paths(state, targets, bundle.models, bundle.schema, macro, 4000, seed=1,
+                                        drivers_base=drivers_base, elas=bundle.elas)
+        self.assertEqual(paths.shape, (2, 4000, 12))
+        want, _ = run_rollout(state, targets, bundle.models, bundle.schema, macro,
+                              drivers_base=drivers_base, elas=bundle.elas)
+        got = np.quantile(paths[:, :, 0], ALPHAS, axis=1).T
+        spread = (want[:, 0, 2] - want[:, 0, 0])[:, None]
+        self.assertTrue((np.abs(got - want[:, 0]) < 0.05 * spread).all(), (got, want[:, 0]))
+
+    def test_seeded_requests_are_reproducible_and_totals_add_up(self):
+        body = {"departments": "all", "paths": 300, "seed": 7, "assumptions": {"fxRate_delta": 1}}
+        first, second = self.post("/api/forecast/simulate/", body), self.post("/api/forecast/simulate/", body)
+        self.assertEqual(first.status_code, 200, first.content)
+        self.assertEqual(first.json(), second.json())
+        out = first.json()
+        self.assertEqual((out["paths"], out["requested_paths"], out["skipped"]), (300, 300, ["NOHIST"]))
+        annual = out["Total"]["Annual"]
+        self.assertLess(annual["p10"], annual["p50"])
+        self.assertLess(annual["p50"], annual["p90"])
+        self.assertAlmostEqual(annual["mean"], sum(d["Annual"]["mean"] for d in out["Departments"]), places=4)
+        self.assertAlmostEqual(out["Total"]["Cumulative"][-1]["mean"], annual["mean"], places=4)
+
+    def test_path_counts_are_bounded(self):
+        for paths in (0, 10 ** 9, "many"):
+            self.assertEqual(self.post("/api/forecast/simulate/", {"paths": paths}).status_code, 400, paths)
+        with override_settings(FORECAST_SIM_MAX_PATH_ROWS=100):
+            r = self.post("/api/forecast/simulate/", {"paths": 60})
+        self.assertEqual(r.status_code, 400)
+        self.assertIn("at most 50 paths", r.json()["detail"])
+
+    def test_time_budget_stops_after_the_first_chunk(self):
+        bundle, targets = get_bundle(), horizon_targets(12)
+        state, drivers_base = self._state()
+        paths = simulate.simulate_paths(state, targets, bundle.models, bundle.schema, horizon_macro(targets), 100,
+                                        seed=1, drivers_base=drivers_base, chunk_rows=40, budget=0.0)
+        self.assertEqual(paths.shape, (2, 20, 12))
+
+
+class SensitivityTests(ForecastApiTestCase):
+    grid = {"fxRate_delta": [-2, 0, 2], "dept_pct": [0, 10], "enrolled_FTE_delta": [0, 50]}
+
+    def _single(self, sliders):
+        body = {"Department": "CCIS", "exact": True, "assumptions": {}, "drivers": {}}
+        for name, value in sliders.items():
+            body[SLIDERS[name][0]][name] = value
+        r = self.post("/api/forecast/next-year/", body)
+        self.assertEqual(r.status_code, 200, r.content)
+        return np.array([[m["p10"], m["p50"], m["p90"]] for m in r.json()["Forecast"]])
+
+    def test_sweep_matches_single_forecasts_in_one_predict_per_month(self):
+        with mock.patch.object(rollout, "predict_quantiles", wraps=rollout.predict_quantiles) as predict:
+            r = self.post("/api/forecast/sensitivity/", {"Department": "CCIS", "grid": self.grid,
+                                                          "base": {"wageIndex_delta": 1}})
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertEqual(predict.call_count, 12)
+        out = r.json()
+        self.assertEqual(len(out["scenarios"]), 12)
+
+        base = self._single({"wageIndex_delta": 1})
+        got = [[m["p10"], m["p50"], m["p90"]] for m in out["baseline"]["Forecast"]]
+        np.testing.assert_allclose(got, base, rtol=1e-12)
+        for row in out["scenarios"][::5]:
+            single = self._single(row["sliders"])
+            np.testing.assert_allclose([row["p10_sum"], row["p50_sum"], row["p90_sum"]], single.sum(axis=0),
+                                       rtol=1e-12)
+            self.assertAlmostEqual(row["change_pct"], 100.0 * (single[:, 1].sum() / base[:, 1].sum() - 1.0))
+
+    def test_tornado_has_every_slider_sorted_by_swing(self):
+        out = self.post("/api/forecast/sensitivity/", {"Department": "CCIS", "grid": self.grid}).json()
+        tornado = {row["slider"]: row for row in out["tornado"]}
+        self.assertEqual(set(tornado), set(SLIDERS))
+        swings = [row["swing"] for row in out["tornado"]]
+        self.assertEqual(swings, sorted(swings, reverse=True))
+        self.assertEqual((tornado["fxRate_delta"]["low"], tornado["fxRate_delta"]["high"]), (-2.0, 2.0))
+        self.assertEqual((tornado["inflationPct_delta"]["low"], tornado["inflationPct_delta"]["high"]), (-3.0, 3.0))
+        self.assertGreater(tornado["dept_pct"]["change_high_pct"], 0)
+        self.assertEqual(tornado["dept_pct"]["change_low_pct"], 0)   # low end of the grid is the baseline
+
+    def test_bad_sweeps_are_400(self):
+        too_big = {"fxRate_delta": list(range(MAX_SCENARIOS)), "dept_pct": [0, 1]}
+        for body in ({"grid": self.grid}, {"Department": "CCIS", "grid": too_big},
+                     {"Department": "CCIS", "grid": {"fxRate": [1]}}, {"Department": "nope", "grid": self.grid},
+                     {"Department": "NOHIST", "grid": self.grid}):
+            self.assertEqual(self.post("/api/forecast/sensitivity/", body).status_code, 400, body)
+
+
+class ResponseSurfaceTests(ForecastApiTestCase):
+    axes = {name: np.array([lo, hi]) for name, (_, (lo, hi)) in SLIDERS.items()}
+
+    def setUp(self):
+        patcher = mock.patch.object(response_surface, "AXES", self.axes)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(response_surface._surfaces.clear)
+        self.bundle, self.dept = get_bundle(), Department.objects.get(name="CCIS")
+        self.start = horizon_targets(1)[0]
+
+    def _exact(self, points):
+        state, drivers_base = load_batch_state({self.dept.pk: "CCIS"})
+        targets = horizon_targets(12)
+        q, _ = run_forecast(self.bundle, "recursive", state.repeat(len(points)), targets, horizon_macro(targets),
+                            drivers_base=np.repeat(drivers_base, len(points), axis=0), **scenario_arrays(points))
+        return q
+
+    def _surface(self):
+        stamp = response_surface.current_stamp(self.bundle, self.dept.pk, self.start)
+        return response_surface.build_and_store(self.bundle, "CCIS", stamp)
+
+    def test_knots_are_exact_and_points_between_them_interpolate(self):
+        surface = self._surface()
+        lo = {name: float(v[0]) for name, v in self.axes.items()}
+        hi = {**lo, "fxRate_delta": 5.0}
+        want = self._exact([lo, hi])
+        np.testing.assert_allclose(surface.interpolate(lo), want[0], rtol=1e-12)
+        np.testing.assert_allclose(surface.interpolate({**lo, "fxRate_delta": 2.5}), 0.25 * want[0] + 0.75 * want[1],
+                                   rtol=1e-12)
+        self.assertIsNone(surface.interpolate({**lo, "dept_pct": 80.0}))
+
+    def test_lookups_are_opt_in(self):
+        self._surface()
+        point = {name: 0.0 for name in SLIDERS}
+        self.assertIsNone(response_surface.lookup(self.bundle, "CCIS", self.dept.pk, point, self.start))
+        with override_settings(FORECAST_SURFACE_ENABLED=True):
+            self.assertIsNotNone(response_surface.lookup(self.bundle, "CCIS", self.dept.pk, point, self.start))
+
+    @override_settings(FORECAST_SURFACE_ENABLED=True)
+    def test_missing_or_stale_surfaces_queue_a_rebuild(self):
+        point = {name: 0.0 for name in SLIDERS}
+        with mock.patch.object(response_surface, "schedule") as schedule:
+            self.assertIsNone(response_surface.lookup(self.bundle, "CCIS", self.dept.pk, point, self.start))
+            self.assertEqual(schedule.call_count, 1)
+            self._surface()
+            other = Department.objects.get(name="CEA")
+            DriversMonthly.objects.create(department=other, month=date(2016, 1, 1), totalNet=1)
+            self.assertIsNotNone(response_surface.lookup(self.bundle, "CCIS", self.dept.pk, point, self.start))
+            DriversMonthly.objects.create(department=self.dept, month=date(2016, 1, 1), totalNet=1)
+            self.assertIsNone(response_surface.lookup(self.bundle, "CCIS", self.dept.pk, point, self.start))
+            self.assertEqual(schedule.call_count, 2)
+
+    @override_settings(FORECAST_SURFACE_ENABLED=True)
+    def test_slider_requests_are_answered_from_the_surface_unless_exact(self):
+        surface = self._surface()
+        body = {"Department": "CCIS", "assumptions": {"fxRate_delta": 1.25, "dept_pct": 10}}
+        r = self.post("/api/forecast/next-year/", body).json()
+        self.assertTrue(r["approximate"])
+        point = {**{name: 0.0 for name in SLIDERS}, "fxRate_delta": 1.25, "dept_pct": 10.0}
+        got = [[m["p10"], m["p50"], m["p90"]] for m in r["Forecast"]]
+        np.testing.assert_allclose(got, surface.interpolate(point), rtol=1e-12)
+
+        r = self.post("/api/forecast/next-year/", {**body, "exact": True}).json()
+        self.assertFalse(r["approximate"])
+        got = [[m["p10"], m["p50"], m["p90"]] for m in r["Forecast"]]
+        np.testing.assert_allclose(got, self._exact([point])[0], rtol=1e-12)
+
+
+class PrecomputeForecastsTests(ForecastApiTestCase):
+    assumptions = {"fxRate_delta": 1.5, "dept_pct": 5, "enrolled_FTE_delta": 20}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.scenario = Scenario.objects.create(scenarioCode="HIFX", scenarioName="High FX", assumptions=cls.assumptions)
+        Scenario.objects.create(scenarioCode="OFF", scenarioName="Inactive", isActive=False)
+
+    def _stored(self, run):
+        out = {}
+        for r in run.results.select_related("department").order_by("month"):
+            out.setdefault(r.department.name, []).append([float(r.p10), float(r.p50), float(r.p90)])
+        return out
+
+    def _served(self, body):
+        r = self.post("/api/forecast/batch/", {**body, "departments": "all"})
+        self.assertEqual(r.status_code, 200, r.content)
+        return {d["Department"]: [[m["p10"], m["p50"], m["p90"]] for m in d["Forecast"]] for d in r.json()["Departments"]}
+
+    def test_baseline_and_active_scenarios_match_the_batch_endpoint(self):
+        call_command("precompute_forecasts", stdout=StringIO())
+        runs = list(ForecastRun.objects.order_by("pk"))
+        self.assertEqual([run.scenario for run in runs], [None, self.scenario])
+        self.assertEqual({run.source for run in runs}, {PRECOMPUTE})
+        self.assertTrue(runs[0].model_version.endswith(get_bundle().version))
+
+        sections = {"assumptions": self.assumptions, "drivers": self.assumptions}
+        for run, body in zip(runs, ({}, sections)):
+            stored, served = self._stored(run), self._served(body)
+            self.assertEqual(sorted(stored), ["CCIS", "CEA"])
+            for dept, rows in stored.items():
+                self.assertEqual(len(rows), 12)
+                np.testing.assert_allclose(rows, served[dept], atol=0.006)
+
+    def test_scenario_filter_and_skip_baseline(self):
+        call_command("precompute_forecasts", "--skip-baseline", "--scenario", "HIFX", stdout=StringIO())
+        self.assertEqual(list(ForecastRun.objects.values_list("scenario__scenarioCode", flat=True)), ["HIFX"])
+
+    def test_bad_scenario_assumptions_are_a_command_error(self):
+        Scenario.objects.filter(pk=self.scenario.pk).update(assumptions={"fxRate_delta": "high"})
+        with self.assertRaisesMessage(CommandError, "HIFX"):
+            call_command("precompute_forecasts", "--scenario", "HIFX", stdout=StringIO())
+        self.assertFalse(ForecastRun.objects.exists())
+
+
+class LookupsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Department.objects.create(name="CCIS", costCenter="100")
+        SourceOfFund.objects.create(name="General Fund")
+
+    def test_payload_and_304(self):
+        client = APIClient()
+        r = client.get("/api/lookups/")
+        self.assertEqual(r.status_code, 200)
+        body = json.loads(r.content)
+        self.assertEqual(sorted(body), sorted(["departments", "sourceOfFunds", "transactionTypes", "typesOfBusiness",
+                                               "modesOfPayment", "taxRegistrations"]))
+        self.assertEqual([d["name"] for d in body["departments"]], ["CCIS"])
+        etag = r["ETag"]
+
+        with self.assertNumQueries(1):   # the version stamp only
+            r = client.get("/api/lookups/", HTTP_IF_NONE_MATCH=f'"other", {etag}')
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(r["ETag"], etag)
+
+    def test_dimension_writes_change_the_etag(self):
+        client = APIClient()
+        etag = client.get("/api/lookups/")["ETag"]
+        ModeOfPayment.objects.create(name="Check")
+        r = client.get("/api/lookups/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r["ETag"], etag)
+        self.assertEqual([m["name"] for m in json.loads(r.content)["modesOfPayment"]], ["Check"])
+
+
+class SpendAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ccis = Department.objects.create(name="CCIS")
+        cls.cea = Department.objects.create(name="CEA")
+        cls.supplies = TransactionType.objects.create(name="Supplies")
+
+    def _rfp(self, total, dept, currency="PHP", **kw):
+        return RequestForPayment.objects.create(netTotal=Decimal(total), department=dept,
+                                                **{**RFP_FIELDS, "currency": currency, **kw})
+
+    def _rollup(self):
+        return sorted(SpendRollup.objects.values_list("month", "department_id", "transactionType_id", "currency",
+                                                      "netTotal", "count"))
+
+    def _spend(self, query="", etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return APIClient().get(f"/api/analytics/spend/{query}", **headers)
+
+    def test_rollup_follows_rfp_writes(self):
+        a = self._rfp(100, self.ccis, transactionType=self.supplies)
+        b = self._rfp(50, self.ccis)
+        self._rfp(30, self.cea, currency="USD")
+        b.department, b.currency = self.cea, "USD"   # moves to the other bucket
+        b.save()
+        a.netTotal = Decimal(120)
+        a.save()
+        self._rfp(5, None).delete()
+
+        incremental = self._rollup()
+        spend_rollup.rebuild()
+        self.assertEqual(incremental, self._rollup())
+        month = date.today().replace(day=1)
+        self.assertEqual(incremental, [
+            (month, self.ccis.pk, self.supplies.pk, "PHP", Decimal("120.00"), 1),
+            (month, self.cea.pk, 0, "USD", Decimal("80.00"), 2),
+        ])
+
+    def test_grouped_spend(self):
+        self._rfp(100, self.ccis)
+        self._rfp(40, self.ccis, currency="USD")
+        self._rfp(10, self.cea)
+        r = self._spend("?group_by=department&period=none")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([(x["department"], x["netTotal"], x["count"]) for x in r.json()["rows"]],
+                         [("CCIS", 140.0, 2), ("CEA", 10.0, 1)])
+        r = self._spend("?group_by=currency&period=year&currency=usd")
+        self.assertEqual([(x["period"][:4], x["currency"], x["netTotal"]) for x in r.json()["rows"]],
+                         [(str(date.today().year), "USD", 40.0)])
+
+    def test_if_none_match_compares_whole_tags(self):
+        self._rfp(100, self.ccis)
+        etag = self._spend()["ETag"]
+        for header in (etag, f'"other", {etag}', f"W/{etag}", "*"):
+            self.assertEqual(self._spend(etag=header).status_code, 304, header)
+        for header in (f'"x{etag[1:]}', f'{etag[:-1]}x"', f'"a{etag}b"', '"other"'):
+            self.assertEqual(self._spend(etag=header).status_code, 200, header)
+
+        self._rfp(1, self.cea)   # new rollup version: the old tag no longer matches
+        r = self._spend(etag=etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r["ETag"], etag)
+
+    def test_bad_params_are_400(self):
+        for query in ("?group_by=payee", "?period=week", "?start=2024-13"):
+            self.assertEqual(self._spend(query).status_code, 400, query)
+
+
+class DirectModeTests(TestCase):
+    """The direct models score every horizon from the last observed month, in one predict call."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.panel = _panel(months=30)
+        cls.models = train_direct(cls.panel, num_boost_round=10, params={"min_data_in_leaf": 5})
+        cls.schema = FeatureSchema.for_models(DIRECT_COLS, cls.models)
+        last = cls.panel["Date"].max()
+        cls.targets = [last + pd.DateOffset(months=h) for h in range(1, 13)]
+        cls.macro = np.column_stack([np.linspace(56, 58, 12), np.full(12, 3.2), np.linspace(107, 109, 12)])
+        cls.drivers = np.array([[520.0, 1.0], [530.0, 2.0]])
+
+    def test_training_rows_take_features_from_the_origin(self):
+        df = training_frame(self.panel, horizons=3)
+        self.assertEqual(list(df.columns), [*DIRECT_COLS, TARGET])
+        self.assertEqual(sorted(df["horizon"].unique()), [1, 2, 3])
+        y = self.panel[self.panel[KEY] == "CEA"].sort_values("Date")[TARGET].to_numpy()
+        rows = df[(df[KEY] == "CEA") & (df["horizon"] == 3)]
+        np.testing.assert_allclose(rows["lag1"], y[:-3])          # origin = 3 months before the target
+        np.testing.assert_allclose(rows[TARGET], y[3:])
+        np.testing.assert_allclose(rows["enrolled_FTE_dept"], 510.0)
+
+    def test_training_is_reproducible(self):
+        again = train_direct(self.panel, num_boost_round=10, params={"min_data_in_leaf": 5})
+        for alpha in ALPHAS:
+            self.assertEqual(again[alpha].model_to_string(), self.models[alpha].model_to_string())
+
+    def test_forecast_matches_rows_built_from_the_panel(self):
+        state = RolloutState.from_panel(self.panel.sort_values([KEY, "Date"]))
+        with mock.patch.object(direct, "predict_quantiles", wraps=direct.predict_quantiles) as predict:
+            got, _ = direct_forecast(state, self.targets, self.models, self.schema, self.macro,
+                                     drivers_base=self.drivers)
+        self.assertEqual(predict.call_count, 1)
+        self.assertEqual(got.shape, (2, 12, 3))
+
+        future = pd.DataFrame([{KEY: k, "Date": t, TARGET: np.nan} for k in state.keys for t in self.targets])
+        ext = pd.concat([self.panel[[KEY, "Date", TARGET]], future], ignore_index=True)
+        for h, tgt in enumerate(self.targets, start=1):
+            rows = horizon_features(ext, h)
+            rows = rows[rows["Date"] == tgt].set_index(KEY).loc[state.keys].reset_index()
+            rows["horizon"] = h
+            rows[MACRO_COLS] = self.macro[h - 1]
+            rows[["enrolled_FTE_dept", "programLaunches_dept"]] = self.drivers
+            want = np.sort(predict_quantiles(self.models, self.schema.align(rows)), axis=1)
+            np.testing.assert_allclose(got[:, h - 1], want, rtol=1e-12, err_msg=f"horizon {h}")
+
+
+class DirectPathReuseTests(ForecastApiTestCase):
+    def _forecast(self, mode, dept_pct, **extra):
+        body = {"Department": "CCIS", "mode": mode, "assumptions": {"fxRate_delta": 1, "dept_pct": dept_pct}, **extra}
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.post("/api/forecast/next-year/", body)
+        self.assertEqual(r.status_code, 200, r.content)
+        history_reads = len([q for q in ctx.captured_queries if "api_driversmonthly" in q["sql"]])
+        return np.array([[m["p10"], m["p50"], m["p90"]] for m in r.json()["Forecast"]]), history_reads
+
+    def _direct_forecast(self, dept_pct):
+        bundle, targets = get_bundle(), horizon_targets(12)
+        state, drivers_base = load_batch_state({Department.objects.get(name="CCIS").pk: "CCIS"})
+        q, _ = direct_forecast(state, targets, bundle.direct_models, bundle.direct_schema, horizon_macro(targets),
+                               exog_delta=[1.0, 0.0, 0.0], drivers_base=drivers_base, dept_pct=dept_pct,
+                               elas=bundle.elas)
+        return q[0]
+
+    def test_dept_pct_only_change_reuses_the_direct_model_path(self):
+        _, reads = self._forecast("direct", 0)
+        self.assertEqual(reads, 1)
+        got, reads = self._forecast("direct", 12.5)
+        self.assertEqual(reads, 0)   # cached path: no history query, no predict
+        np.testing.assert_array_equal(got, self._direct_forecast(0.125))
+
+    def test_finish_matches_a_full_direct_forecast(self):
+        bundle, targets = get_bundle(), horizon_targets(12)
+        state, drivers_base = load_batch_state({d.pk: d.name for d in Department.objects.all()})
+        path = direct_path(state, targets, bundle.direct_models, bundle.direct_schema, horizon_macro(targets),
+                           exog_delta=[0.5, -1.0, 2.0], drivers_base=drivers_base, elas=bundle.elas)
+        for dept_pct in (0.0, -0.2, [0.1, 0.3]):
+            want, _ = run_forecast(bundle, "direct", state, targets, horizon_macro(targets),
+                                   exog_delta=[0.5, -1.0, 2.0], drivers_base=drivers_base, dept_pct=dept_pct)
+            np.testing.assert_array_equal(path.finish(dept_pct)[0], want)
+
+    def test_recursive_mode_reruns_the_rollout(self):
+        base, _ = self._forecast("recursive", 0, exact=True)
+        uplifted, reads = self._forecast("recursive", 10, exact=True)
+        self.assertEqual(reads, 1)
+        # the first month is a pure scale; later months see the uplifted p50 fed back
+        np.testing.assert_allclose(uplifted[0], base[0] * 1.1, rtol=1e-12)
+        self.assertFalse(np.allclose(uplifted[1:], base[1:] * 1.1, rtol=1e-9))
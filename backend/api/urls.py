@@ -6,11 +6,20 @@ urlpatterns = [
     path('notes/delete/<int:pk>/', views.NoteDelete.as_view(), name='note-delete'),
     path('rfp/', views.RequestForPaymentListCreateView.as_view(), name='rfp-list-create'),
     path('rfps/', views.RequestForPaymentListView.as_view(), name='rfp-list'),
+    path('rfps/search/', views.RequestForPaymentSearchView.as_view(), name='rfp-search'),
+    path('lookups/', views.LookupsView.as_view(), name='lookups'),
     path('departments/', views.DepartmentListCreateView.as_view(), name='department-list-create'),
     path('source-of-funds/', views.SourceOfFundListCreateView.as_view(), name='source-of-fund-list-create'),
     path('transaction-types/', views.TransactionTypeListCreateView.as_view(), name='transaction-type-list-create'),
     path('types-of-business/', views.TypeOfBusinessListCreateView.as_view(), name='type-of-business-list-create'),
     path('modes-of-payment/', views.ModeOfPaymentListCreateView.as_view(), name='mode-of-payment-list-create'),
     path('tax-registrations/', views.TaxRegistrationListCreateView.as_view(), name='tax-registration-list-create'),
+    path('drivers/bulk/', views.DriversMonthlyBulkUpsert.as_view(), name='drivers-bulk-upsert'),
+    path('macro/bulk/', views.MacroMonthlyBulkUpsert.as_view(), name='macro-bulk-upsert'),
+    path('analytics/spend/', views.SpendAnalyticsView.as_view(), name='spend-analytics'),
     path('forecast/next-year/', views.ForecastNextYear.as_view(), name='forecast-next-year'),
+    path('forecast/batch/', views.ForecastBatch.as_view(), name='forecast-batch'),
+    path('forecast/simulate/', views.ForecastSimulate.as_view(), name='forecast-simulate'),
+    path('forecast/sensitivity/', views.ForecastSensitivity.as_view(), name='forecast-sensitivity'),
+    path('forecast/results/', views.ForecastResultListView.as_view(), name='forecast-results'),
 ]
\ No newline at end of file
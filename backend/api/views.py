@@ -1,140 +1,113 @@
 #views.py
+from django.conf import settings
 from django.shortcuts import render
 from django.contrib.auth.models import User
 from rest_framework import generics, status, permissions
-from .serializers import UserSerializer, NoteSerializer, RequestForPaymentSerializer, RequestForPaymentsSerializer, DepartmentSerializer, SourceOfFundSerializer, TransactionTypeSerializer, TypeOfBusinessSerializer, ModeOfPaymentSerializer, TaxRegistrationSerializer, DriversMonthlySerializer, MacroMonthlySerializer, ScenarioSerializer, ScenarioDeptFactorSerializer, ScenarioTxnFactorSerializer
+from .serializers import UserSerializer, NoteSerializer, RequestForPaymentSerializer, RequestForPaymentsSerializer, RequestForPaymentSearchSerializer, DepartmentSerializer, SourceOfFundSerializer, TransactionTypeSerializer, TypeOfBusinessSerializer, ModeOfPaymentSerializer, TaxRegistrationSerializer, DriversMonthlySerializer, MacroMonthlySerializer, ScenarioSerializer, ScenarioDeptFactorSerializer, ScenarioTxnFactorSerializer, ForecastResultSerializer
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
 from .models import Note, RequestForPayment, Department, SourceOfFund, TransactionType, TypeOfBusiness, ModeOfPayment, TaxRegistration, DriversMonthly, MacroMonthly, Scenario, ScenarioDeptFactor, ScenarioTxnFactor
-from .services.forecasting_service import load_models
+from .services.model_registry import get_bundle
 from .services.features import build_features_for_forecast_from_db
+from .services.rollout import ScenarioError, parse_scenario, forecast_rows, EXOG_KEYS
+from .services.direct import MODES, run_forecast, direct_path, path_key
+from .services import simulate, sensitivity, response_surface
+from .services.macro_store import get_macro_store
+from .services.history import horizon_targets, horizon_macro, fetch_history, history_state, load_batch_state
+from .services import forecast_cache
+from .services.forecast_store import PRECOMPUTE, SOURCES, save_forecast_run, latest_results
+from .pagination import KeysetPagination
+from .services.rfp_search import filter_matches, search_rfps
+from .services import spend_rollup
+from .services.lookups import lookups
+from django.db import DatabaseError
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from .services.ingest import CHUNK_SIZE, IngestError, read_rows, upsert_drivers, upsert_macro
 from dateutil.relativedelta import relativedelta
 import pandas as pd
 import numpy as np
-from pathlib import Path
 import logging
 import json
+from functools import partial
 from datetime import date
-import lightgbm as lgb
+from decimal import Decimal
 
 logger = logging.getLogger(__name__)
 
-ARTIFACT_DIR   = Path(__file__).resolve().parents[1] / "artifacts"
-TRAIN_COLS_PATH = ARTIFACT_DIR / "train_columns.json"       # written by model_training.py
-EXOG_ELAS_PATH  = ARTIFACT_DIR / "exog_elasticities.json"   # optional (for instant UI overlay)
-
-try:
-    _EXOG_ELAS = json.loads(EXOG_ELAS_PATH.read_text())
-except Exception:
-    _EXOG_ELAS = None
-
 KEY    = "Department"
 TARGET = "y"
 ALPHAS = [0.10, 0.50, 0.90]
 
 # --------------------------
-# Model cache & loader
+# Request / data helpers
 # --------------------------
-_LGB_MODELS = None
-
-def load_models():
-    """Load and cache LightGBM quantile models."""
-    global _LGB_MODELS
-    if _LGB_MODELS is not None:
-        return _LGB_MODELS
-
-    models = {}
+def _parse_scenario(data) -> dict:
+    """Slider assumptions and driver deltas from a forecast request body (400 naming a bad field)."""
     try:
-        for a in ALPHAS:
-            path = ARTIFACT_DIR / f"lgb_quantile_{a}.txt"
-            booster = lgb.Booster(model_file=str(path))
-            models[a] = booster
-    except Exception as e:
-        logger.exception("Failed loading LightGBM models")
-        raise RuntimeError(f"LightGBM artifact missing or unreadable: {e}")
+        return parse_scenario(data.get("assumptions", {}), data.get("drivers", {}))
+    except ScenarioError as e:
+        raise ValidationError({e.field: str(e)})
 
-    _LGB_MODELS = models
-    return _LGB_MODELS
 
-# --------------------------
-# Helpers
-# --------------------------
-def _ensure_train_cols(df_feat: pd.DataFrame, train_cols: list[str]) -> pd.DataFrame:
-    """Align features to training schema; create missing as 0; drop extras; cast categoricals."""
-    X = df_feat.drop(columns=[TARGET, "Date"], errors="ignore").copy()
+def _resolve_departments(wanted):
+    """``(name -> id, requested names, error Response | None)`` for a "departments" list or "all"."""
+    ids = {n: pk for pk, n in Department.objects.values_list("id", "name")}
+    names = {n.lower(): n for n in ids}
+    if wanted == "all" or wanted == ["all"]:
+        return ids, sorted(names.values()), None
+    if isinstance(wanted, list) and wanted:
+        unknown = [d for d in wanted if str(d).lower() not in names]
+        if unknown:
+            return ids, [], Response({"detail": f"Unknown department(s): {', '.join(map(str, unknown))}"}, status=400)
+        return ids, list(dict.fromkeys(names[str(d).lower()] for d in wanted)), None
+    return ids, [], Response({"detail": "departments must be a non-empty list or \"all\""}, status=400)
 
-    # Ensure categorical key is category
-    if KEY in X.columns:
-        X[KEY] = X[KEY].astype("category")
 
-    # Add any missing columns
-    missing = [c for c in train_cols if c not in X.columns]
-    for c in missing:
-        X[c] = 0
+def _etag_matches(request, etag: str) -> bool:
+    """If-None-Match lists ``etag`` (weak comparison, as for GET) or is "*"."""
+    tags = parse_etags(request.headers.get("If-None-Match", ""))
+    return tags == ["*"] or etag in {t.removeprefix("W/") for t in tags}
 
-    # Warn & drop extras
-    extras = [c for c in X.columns if c not in train_cols]
-    if extras:
-        logger.warning("Dropping %d extra feature(s) at inference: %s", len(extras), extras[:15])
-        X = X.drop(columns=extras, errors="ignore")
 
-    # Reorder
-    X = X[train_cols]
+def _flag(value) -> bool:
+    """Boolean request flag: true / 1 / yes (any case) or a JSON true."""
+    return value is True or str(value).lower() in ("1", "true", "yes")
 
-    # Safety: ensure column count matches
-    if X.shape[1] != len(train_cols):
-        raise ValueError("Alignment failure: columns still mismatched after alignment")
 
-    # LightGBM will accept numeric + categorical dtype('category')
-    return X
+def _forecast_mode(data, bundle):
+    """``(mode, error Response | None)`` for the request's "mode" ("recursive" by default)."""
+    mode = data.get("mode") or "recursive"
+    if mode not in MODES:
+        return mode, Response({"detail": f"mode must be one of: {', '.join(MODES)}"}, status=400)
+    if mode == "direct" and not bundle.has_direct:
+        return mode, Response({"detail": "Direct models are not trained; run `manage.py train_direct`."}, status=400)
+    return mode, None
 
-EXOG_KEYS = ["fxRate", "inflationPct", "wageIndex", "enrolled_FTE_dept", "programLaunches_dept"]
 
-def _predict_quantile_linear(exog_vec: dict, q: float) -> float:
-    if not _EXOG_ELAS:
-        return np.nan
-    try:
-        # keys are strings like "0.1"
-        key = None
-        for k in _EXOG_ELAS.keys():
-            if abs(float(k) - float(q)) < 1e-12:
-                key = k; break
-        if key is None:
-            return np.nan
-        model = _EXOG_ELAS[key]
-        beta0 = float(model.get("intercept", 0.0))
-        coefs = model.get("coef", {}) or {}
-        yhat = beta0
-        for name in EXOG_KEYS:
-            v = exog_vec.get(name, 0.0)
-            v = 0.0 if (v is None or (isinstance(v, float) and not np.isfinite(v))) else float(v)
-            yhat += float(coefs.get(name, 0.0)) * v
-        return float(yhat)
-    except Exception:
-        return np.nan
-
-def _overlay_ratio(base_exog: dict, scen_exog: dict, q: float) -> float:
-    """Return y1/y0 ratio from quantile linear overlay, clipped to sane range."""
-    try:
-        y0 = _predict_quantile_linear(base_exog, q)
-        y1 = _predict_quantile_linear(scen_exog, q)
-        if not np.isfinite(y0) or y0 == 0:
-            return 1.0
-        return float(np.clip(y1 / y0, 0.5, 1.5))
-    except Exception:
-        return 1.0
-
-def _last_non_nan_col(df: pd.DataFrame, col: str) -> float:
-    if col not in df.columns:
-        return np.nan
-    s = pd.to_numeric(df[col], errors="coerce").dropna()
-    return float(s.iloc[-1]) if len(s) else np.nan
+def _run_version(bundle, mode: str) -> str:
+    """Model version stored with persisted runs: direct runs are told apart from recursive ones."""
+    return bundle.version if mode == "recursive" else f"{bundle.version}-{mode}"
 
 # ==========================
 # Forecasting endpoint
 # ==========================
 class ForecastNextYear(APIView):
+    """
+    12-month forecast for one department under the Forecasting page's sliders.
+
+    Body: {"Department": ..., "assumptions": {...}, "drivers": {...}, "mode": "recursive" | "direct",
+           "persist": bool, "exact": bool, "debug": bool}
+    Repeated requests are answered from the response cache. Post-processing reuse (a
+    cached model path, only the department uplift re-applied) is for mode "direct"
+    only: the recursive rollout feeds each month's uplifted p50 into the next month,
+    so a dept_pct change alters every later model input and reruns the rollout
+    (or, when enabled, is interpolated on the response surface).
+    """
     permission_classes = (permissions.AllowAny,)
 
     def post(self, request):
@@ -143,226 +116,368 @@ class ForecastNextYear(APIView):
         if not dept:
             return Response({"detail": "Missing Department"}, status=400)
 
-        # validate department
+        # Scenario sliders / deltas
+        scen = _parse_scenario(request.data)
+        fx_delta, inf_delta, wage_delta = scen["fx_delta"], scen["inf_delta"], scen["wage_delta"]
+        dept_pct = scen["dept_pct"]
+        enrolled_delta, programs_delta = scen["enrolled_delta"], scen["programs_delta"]
+
+        # --------- Horizon (next 12 months) ---------
+        targets = horizon_targets(12)
+
+        # models + training schema of the current artifact version
         try:
-            Department.objects.get(name__iexact=dept)
-        except Department.DoesNotExist:
-            return Response({"detail": f"Unknown department: {dept}"}, status=400)
+            bundle = get_bundle()
+        except Exception as e:
+            return Response({"detail": f"Model load failed: {e}"}, status=503)
+        mode, error = _forecast_mode(request.data, bundle)
+        if error is not None:
+            return error
+
+        # Cached result for the same inputs / data / models (debug and persist requests always recompute)
+        debug_enabled = bool(request.data.get("debug") or request.query_params.get("debug"))
+        persist = _flag(request.data.get("persist"))
+        exact = _flag(request.data.get("exact") or request.query_params.get("exact"))
+        cache_key = None
+        if not debug_enabled:
+            key_scen = scen if mode == "recursive" else {**scen, "mode": mode}
+            cache_key = forecast_cache.forecast_key(dept, key_scen, targets[0], bundle.version)
+            cached = None if persist else forecast_cache.get_forecast(cache_key)
+            if cached is not None:
+                return Response(cached, status=200)
+
+        # Slider answer interpolated on the precomputed response surface (exact=true forces a rollout)
+        if not (exact or debug_enabled or persist) and mode == "recursive" and response_surface.enabled():
+            dept_id = Department.objects.filter(name__iexact=dept).values_list("pk", flat=True).first()
+            if dept_id is None:
+                return Response({"detail": f"Unknown department: {dept}"}, status=400)
+            approx = response_surface.lookup(bundle, dept, dept_id, sensitivity.scenario_point(scen), targets[0])
+            if approx is not None:
+                return Response({
+                    "Department": dept,
+                    "Horizon": 12,
+                    "Mode": mode,
+                    "Forecast": forecast_rows(targets, approx),
+                    "note": "p10=lower, p50=median, p90=upper. Forecast starts next month for 12 months.",
+                    "debug": None,
+                    "approximate": True,   # interpolated; send exact=true for a full rollout
+                }, status=200)
+
+        # Direct mode: the model path doesn't depend on dept_pct (nothing is fed back), so a
+        # cached path for the other sliders only needs post-processing
+        path = dir_key = None
+        if mode == "direct":
+            dir_key = path_key(dept, scen, targets[0], bundle.version)
+            path = forecast_cache.get_forecast(dir_key)
+
+        if path is None:
+            # --------- History + macro (one query; state built once, advanced per step) ---------
+            dept_ids, hist = fetch_history(department__name__iexact=dept)
+            if not len(dept_ids):
+                # only the error path needs to tell an unknown department from one without history
+                if not Department.objects.filter(name__iexact=dept).exists():
+                    return Response({"detail": f"Unknown department: {dept}"}, status=400)
+                return Response({"detail": f"No monthly drivers found for {dept}"}, status=400)
+            state, drivers_base = history_state({i: dept for i in dept_ids}, dept_ids, hist)
+            model_args = dict(
+                exog_delta=[fx_delta, inf_delta, wage_delta],
+                drivers_base=drivers_base,
+                drivers_delta=[enrolled_delta, programs_delta],
+            )
 
-        # load models
         try:
-            lgb_models = load_models()
+            if mode == "direct" and path is None:
+                path = direct_path(state, targets, bundle.direct_models, bundle.direct_schema,
+                                   horizon_macro(targets), elas=bundle.elas, **model_args)
+                forecast_cache.set_forecast(dir_key, path)
+            if path is not None:
+                quantiles, last_step = path.finish(dept_pct)
+            else:
+                quantiles, last_step = run_forecast(bundle, mode, state, targets, horizon_macro(targets),
+                                                    dept_pct=dept_pct, **model_args)
+        except Exception as e:
+            logger.exception("Model predict failed")
+            return Response({"detail": f"Predict failed: {e}"}, status=500)
+
+        results = forecast_rows(targets, quantiles[0])
+
+        last_dbg = None  # capture last-step internals if debug requested
+        if debug_enabled:
+            ratios = last_step["ratios"]
+            last_dbg = {
+                "exog_elas_loaded": bool(bundle.elas),
+                "used_macro_map": not get_macro_store().empty,
+                "sliders": {
+                    "fx_delta": fx_delta, "inf_delta": inf_delta, "wage_delta": wage_delta,
+                    "dept_pct": dept_pct, "enrolled_delta": enrolled_delta, "programs_delta": programs_delta,
+                },
+                "base_exog": dict(zip(EXOG_KEYS, map(float, last_step["base_exog"][0]))),
+                "scen_exog": dict(zip(EXOG_KEYS, map(float, last_step["scen_exog"][0]))),
+                "ratios": {
+                    "r10": float(ratios[0, 0]) if ratios is not None else None,
+                    "r50": float(ratios[0, 1]) if ratios is not None else None,
+                    "r90": float(ratios[0, 2]) if ratios is not None else None,
+                },
+            }
+
+        payload = {
+            "Department": dept,
+            "Horizon": 12,
+            "Mode": mode,
+            "Forecast": results,  # [{date:'YYYY-MM', p10,p50,p90}, ...]
+            "note": "p10=lower, p50=median, p90=upper. Forecast starts next month for 12 months.",
+            "debug": last_dbg if debug_enabled else None,
+            "approximate": False,
+        }
+        if cache_key is not None:
+            forecast_cache.set_forecast(cache_key, payload)
+        if persist:
+            dept_obj = Department.objects.get(name__iexact=dept)
+            run = save_forecast_run({dept_obj.name: results}, assumptions=scen,
+                                    departments={dept_obj.name: dept_obj}, version=_run_version(bundle, mode))
+            payload = {**payload, "run_id": run.pk}
+        return Response(payload, status=200)
+
+
+class ForecastBatch(APIView):
+    """
+    Next-year forecast for many departments in one call.
+
+    Body: {"departments": [...] | "all", "assumptions": {...}, "drivers": {...}, "persist": bool,
+           "mode": "recursive" | "direct"}
+    The sliders are shared by every department. History for all departments is
+    fetched in one query and each horizon step scores every department at once
+    (in direct mode every horizon of every department is one predict call).
+    """
+    permission_classes = (permissions.AllowAny,)
+
+    def post(self, request):
+        ids, depts, error = _resolve_departments(request.data.get("departments", "all"))
+        if error is not None:
+            return error
+
+        try:
+            bundle = get_bundle()
         except Exception as e:
             return Response({"detail": f"Model load failed: {e}"}, status=503)
+        mode, error = _forecast_mode(request.data, bundle)
+        if error is not None:
+            return error
+
+        scen = _parse_scenario(request.data)
 
-        # load training schema
+        # --------- History for every department (one query) ---------
+        state, drivers_base = load_batch_state({ids[d]: d for d in depts})
+        if state is None:
+            return Response({"detail": "No monthly drivers found for the requested departments"}, status=400)
+
+        targets = horizon_targets(12)
         try:
-            train_cols = json.loads(TRAIN_COLS_PATH.read_text())
+            quantiles, _ = run_forecast(
+                bundle, mode, state, targets, horizon_macro(targets),
+                exog_delta=[scen["fx_delta"], scen["inf_delta"], scen["wage_delta"]],
+                drivers_base=drivers_base,
+                drivers_delta=[scen["enrolled_delta"], scen["programs_delta"]],
+                dept_pct=scen["dept_pct"],
+            )
         except Exception as e:
-            return Response({
-                "detail": "Missing or unreadable artifacts/train_columns.json. Re-train first.",
-                "debug": str(e),
-            }, status=503)
+            logger.exception("Batch predict failed")
+            return Response({"detail": f"Predict failed: {e}"}, status=500)
 
-        if not isinstance(train_cols, list) or not train_cols:
-            return Response({"detail": "Invalid train_columns.json (not a non-empty list). Re-train first."}, status=503)
+        forecasts = {key: forecast_rows(targets, quantiles[i]) for i, key in enumerate(state.keys)}
+        run_id = None
+        if _flag(request.data.get("persist")):
+            run_id = save_forecast_run(forecasts, assumptions=scen, version=_run_version(bundle, mode)).pk
 
-        # Scenario sliders / deltas
-        assumptions = request.data.get("assumptions", {}) or {}
-        fx_delta   = float(assumptions.get("fxRate_delta", 0) or 0)
-        inf_delta  = float(assumptions.get("inflationPct_delta", 0) or 0)
-        wage_delta = float(assumptions.get("wageIndex_delta", 0) or 0)
-        dept_pct   = float(assumptions.get("dept_pct", 0) or 0) / 100.0
-
-        drivers_adj = request.data.get("drivers", {}) or {}
-        enrolled_delta = int(drivers_adj.get("enrolled_FTE_delta", 0) or 0)
-        programs_delta = int(drivers_adj.get("programLaunches_delta", 0) or 0)
-
-        # --------- History (actuals) ---------
-        qs = (DriversMonthly.objects
-              .select_related("department", "macro")
-              .filter(department__name__iexact=dept)
-              .order_by("month")
-              .values("month", "totalNet", "macro_id"))
-        if not qs.exists():
-            return Response({"detail": f"No monthly drivers found for {dept}"}, status=400)
+        return Response(
+            {
+                "Horizon": 12,
+                "Mode": mode,
+                "run_id": run_id,
+                "Departments": [{"Department": d, "Forecast": forecasts[d]} for d in depts if d in forecasts],
+                "skipped": [d for d in depts if d not in forecasts],  # no monthly drivers
+                "note": "p10=lower, p50=median, p90=upper. Forecast starts next month for 12 months.",
+            },
+            status=200
+        )
 
-        hist = pd.DataFrame(list(qs)).rename(columns={"month": "Date", "totalNet": TARGET})
-        hist[KEY] = dept
-        hist["Date"] = pd.to_datetime(hist["Date"], errors="coerce")
-        hist = hist.dropna(subset=["Date"])
-        hist[TARGET] = pd.to_numeric(hist[TARGET], errors="coerce")
-
-        # Latest dept-level baselines to adjust by deltas
-        latest_drv = (DriversMonthly.objects
-                      .filter(department__name__iexact=dept)
-                      .order_by("-month")
-                      .values("enrolled_FTE_dept", "programLaunches_dept")
-                      .first()) or {}
-        base_enrolled = int(latest_drv.get("enrolled_FTE_dept") or 0)
-        base_programs = int(latest_drv.get("programLaunches_dept") or 0)
-
-        # --------- Macro lookups (month -> values) ---------
-        macro_map = {}
-        macro_qs = MacroMonthly.objects.values("id", "month", "fxRate_PHP_USD", "inflationPct", "wageIndex")
-        mdf = pd.DataFrame(list(macro_qs))
-        if not mdf.empty:
-            mdf["Date"] = pd.to_datetime(mdf["month"], errors="coerce").dt.to_period("M").dt.to_timestamp()
-            mdf = mdf.dropna(subset=["Date"])
-            # Last write wins per month
-            mdf = mdf.sort_values(["Date", "id"]).drop_duplicates(subset=["Date"], keep="last")
-            macro_map = mdf.set_index("Date")[["fxRate_PHP_USD", "inflationPct", "wageIndex"]].to_dict("index")
 
-        # --------- Horizon (next 12 months) ---------
-        today = date.today().replace(day=1)
-        start = today + relativedelta(months=1)
-        targets = [start + relativedelta(months=i) for i in range(12)]
-
-        # --------- Working panel ---------
-        work = hist[["Date", KEY, TARGET]].copy()
-        work["Date"] = pd.to_datetime(work["Date"], errors="coerce").dt.to_period("M").dt.to_timestamp()
-        if macro_map:
-            work["fxRate"]       = work["Date"].map(lambda d: macro_map.get(d, {}).get("fxRate_PHP_USD", np.nan))
-            work["inflationPct"] = work["Date"].map(lambda d: macro_map.get(d, {}).get("inflationPct", np.nan))
-            work["wageIndex"]    = work["Date"].map(lambda d: macro_map.get(d, {}).get("wageIndex", np.nan))
-
-        results = []
-        debug_enabled = bool(request.data.get("debug") or request.query_params.get("debug"))
-        last_dbg = None  # capture last-step internals if debug requested
+class ForecastSimulate(APIView):
+    """
+    Monte Carlo intervals for cumulative and cross-department totals.
 
-        for tgt in targets:
-            tgt_ts = pd.Timestamp(tgt).to_period("M").to_timestamp()
-
-            # include a future row to build calendar dummies
-            future_row = pd.DataFrame([{"Date": tgt_ts, KEY: dept, TARGET: np.nan}])
-            panel = pd.concat([work, future_row], ignore_index=True)
-
-            # calendar features
-            panel["Date"] = pd.to_datetime(panel["Date"], errors="coerce")
-            panel = panel.dropna(subset=["Date"])
-            panel["Date"] = panel["Date"].dt.to_period("M").dt.to_timestamp()
-            panel["year"]  = panel["Date"].dt.year
-            panel["month"] = panel["Date"].dt.month
-            panel["qtr"]   = panel["Date"].dt.quarter
-            panel = pd.get_dummies(panel, columns=["month", "qtr"], prefix=["m", "q"], dtype=int)
-            panel["t"] = (panel["Date"].dt.year - panel["Date"].dt.year.min()) * 12 + panel["Date"].dt.month
-
-            # lags / rolls / yoy / regime
-            panel[TARGET] = pd.to_numeric(panel[TARGET], errors="coerce")
-            panel = panel.sort_values([KEY, "Date"]).copy()
-            for L in [1, 3, 12]:
-                panel[f"lag{L}"] = panel.groupby(KEY, observed=False)[TARGET].shift(L)
-            g = panel.groupby(KEY, observed=False)[TARGET]
-            for w in [3, 6, 12]:
-                panel[f"roll{w}_mean"] = g.shift(1).rolling(w).mean().reset_index(level=0, drop=True)
-                panel[f"roll{w}_std"]  = g.shift(1).rolling(w).std().reset_index(level=0, drop=True)
-            denom = panel.groupby(KEY, observed=False)[TARGET].shift(12)
-            panel["yoy"] = (panel[TARGET] / denom) - 1.0
-            panel["level_shift12"] = (
-                panel.groupby(KEY, observed=False)[TARGET]
-                .pct_change(12, fill_method=None).abs() > 0.35
-            ).astype(int)
-
-            # features row for this target month
-            row_feat = panel.loc[panel["Date"] == tgt_ts].copy()
-
-            # macro bases and scenario effective values
-            fx_base   = macro_map.get(tgt_ts, {}).get("fxRate_PHP_USD", np.nan) if macro_map else np.nan
-            inf_base  = macro_map.get(tgt_ts, {}).get("inflationPct", np.nan)   if macro_map else np.nan
-            wage_base = macro_map.get(tgt_ts, {}).get("wageIndex", np.nan)      if macro_map else np.nan
-            if pd.isna(fx_base):   fx_base   = _last_non_nan_col(work, "fxRate")
-            if pd.isna(inf_base):  inf_base  = _last_non_nan_col(work, "inflationPct")
-            if pd.isna(wage_base): wage_base = _last_non_nan_col(work, "wageIndex")
-
-            fx_eff   = (fx_base   + fx_delta)  if pd.notna(fx_base)  else np.nan
-            inf_eff  = (inf_base  + inf_delta) if pd.notna(inf_base) else np.nan
-            wage_eff = (wage_base + wage_delta) if pd.notna(wage_base) else np.nan
-
-            row_feat["fxRate"]       = fx_eff
-            row_feat["inflationPct"] = inf_eff
-            row_feat["wageIndex"]    = wage_eff
-            row_feat["enrolled_FTE_dept"]    = float(base_enrolled + enrolled_delta)
-            row_feat["programLaunches_dept"] = float(base_programs + programs_delta)
-
-            # Align to training columns & predict
-            try:
-                X = _ensure_train_cols(row_feat, train_cols)
-            except Exception as e:
-                logger.exception("Feature alignment failure")
-                return Response({"detail": f"Feature alignment failed: {e}"}, status=500)
+    Body: {"departments": [...] | "all", "paths": N, "seed": int, "assumptions": {...}, "drivers": {...}}
+    Each department gets N sampled 12-month paths (the draws are fed back through the
+    recursive state); the response has p10 / p50 / p90 / mean of every department's
+    running and annual total and of the university-wide monthly and annual totals.
+    """
+    permission_classes = (permissions.AllowAny,)
 
-            try:
-                p10 = float(lgb_models[0.1].predict(X)[0])
-                p50 = float(lgb_models[0.5].predict(X)[0])
-                p90 = float(lgb_models[0.9].predict(X)[0])
-            except Exception as e:
-                logger.exception("Model predict failed")
-                return Response({"detail": f"Predict failed: {e}"}, status=500)
-
-            # Elasticity overlay (if available)
-            base_exog = {
-                "fxRate": fx_base,
-                "inflationPct": inf_base,
-                "wageIndex": wage_base,
-                "enrolled_FTE_dept": float(base_enrolled),
-                "programLaunches_dept": float(base_programs),
-            }
-            scen_exog = {
-                "fxRate": fx_eff,
-                "inflationPct": inf_eff,
-                "wageIndex": wage_eff,
-                "enrolled_FTE_dept": float(base_enrolled + enrolled_delta),
-                "programLaunches_dept": float(base_programs + programs_delta),
-            }
-            if _EXOG_ELAS:
-                r10 = _overlay_ratio(base_exog, scen_exog, 0.10)
-                r50 = _overlay_ratio(base_exog, scen_exog, 0.50)
-                r90 = _overlay_ratio(base_exog, scen_exog, 0.90)
-                p10 *= r10; p50 *= r50; p90 *= r90
-
-            # Department uplift AFTER overlay
-            scale = 1.0 + (dept_pct or 0.0)
-            p10 *= scale; p50 *= scale; p90 *= scale
-
-            # Non-crossing safety
-            p10, p50, p90 = sorted([p10, p50, p90])
-
-            results.append({"date": f"{tgt_ts:%Y-%m}", "p10": p10, "p50": p50, "p90": p90})
-
-            # Recursive rollout: feed median back into work with effective exog
-            new_row = {"Date": tgt_ts, KEY: dept, TARGET: p50}
-            if macro_map:
-                new_row.update({"fxRate": fx_eff, "inflationPct": inf_eff, "wageIndex": wage_eff})
-            work = pd.concat([work, pd.DataFrame([new_row])], ignore_index=True)
-
-            if debug_enabled:
-                last_dbg = {
-                    "exog_elas_loaded": bool(_EXOG_ELAS),
-                    "used_macro_map": bool(macro_map),
-                    "sliders": {
-                        "fx_delta": fx_delta, "inf_delta": inf_delta, "wage_delta": wage_delta,
-                        "dept_pct": dept_pct, "enrolled_delta": enrolled_delta, "programs_delta": programs_delta,
-                    },
-                    "base_exog": base_exog,
-                    "scen_exog": scen_exog,
-                    "ratios": {
-                        "r10": float(r10) if _EXOG_ELAS else None,
-                        "r50": float(r50) if _EXOG_ELAS else None,
-                        "r90": float(r90) if _EXOG_ELAS else None,
-                    },
-                }
+    def post(self, request):
+        ids, depts, error = _resolve_departments(request.data.get("departments", "all"))
+        if error is not None:
+            return error
+        max_paths = getattr(settings, "FORECAST_SIM_MAX_PATHS", simulate.MAX_PATHS)
+        try:
+            n_paths = int(request.data.get("paths", 1000))
+            seed = request.data.get("seed")
+            seed = None if seed is None else int(seed)
+        except (TypeError, ValueError):
+            return Response({"detail": "paths and seed must be integers"}, status=400)
+        if not 1 <= n_paths <= max_paths:
+            return Response({"detail": f"paths must be between 1 and {max_paths}"}, status=400)
+
+        try:
+            bundle = get_bundle()
+        except Exception as e:
+            return Response({"detail": f"Model load failed: {e}"}, status=503)
+
+        scen = _parse_scenario(request.data)
+        state, drivers_base = load_batch_state({ids[d]: d for d in depts})
+        if state is None:
+            return Response({"detail": "No monthly drivers found for the requested departments"}, status=400)
+        try:
+            simulate.check_size(state.size, n_paths)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+
+        targets = horizon_targets(12)
+        try:
+            paths = simulate.simulate_paths(
+                state, targets, bundle.models, bundle.schema, horizon_macro(targets), n_paths, seed=seed,
+                exog_delta=[scen["fx_delta"], scen["inf_delta"], scen["wage_delta"]],
+                drivers_base=drivers_base,
+                drivers_delta=[scen["enrolled_delta"], scen["programs_delta"]],
+                dept_pct=scen["dept_pct"],
+                elas=bundle.elas,
+            )
+        except Exception as e:
+            logger.exception("Simulation failed")
+            return Response({"detail": f"Predict failed: {e}"}, status=500)
+
+        return Response(
+            {
+                "Horizon": 12,
+                "paths": paths.shape[1],          # fewer than requested if the time budget ran out
+                "requested_paths": n_paths,
+                "seed": seed,
+                **simulate.summarize(state.keys, targets, paths),
+                "skipped": [d for d in depts if d not in state.keys],  # no monthly drivers
+                "note": "Quantiles over sampled paths; departments are sampled independently.",
+            },
+            status=200
+        )
+
+
+class ForecastSensitivity(APIView):
+    """
+    Slider sensitivity sweep for one department in one batched rollout.
+
+    Body: {"Department": ..., "grid": {slider: [values]} | "scenarios": [{slider: value}, ...],
+           "base": {slider: value}, "mode": "recursive" | "direct"}
+    Sliders are fxRate_delta, inflationPct_delta, wageIndex_delta, dept_pct,
+    enrolled_FTE_delta and programLaunches_delta (missing ones are 0). Returns the
+    baseline forecast, a tornado table (one slider at a time, low / high, sorted by
+    swing of the 12-month p50 sum) and one compact row per scenario.
+    """
+    permission_classes = (permissions.AllowAny,)
+
+    def post(self, request):
+        dept = request.data.get("Department") or request.data.get("department")
+        if not dept:
+            return Response({"detail": "Missing Department"}, status=400)
+        grid, listed = request.data.get("grid"), request.data.get("scenarios")
+        try:
+            base = sensitivity.slider_point(request.data.get("base"))
+            points = sensitivity.expand_grid(grid) if isinstance(grid, dict) else []
+            if isinstance(listed, list):
+                points += [sensitivity.slider_point(p) for p in listed]
+        except ScenarioError as e:
+            raise ValidationError({e.field: str(e)})
+        except (TypeError, ValueError) as e:
+            return Response({"detail": str(e)}, status=400)
+        if len(points) > sensitivity.MAX_SCENARIOS:
+            return Response({"detail": f"At most {sensitivity.MAX_SCENARIOS} scenarios per sweep."}, status=400)
 
+        try:
+            bundle = get_bundle()
+        except Exception as e:
+            return Response({"detail": f"Model load failed: {e}"}, status=503)
+        mode, error = _forecast_mode(request.data, bundle)
+        if error is not None:
+            return error
+
+        dept_ids, hist = fetch_history(department__name__iexact=dept)
+        if not len(dept_ids):
+            if not Department.objects.filter(name__iexact=dept).exists():
+                return Response({"detail": f"Unknown department: {dept}"}, status=400)
+            return Response({"detail": f"No monthly drivers found for {dept}"}, status=400)
+        state, drivers_base = history_state({i: dept for i in dept_ids}, dept_ids, hist)
+
+        targets = horizon_targets(12)
+        try:
+            base_q, tornado, point_q = sensitivity.run_sweep(
+                partial(run_forecast, bundle, mode), state, points, base, drivers_base[0],
+                targets, horizon_macro(targets),
+            )
+        except Exception as e:
+            logger.exception("Sensitivity sweep failed")
+            return Response({"detail": f"Predict failed: {e}"}, status=500)
+
+        base_total = float(base_q[:, 1].sum())
         return Response(
             {
                 "Department": dept,
                 "Horizon": 12,
-                "Forecast": results,  # [{date:'YYYY-MM', p10,p50,p90}, ...]
-                "note": "p10=lower, p50=median, p90=upper. Forecast starts next month for 12 months.",
-                "debug": last_dbg if debug_enabled else None,
+                "Mode": mode,
+                "baseline": {"sliders": base, "p50_sum": base_total, "Forecast": forecast_rows(targets, base_q)},
+                "tornado": tornado,
+                "scenarios": sensitivity.scenario_rows(points, point_q, base_total),
+                "note": "Sums are 12-month sums of the monthly quantiles; change_pct is vs the baseline p50 sum.",
             },
             status=200
         )
-    
+
+
+class ForecastResultListView(generics.ListAPIView):
+    """
+    Stored forecasts of the latest matching ForecastRun.
+
+    Query params: department, scenario (scenarioCode), start / end (YYYY-MM), run (id),
+    source ("precompute", the default: precompute_forecasts runs; "request": runs
+    persisted by forecast requests).
+    """
+    serializer_class = ForecastResultSerializer
+    permission_classes = (permissions.AllowAny,)
+
+    def get_queryset(self):
+        params = self.request.query_params
+
+        def month(name):
+            v = params.get(name)
+            if not v:
+                return None
+            try:
+                return pd.Timestamp(v).to_period("M").to_timestamp().date()
+            except (ValueError, TypeError):
+                raise ValidationError({name: f"Expected YYYY-MM, got {v!r}."})
+
+        run = params.get("run")
+        if run and not run.isdigit():
+            raise ValidationError({"run": "Expected a run id."})
+        source = params.get("source") or PRECOMPUTE
+        if source not in SOURCES:
+            raise ValidationError({"source": f"Expected one of: {', '.join(SOURCES)}."})
+        return latest_results(
+            department=params.get("department"),
+            scenario=params.get("scenario"),
+            start=month("start"),
+            end=month("end"),
+            run_id=int(run) if run else None,
+            source=source,
+        )
+
+
 class DriversMonthlyListCreateView(generics.ListCreateAPIView):
     queryset = DriversMonthly.objects.select_related("department").all()
     serializer_class = DriversMonthlySerializer
@@ -374,6 +489,44 @@ class DriversMonthlyListCreateView(generics.ListCreateAPIView):
             qs = qs.filter(department__name__iexact=dept)
         return qs
 
+class BulkUpsertView(APIView):
+    """
+    Body: a JSON list of rows, {"rows": [...]}, or a CSV / JSON upload in the "file"
+    field (multipart); ``?chunk_size=`` rows per INSERT. Only the supplied, non-blank cells
+    are overwritten and the batch is all-or-nothing: any invalid row rejects it.
+    """
+    upsert = None  # ingest.upsert_* function
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        try:
+            if upload is not None:
+                fmt = "json" if upload.name.lower().endswith(".json") else "csv"
+                df = read_rows(upload.read(), fmt)
+            else:
+                df = read_rows(request.data)
+            chunk = int(request.query_params.get("chunk_size", 0) or 0) or CHUNK_SIZE
+            result = type(self).upsert(df, chunk_size=chunk)
+        except IngestError as e:
+            return Response({"detail": str(e), "errors": e.errors}, status=400)
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({"detail": f"Unreadable batch: {e}"}, status=400)
+        except DatabaseError as e:
+            # constraint / value errors the row checks can't see; the batch was rolled back
+            logger.warning("Bulk upsert rejected by the database: %s", e)
+            return Response({"detail": f"The database rejected the batch: {e}"}, status=400)
+        return Response({"received": len(df), **result}, status=200)
+
+
+class DriversMonthlyBulkUpsert(BulkUpsertView):
+    """Bulk insert / update of DriversMonthly rows keyed by (department, month); rows name both."""
+    upsert = upsert_drivers
+
+
+class MacroMonthlyBulkUpsert(BulkUpsertView):
+    """Bulk insert / update of MacroMonthly rows keyed by month (fxRate_PHP_USD, inflationPct, wageIndex)."""
+    upsert = upsert_macro
+
 class MacroMonthlyListCreateView(generics.ListCreateAPIView):
     queryset = MacroMonthly.objects.all()
     serializer_class = MacroMonthlySerializer
@@ -440,14 +593,179 @@ class RequestForPaymentListCreateView(generics.ListCreateAPIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class RfpPagination(KeysetPagination):
+    sort_fields = ("dateRequested", "netTotal")
+
+
 class RequestForPaymentListView(generics.ListCreateAPIView):
+    """
+    RFP list, one keyset page at a time (``{"next": url | null, "results": [...]}``).
+
+    Query params: q (text matched like /api/rfps/search/, but kept in list order),
+    department (name or id), date_from / date_to (dateRequested, YYYY-MM-DD,
+    inclusive), currency (comma-separated), amount_min / amount_max (netTotal),
+    ordering (dateRequested | netTotal, "-" for descending), page_size, cursor,
+    fields (comma-separated subset of the serializer's fields).
+    """
     serializer_class = RequestForPaymentsSerializer
     permission_classes = (AllowAny,)
+    pagination_class = RfpPagination
+
+    def _fields(self):
+        raw = self.request.query_params.get("fields")
+        if not raw:
+            return None
+        fields = [f.strip() for f in raw.split(",") if f.strip()]
+        unknown = set(fields) - set(RequestForPaymentsSerializer.Meta.fields)
+        if unknown:
+            raise ValidationError({"fields": f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == "GET":
+            kwargs.setdefault("fields", self._fields())
+        return super().get_serializer(*args, **kwargs)
 
     def get_queryset(self):
-        return RequestForPayment.objects.all()
+        params = self.request.query_params
+        qs = RequestForPayment.objects.all()
+
+        def parsed(name, parse):
+            raw = params.get(name)
+            if not raw:
+                return None
+            try:
+                return parse(raw)
+            except (ValueError, ArithmeticError):
+                raise ValidationError({name: f"Invalid value: {raw}"})
+
+        dept = params.get("department")
+        if dept:
+            qs = qs.filter(department_id=int(dept)) if dept.isdigit() else qs.filter(department__name__iexact=dept)
+        date_from = parsed("date_from", date.fromisoformat)
+        date_to = parsed("date_to", date.fromisoformat)
+        if date_from:
+            qs = qs.filter(dateRequested__gte=date_from)
+        if date_to:
+            qs = qs.filter(dateRequested__lte=date_to)
+        currency = params.get("currency")
+        if currency:
+            qs = qs.filter(currency__in=[c.strip().upper() for c in currency.split(",") if c.strip()])
+        amount_min = parsed("amount_min", Decimal)
+        amount_max = parsed("amount_max", Decimal)
+        if amount_min is not None:
+            qs = qs.filter(netTotal__gte=amount_min)
+        if amount_max is not None:
+            qs = qs.filter(netTotal__lte=amount_max)
+        qs = filter_matches(qs, params.get("q") or "")
+
+        if self.request.method == "GET":
+            # only the serialized columns (plus the keyset) leave the database
+            fields = self._fields() or RequestForPaymentsSerializer.Meta.fields
+            qs = qs.only(*{*fields, "id", self.paginator.ordering(self.request)[0]})
+        return qs
     
 
+class RequestForPaymentSearchView(APIView):
+    """
+    Ranked full-text / fuzzy RFP search over payee, description, requester, account
+    name and pr / po / rr numbers.
+
+    Query params: q, page (1-based), page_size (max 100), fields (comma-separated).
+    Returns {"next": url | null, "results": [... with "score"]}, best match first.
+    """
+    permission_classes = (AllowAny,)
+    max_page_size = 100
+
+    def get(self, request):
+        params = request.query_params
+        q = (params.get("q") or "").strip()
+        if not q:
+            return Response({"detail": "q is required"}, status=400)
+        try:
+            page = max(1, int(params.get("page", 1)))
+            size = max(1, min(int(params.get("page_size", 20)), self.max_page_size))
+        except ValueError:
+            return Response({"detail": "page and page_size must be integers"}, status=400)
+        fields = [f.strip() for f in params.get("fields", "").split(",") if f.strip()] or None
+        unknown = set(fields or ()) - set(RequestForPaymentSearchSerializer.Meta.fields)
+        if unknown:
+            return Response({"detail": f"Unknown field(s): {', '.join(sorted(unknown))}"}, status=400)
+
+        rows = search_rfps(q, offset=(page - 1) * size, limit=size + 1)   # one extra row: is there a next page?
+        nxt = None
+        if len(rows) > size:
+            rows = rows[:size]
+            nxt = replace_query_param(request.build_absolute_uri(), "page", page + 1)
+        data = RequestForPaymentSearchSerializer(rows, many=True, fields=fields).data
+        return Response({"next": nxt, "results": data}, status=200)
+
+
+class SpendAnalyticsView(APIView):
+    """
+    Net RFP spend from the pre-aggregated rollup (services/spend_rollup.py).
+
+    Query params: group_by (comma-separated: department, transactionType, sourceOfFund,
+    modeOfPayment, currency), period (month | quarter | year | none), start / end
+    (YYYY-MM), currency (comma-separated filter). Responses carry an ETag tied to the
+    rollup version; If-None-Match gets a 304.
+    """
+    permission_classes = (AllowAny,)
+    max_age = 60
+
+    def get(self, request):
+        params = request.query_params
+        group_by = [g.strip() for g in params.get("group_by", "department").split(",") if g.strip()]
+        unknown = [g for g in group_by if g not in spend_rollup.GROUPS]
+        if unknown:
+            return Response({"detail": f"Unknown group(s): {', '.join(unknown)}"}, status=400)
+        period = params.get("period", "month")
+        if period not in (*spend_rollup.PERIODS, "none"):
+            return Response({"detail": "period must be month, quarter, year or none"}, status=400)
+        try:
+            start = pd.Timestamp(params["start"]).to_period("M").to_timestamp().date() if params.get("start") else None
+            end = pd.Timestamp(params["end"]).to_period("M").to_timestamp().date() if params.get("end") else None
+        except ValueError:
+            return Response({"detail": "start / end must be YYYY-MM"}, status=400)
+        currencies = [c.strip().upper() for c in params.get("currency", "").split(",") if c.strip()] or None
+
+        rows, etag = spend_rollup.cached_spend(
+            {"group_by": tuple(dict.fromkeys(group_by)), "period": period, "start": start, "end": end,
+             "currency": tuple(currencies or ())},
+            group_by=list(dict.fromkeys(group_by)), period=None if period == "none" else period,
+            start=start, end=end, currencies=currencies,
+        )
+        if _etag_matches(request, etag):
+            response = Response(status=304)
+        else:
+            response = Response({"group_by": group_by, "period": period, "rows": rows}, status=200)
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, max_age=self.max_age)
+        return response
+
+
+class LookupsView(APIView):
+    """
+    All six dimension tables in one response: departments, sourceOfFunds,
+    transactionTypes, typesOfBusiness, modesOfPayment, taxRegistrations.
+
+    The body is pre-rendered once per change of any of those tables and carries a
+    strong ETag; a matching If-None-Match gets a 304 after one indexed read of the
+    lookups version stamp, without querying the six tables.
+    """
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        etag, body = lookups()
+        if _etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        patch_cache_control(response, no_cache=True)   # revalidate every time; 304s are cheap
+        return response
+
+
 class DepartmentListCreateView(generics.ListCreateAPIView):
     serializer_class = DepartmentSerializer
     permission_classes = (AllowAny,)
@@ -106,6 +106,59 @@ DATABASES = {
 }
 
 
+# Caches
+# Forecast responses are cached in the "forecast" cache (LRU, bounded by MAX_ENTRIES).
+# Point FORECAST_CACHE_BACKEND at FileBasedCache / DatabaseCache to share it across workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'forecast': {
+        'BACKEND': os.getenv('FORECAST_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('FORECAST_CACHE_LOCATION', 'forecast'),
+        'TIMEOUT': int(os.getenv('FORECAST_CACHE_TIMEOUT', 60 * 60 * 24)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('FORECAST_CACHE_MAX_ENTRIES', 1000)),
+        },
+    },
+}
+
+# Forecast inference backend: "lightgbm" (Booster.predict) or "numpy" (compiled tree
+# evaluator, verified against LightGBM on first use; falls back if it disagrees).
+
+FORECAST_INFERENCE_BACKEND = os.getenv('FORECAST_INFERENCE_BACKEND', 'lightgbm')
+
+# Model artifacts: preloaded at startup, re-checked at most every FORECAST_MODEL_CHECK_SECONDS
+# and hot-swapped when the files change (see api/services/model_registry.py).
+
+FORECAST_ARTIFACT_DIR = Path(os.getenv('FORECAST_ARTIFACT_DIR', BASE_DIR / 'artifacts'))
+FORECAST_MODEL_CHECK_SECONDS = float(os.getenv('FORECAST_MODEL_CHECK_SECONDS', 5))
+FORECAST_PRELOAD_MODELS = os.getenv('FORECAST_PRELOAD_MODELS', '1') == '1'
+
+# Monte Carlo paths (api/services/simulate.py): most paths per department a request may ask
+# for, most departments x paths kept in memory (bigger requests get a 400), most rollout rows
+# scored at once (paths are simulated in chunks of this size) and the time after which no
+# further chunk is started (the response then reports fewer paths).
+
+FORECAST_SIM_MAX_PATHS = int(os.getenv('FORECAST_SIM_MAX_PATHS', 50000))
+FORECAST_SIM_MAX_PATH_ROWS = int(os.getenv('FORECAST_SIM_MAX_PATH_ROWS', 200000))
+FORECAST_SIM_CHUNK_ROWS = int(os.getenv('FORECAST_SIM_CHUNK_ROWS', 20000))
+FORECAST_SIM_BUDGET_SECONDS = float(os.getenv('FORECAST_SIM_BUDGET_SECONDS', 10))
+
+# Opt-in slider response surfaces (api/services/response_surface.py): next-year requests inside
+# the slider ranges are interpolated on a per-department grid rebuilt in the background after
+# data or model changes. Interpolated answers have no error bound (the trees step in the macro
+# sliders) and are flagged "approximate"; "exact": true forces a rollout. Off: always roll out.
+
+FORECAST_SURFACE_ENABLED = os.getenv('FORECAST_SURFACE_ENABLED', '0') == '1'
+
+# Opt-in: DriversMonthly.totalNet follows RequestForPayment.netTotal. Every RFP write into a
+# closed month re-sums its (department, month) bucket (see api/services/rfp_totals.py); the
+# open month is stored by the first RFP write after it ends. Off: totals are entered by hand.
+
+FORECAST_TOTALNET_FROM_RFPS = os.getenv('FORECAST_TOTALNET_FROM_RFPS', '0') == '1'
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -1,14 +1,12 @@
 import * as React from "react"
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import api from "../../api";
 
 import {
   flexRender,
   useReactTable,
   getCoreRowModel,
-  getFilteredRowModel,
   getPaginationRowModel,
-  getSortedRowModel,
   RowSelection,
 } from "@tanstack/react-table"
 import { ArrowUpDown, ChevronDown, MoreHorizontal } from "lucide-react"
@@ -57,10 +55,12 @@ import {
 function DataList() {
 
   const[requests,setRequests] = useState([])
+  const[nextPage,setNextPage] = useState(null)
   const[loading,setLoading] = useState(false);
+  const latestRequest = useRef(0)
 
-  const [sorting, setSorting] = useState([]);
-  const [globalFilter, setGlobalFilter] = useState([])
+  const [sorting, setSorting] = useState([{ id: "dateRequested", desc: true }]);
+  const [search, setSearch] = useState("")
   const [rowSelection, setRowSelection] = useState({})
 
   const columns =[
@@ -87,20 +87,14 @@ function DataList() {
     },
     {
       accessorKey: 'requestedBy',
-      header: ({column}) => {
-        return (
-          <Button variant='ghost' onClick={() => column.getIsSorted() === "asc"}>
-            Requestor
-            <ArrowUpDown className="ml-2 h-4 w-4" />
-          </Button>
-        )
-      },
+      header: 'Requestor',
+      enableSorting: false,
     },
     {
       accessorKey: 'dateRequested',
       header: ({column}) => {
         return (
-          <Button variant='ghost' onClick={() => column.getIsSorted() === "asc"}>
+          <Button variant='ghost' onClick={() => column.toggleSorting(column.getIsSorted() === "asc")}>
             Date Requested
             <ArrowUpDown className="ml-2 h-4 w-4" />
           </Button>
@@ -109,20 +103,14 @@ function DataList() {
     },
     {
       accessorKey: 'description',
-      header: ({column}) => {
-        return (
-          <Button variant='ghost' onClick={() => column.getIsSorted() === "asc"}>
-            Description
-            <ArrowUpDown className="ml-2 h-4 w-4" />
-          </Button>
-        )
-      },
+      header: 'Description',
+      enableSorting: false,
     },
     {
       accessorKey: 'netTotal',
       header: ({column}) => {
         return (
-          <Button variant='ghost' onClick={() => column.getIsSorted() === "asc"}>
+          <Button variant='ghost' onClick={() => column.toggleSorting(column.getIsSorted() === "asc")}>
             Amount
             <ArrowUpDown className="ml-2 h-4 w-4" />
           </Button>
@@ -136,27 +124,46 @@ function DataList() {
     columns: columns,
     getCoreRowModel: getCoreRowModel(),
     getPaginationRowModel: getPaginationRowModel(),
+    // search and sorting run on the server over every RFP, not over the rows loaded so far
+    manualSorting: true,
+    manualFiltering: true,
+    enableSortingRemoval: false,
     onSortingChange: setSorting,
-    getSortedRowModel: getSortedRowModel(),
-    getFilteredRowModel: getFilteredRowModel(),
     onRowSelectionChange: setRowSelection,
     state: {
       sorting,
-      globalFilter,
       rowSelection,
     },
-    onGlobalFilterChange: setGlobalFilter
   });
 
+  const ordering = sorting.length ? `${sorting[0].desc ? "-" : ""}${sorting[0].id}` : "-dateRequested"
+
+  // a new search or sort starts again from the first page (no cursor)
   useEffect (() => {
-    getRequests()
-  },[])
+    const params = new URLSearchParams({
+      ordering,
+      page_size: 200,
+      fields: "id,requestedBy,dateRequested,description,netTotal",
+    })
+    if (search.trim()) params.set("q", search.trim())
+    const timer = setTimeout(() => getRequests(`/api/rfps/?${params}`), 300)
+    return () => clearTimeout(timer)
+  },[search, ordering])
 
-  const getRequests = () => {
-    api.get("/api/rfps/")
+  // the API returns one keyset page at a time; "Load more" follows its next link
+  const getRequests = (url, append = false) => {
+    const id = ++latestRequest.current
+    setLoading(true)
+    api.get(url)
     .then((res) => res.data)
-    .then((data) => {setRequests(data); console.log(data) })
-    .catch((err) => alert(err));
+    .then((data) => {
+      if (id !== latestRequest.current) return  // superseded by a newer search / sort
+      setRequests((prev) => append ? [...prev, ...data.results] : data.results)
+      setNextPage(data.next)
+      if (!append) setRowSelection({})
+    })
+    .catch((err) => alert(err))
+    .finally(() => { if (id === latestRequest.current) setLoading(false) });
   };
 
 
@@ -164,7 +171,8 @@ function DataList() {
     <div className="p-6 space-y-6">
       <div className='flex flex-col gap-[5px]'>
         <Input
-          onChange={e => table.setGlobalFilter(String(e.target.value))}
+          value={search}
+          onChange={e => setSearch(e.target.value)}
           placeholder="Search..."
           className="max-w-sm"
         />
@@ -208,6 +216,11 @@ function DataList() {
             {table.getFilteredSelectedRowModel().rows.length} of{" "}
             {table.getFilteredRowModel().rows.length} row(s) selected.
           </div>
+          {nextPage && (
+            <Button variant="outline" className="h-8 mr-6" disabled={loading} onClick={() => getRequests(nextPage, true)}>
+              {loading ? "Loading..." : "Load more"}
+            </Button>
+          )}
           <div className="flex items-center space-x-6 lg:space-x-8">
             <div className="flex items-center space-x-2">
               <p className="text-sm font-medium">Rows per page</p>
@@ -33,8 +33,8 @@ function Forecasting() {
   // fetch departments once
   useEffect(() => {
     const ac = new AbortController();
-    api.get("/api/departments/", { signal: ac.signal })
-      .then(res => (Array.isArray(res.data) ? res.data : []))
+    api.get("/api/lookups/", { signal: ac.signal })
+      .then(res => (Array.isArray(res.data?.departments) ? res.data.departments : []))
       .then(rows => {
         setDepartments(rows);
         if (rows.length && !rows.some(r => r.name === department)) {
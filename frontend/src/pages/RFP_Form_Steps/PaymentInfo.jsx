@@ -107,34 +107,26 @@ function PaymentInfo({setPage,formData,setFormData}) {
   ]);
 
   useEffect(() => {
-    getModesOfPayment()
-    getTypesOfBusinesses()
-    getTaxRegistrations()
+    getLookups()
+  }, [])
+
+  useEffect(() => {
     const net = toNum(amount) + toNum(lessEWT) + toNum(serviceFee);
     setValue("netTotal", net, { shouldValidate: true, shouldDirty: true });
   }, [amount, serviceFee, lessEWT, setValue])
 
-  const getModesOfPayment = () => {
-    api.get("/api/modes-of-payment/")
+  // one request for every dimension table (revalidated with ETag / 304)
+  const getLookups = () => {
+    api.get("/api/lookups/")
     .then((res) => res.data)
-    .then((data) => {setModesOfPayment(data); console.log(data) })
-    .catch((err) => alert(err));
-  };
-
-  const getTypesOfBusinesses = () => {
-    api.get("/api/types-of-business/")
-    .then((res) => res.data)
-    .then((data) => {setTypesOfBusinesses(data); console.log(data) })
+    .then((data) => {
+      setModesOfPayment(data.modesOfPayment);
+      setTypesOfBusinesses(data.typesOfBusiness);
+      setTaxRegistrations(data.taxRegistrations);
+    })
     .catch((err) => alert(err));
   };
 
-  const getTaxRegistrations = () => {
-  api.get("/api/tax-registrations/")      // adjust to your endpoint
-    .then(res => res.data)
-    .then(setTaxRegistrations)
-    .catch(err => alert(err));
-  };
-
   const toNum = (v) => {
     const n = parseFloat(String(v ?? "").replace(/,/g, ""));
     return Number.isFinite(n) ? n : 0;
@@ -90,29 +90,18 @@ function PrimaryInfo({setPage,formData,setFormData}) {
     });
 
     useEffect(() => {
-        getDepartments();
-        getSourcesOfFunds();
-        getTransactionType();
+        getLookups();
     }, []);
 
-    const getDepartments = () => {
-        api.get("/api/departments/")
+    // one request for every dimension table (revalidated with ETag / 304)
+    const getLookups = () => {
+        api.get("/api/lookups/")
         .then((res) => res.data)
-        .then((data) => {setDepartments(data); console.log(data) })
-        .catch((err) => alert(err));
-    };
-
-    const getSourcesOfFunds = () => {
-        api.get("/api/source-of-funds/")
-        .then((res) => res.data)
-        .then((data) => {setSourcesOfFunds(data); console.log(data) })
-        .catch((err) => alert(err));
-    };
-
-    const getTransactionType = () => {
-        api.get("/api/transaction-types/")
-        .then((res) => res.data)
-        .then((data) => {setTransactionTypes(data); console.log(data) })
+        .then((data) => {
+            setDepartments(data.departments);
+            setSourcesOfFunds(data.sourceOfFunds);
+            setTransactionTypes(data.transactionTypes);
+        })
         .catch((err) => alert(err));
     };
 